@@ -0,0 +1,100 @@
+'''------------------------------------------------------------------------------------------------
+Program:    test_async_database
+Version:    0.0.1
+Py Ver:     3.7+
+Purpose:    Unit testing module for the utils.async_database module.
+
+Dependents: os
+            sys
+            shutil
+            sqlite3
+            asyncio
+            tempfile
+            unittest
+            utils.database
+            utils.async_database
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:   The tests are run against the SQLite class, as this is the
+            only database which does not require a server.
+
+Use:        > cd /package_root/test
+            > python test_async_database.py
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.0.1       Written
+------------------------------------------------------------------------------------------------'''
+
+import os
+import sys
+import shutil
+import sqlite3
+import asyncio
+import tempfile
+import unittest
+
+#ENSURE UTILS IS IMPORTED FROM LOCAL DIRECTORY TREE, RELATIVE TO THIS FILE
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+import utils.database as database
+from utils.async_database import AsyncDatabase
+
+
+#UNIT TEST CLASS FOR THE ASYNC_DATABASE MODULE
+class TestAsyncDatabase(unittest.TestCase):
+
+    def setUp(self):
+        #CREATE A TEST DATABASE FILE
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, 'test.db')
+        conn = sqlite3.connect(self._path)
+        conn.execute('CREATE TABLE numbers (n INTEGER)')
+        conn.executemany('INSERT INTO numbers VALUES (?)', [(i,) for i in range(100)])
+        conn.commit()
+        conn.close()
+        #CONNECT
+        self._db = database.SQLite(db_file_path=self._path)
+        self._db.connect()
+
+    def tearDown(self):
+        self._db.disconnect()
+        shutil.rmtree(self._dir)
+
+
+    #FETCH, STREAM AND GATHER MUST RETURN THE SAME ROWS AS THE BLOCKING CLASS
+    def test_fetch_stream_gather(self):
+
+        async def run():
+            async with AsyncDatabase(db=self._db, max_workers=2) as adb:
+                count = await adb.fetch('SELECT COUNT(*) FROM numbers')
+                streamed = [row async for row in adb.stream('SELECT n FROM numbers ORDER BY n',
+                                                            batch_size=7)]
+                results = await adb.gather(*[('SELECT n FROM numbers WHERE n = ?', (i,))
+                                             for i in range(10)])
+            return count, streamed, results
+
+        loop = asyncio.new_event_loop()
+        try:
+            count, streamed, results = loop.run_until_complete(run())
+        finally:
+            loop.close()
+        #TEST
+        self.assertEqual(count, [(100,)])
+        self.assertEqual(streamed, [(i,) for i in range(100)])
+        self.assertEqual(results, [[(i,)] for i in range(10)])
+        self.assertTrue(self._db.pool_stats()['size'] <= 2)
+
+
+#-----------------------------------------------------------------------
+#MAIN PROGRAM CONTROLLER
+def main():
+
+    #RUN UNIT TESTS
+    unittest.main()
+
+
+#RUN PROGRAM
+if __name__ == '__main__': main()
@@ -0,0 +1,774 @@
+'''------------------------------------------------------------------------------------------------
+Program:    test_database
+Version:    0.0.1
+Py Ver:     3.4+
+Purpose:    Unit testing module for the utils.database module.
+
+Dependents: os
+            operator
+            sys
+            shutil
+            tempfile
+            threading
+            time
+            unittest
+            utils.database
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:   The tests are run against the SQLite class, as this is the
+            only database which does not require a server.
+
+            Pylint knowingly flags the following:
+                - C0413: utils.database import should be at top of module
+
+Use:        > cd /package_root/test
+            > python test_database.py
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.0.1       Written
+------------------------------------------------------------------------------------------------'''
+
+import os
+import operator
+import sys
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from decimal import Decimal
+
+#ENSURE UTILS IS IMPORTED FROM LOCAL DIRECTORY TREE, RELATIVE TO THIS FILE
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+import utils.database as database
+
+
+#PARTITION FUNCTION FOR THE PARALLEL_MAP TEST (MUST BE PICKLABLE)
+def _sum_ids(rows):
+    return sum(row[0] for row in rows)
+
+
+#UNIT TEST CLASS FOR THE DATABASE MODULE
+class TestDatabase(unittest.TestCase):
+
+    def setUp(self):
+        #CREATE A TEST DATABASE FILE
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, 'test.db')
+        conn = sqlite3.connect(self._path)
+        conn.execute('CREATE TABLE people (id INTEGER, name TEXT)')
+        conn.executemany('INSERT INTO people VALUES (?, ?)', [(1, 'a'), (2, 'b'), (3, 'c')])
+        conn.commit()
+        conn.close()
+        #CONNECT
+        self._db = database.SQLite(db_file_path=self._path)
+        self._db.connect()
+
+    def tearDown(self):
+        if self._db.connected: self._db.disconnect()
+        shutil.rmtree(self._dir)
+
+
+    #TABLE MUST BE FOUND, REGARDLESS OF CASE
+    def test_table_exists(self):
+        self.assertTrue(self._db.table_exists('PEOPLE'))
+        self.assertFalse(self._db.table_exists('nobody'))
+
+
+    #METADATA MUST BE SERVED FROM THE CACHE, AND CLEARED ON DDL
+    def test_metadata_cache(self):
+        #TEST
+        self.assertEqual(self._db.tables_exist(['people', 'things']),
+                         {'people': True, 'things': False})
+        self.assertEqual(self._db.columns('people'), ['id', 'name'])
+        self.assertEqual(list(self._db.column_types('People').values()), ['INTEGER', 'TEXT'])
+        #CREATE A TABLE THROUGH THE WRAPPER
+        self._db.execute(sql='CREATE TABLE things (id INTEGER)', commit=True)
+        self.assertTrue(self._db.table_exists('things'))
+
+
+    #POOLED CONNECTIONS MUST BE REUSED, AND STATS REPORTED
+    def test_pool_checkout(self):
+        #OPEN POOL
+        self.assertTrue(self._db.open_pool(min_size=1, max_size=2))
+        #BORROW THE SAME CONNECTION TWICE
+        with self._db.checkout() as conn: first = conn
+        with self._db.checkout() as conn: second = conn
+        stats = self._db.pool_stats()
+        #TEST
+        self.assertIs(first, second)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['size'], 1)
+        self.assertEqual(stats['active'], 0)
+
+
+    #POOL MUST CLOSE EXPIRED IDLE CONNECTIONS WITHOUT HOLDING ITS LOCK
+    def test_pool_evict_idle(self):
+        #VARIABLES
+        blocked = []
+        #A CLOSE WHICH TESTS THE POOL CAN BE USED BY ANOTHER THREAD
+        def on_close(conn):
+            thread = threading.Thread(target=pool.stats)
+            thread.start()
+            thread.join(timeout=1)
+            blocked.append(thread.is_alive())
+        pool = database.ConnectionPool(factory=lambda: sqlite3.connect(':memory:'),
+                                       min_size=0, max_size=2, idle_timeout=0,
+                                       on_close=on_close)
+        first = pool.acquire()
+        pool.release(first)
+        time.sleep(0.01)
+        second = pool.acquire()
+        stats = pool.stats()
+        #TEST
+        self.assertIsNot(first, second)
+        self.assertEqual(blocked, [False])
+        self.assertEqual((stats['size'], stats['closed']), (1, 1))
+        pool.release(second)
+        pool.close()
+
+
+    #POOL MUST TIME OUT WHEN ALL CONNECTIONS ARE BORROWED
+    def test_pool_timeout(self):
+        #OPEN POOL
+        self._db.open_pool(min_size=1, max_size=1, timeout=0.1)
+        with self._db.checkout():
+            self.assertRaises(database.PoolTimeoutError, self._db._pool.acquire)
+        self.assertEqual(self._db.pool_stats()['timeouts'], 1)
+
+
+    #POOL MUST SERVE MANY THREADS WITHIN ITS MAXIMUM SIZE
+    def test_pool_threads(self):
+        #VARIABLES
+        results = []
+        #OPEN POOL
+        self._db.open_pool(min_size=1, max_size=3)
+
+        def worker():
+            with self._db.checkout() as conn:
+                results.append(conn.execute('SELECT COUNT(*) FROM people').fetchall()[0][0])
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        #TEST
+        self.assertEqual(results, [3] * 10)
+        self.assertTrue(self._db.pool_stats()['size'] <= 3)
+
+
+    #REPEATED STATEMENTS MUST REUSE THE CACHED CURSOR
+    def test_execute_fetch(self):
+        #VARIABLES
+        sql = 'SELECT name FROM people WHERE id = ?'
+        #UPDATE A ROW >> FETCH TWICE
+        self._db.execute(sql='UPDATE people SET name = ? WHERE id = ?', params=('x', 1),
+                         commit=True)
+        first = self._db.fetch(sql=sql, params=(1,))
+        second = self._db.fetch(sql=sql, params=(2,))
+        stats = self._db.statement_cache_stats()
+        #TEST
+        self.assertEqual(first, [('x',)])
+        self.assertEqual(second, [('b',)])
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+
+
+    #SAME-NAMED SQL SERVER TABLES IN DIFFERENT SCHEMAS MUST NOT BE MERGED
+    def test_sqlserver_catalog(self):
+        #VARIABLES (CATALOG ROWS, AS RETURNED BY _CATALOG_SQL)
+        mssql = database.SQLServer(server='server', database='db', user='user', password='pw')
+        mssql._fetch = lambda sql, params=None: [('dbo.orders', 'id', 'int'),
+                                                 ('dbo.orders', 'name', 'nvarchar'),
+                                                 ('orders', 'id', 'int'),
+                                                 ('orders', 'name', 'nvarchar'),
+                                                 ('stage.orders', 'raw', 'nvarchar')]
+        #TEST
+        self.assertEqual(mssql.columns('orders'), ['id', 'name'])
+        self.assertEqual(mssql.columns('dbo.orders'), ['id', 'name'])
+        self.assertEqual(mssql.column_types('stage.orders'), {'raw': 'nvarchar'})
+        self.assertEqual(mssql.tables_exist(['stage.orders', 'stage.nowhere']),
+                         {'stage.orders': True, 'stage.nowhere': False})
+
+
+    #CACHED RESULTS MUST BE SERVED UNTIL THE TABLE IS WRITTEN
+    def test_result_cache(self):
+        #VARIABLES
+        sql = 'SELECT name FROM people WHERE id = ?'
+        #ENABLE >> FETCH TWICE
+        self._db.enable_result_cache(max_entries=10)
+        self._db.fetch(sql=sql, params=(1,))
+        self._db.fetch(sql='SELECT  name\nFROM people WHERE id = ?', params=(1,))
+        #WRITE THROUGH THE WRAPPER >> FETCH AGAIN
+        self._db.execute(sql='UPDATE people SET name = ? WHERE id = ?', params=('x', 1),
+                         commit=True)
+        rows = self._db.fetch(sql=sql, params=(1,))
+        stats = self._db.result_cache_stats()
+        #TEST
+        self.assertEqual(rows, [('x',)])
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['invalidations'], 1)
+        #LITERALS DIFFERING ONLY IN WHITESPACE MUST NOT SHARE AN ENTRY
+        self._db.execute(sql="INSERT INTO people VALUES (4, 'a  b')", commit=True)
+        self.assertEqual(self._db.fetch(sql="SELECT id FROM people WHERE name = 'a  b'"), [(4,)])
+        self.assertEqual(self._db.fetch(sql="SELECT id FROM people WHERE name = 'a b'"), [])
+        #A WITH (CTE) STATEMENT MUST BE CLASSIFIED BY ITS DATA-MODIFYING VERB
+        count = 'SELECT COUNT(*) FROM people'
+        for sql, expected in [('WITH x AS (SELECT 5) INSERT INTO people SELECT 5, * FROM x', 5),
+                              ('WITH x AS (SELECT 5) UPDATE people SET id = 6 '
+                               'WHERE id IN (SELECT * FROM x)', 5),
+                              ('WITH x AS (SELECT 6) DELETE FROM people '
+                               'WHERE id IN (SELECT * FROM x)', 4)]:
+            self._db.fetch(sql=count)
+            self._db.execute(sql=sql, commit=True)
+            self.assertEqual(self._db.fetch(sql=count), [(expected,)])
+        self.assertTrue(database._is_read("WITH x AS (SELECT 'DELETE') SELECT * FROM x"))
+        self.assertFalse(database._is_read('WITH x AS (SELECT 1) SELECT * FROM x FOR UPDATE'))
+
+
+    #EXECUTE_SCRIPT MUST RUN EACH STATEMENT IN THE SCRIPT
+    def test_execute_script(self):
+        #WRITE SCRIPT
+        script = os.path.join(self._dir, 'script.sql')
+        with open(script, 'w') as f:
+            f.write("CREATE TABLE notes (txt TEXT);\n"
+                    "INSERT INTO notes VALUES ('a;b');\n"
+                    "CREATE TRIGGER trg AFTER INSERT ON notes BEGIN\n"
+                    "    INSERT INTO people VALUES (99, NEW.txt);\n"
+                    "END;\n"
+                    "INSERT INTO notes VALUES ('c');\n")
+        #TEST
+        self.assertTrue(self._db.execute_script(sql_file=script, commit=True))
+        self.assertEqual(self._db.cur.execute('SELECT txt FROM notes').fetchall(),
+                         [('a;b',), ('c',)])
+        self.assertEqual(self._db.cur.execute('SELECT COUNT(*) FROM people '
+                                              'WHERE id = 99').fetchall()[0][0], 1)
+
+
+    #A FAILED SCRIPT MUST BE ROLLED BACK TO THE LAST CHECKPOINT
+    def test_execute_script_rollback(self):
+        #WRITE SCRIPT
+        script = os.path.join(self._dir, 'script.sql')
+        with open(script, 'w') as f:
+            f.write("INSERT INTO people VALUES (10, 'x');\n"
+                    "INSERT INTO people VALUES (11, 'y');\n"
+                    "INSERT INTO people VALUES (12, 'z');\n"
+                    "INSERT INTO nowhere VALUES (13);\n")
+        #TEST
+        self.assertFalse(self._db.execute_script(sql_file=script, commit=True, commit_every=2))
+        self.assertEqual(self._db.cur.execute('SELECT MAX(id) FROM people').fetchall()[0][0], 11)
+
+
+    #INSERT_MANY MUST LOAD ALL ROWS FROM A GENERATOR, ACROSS MULTIPLE BATCHES
+    def test_insert_many(self):
+        #LOAD ROWS
+        rows = ((i, 'name_%d' % i) for i in range(10, 2510))
+        stats = self._db.insert_many(table='people', columns=['id', 'name'], rows=rows,
+                                     batch_size=1000)
+        count = self._db.cur.execute('SELECT COUNT(*) FROM people').fetchall()[0][0]
+        #TEST
+        self.assertEqual(stats['rows'], 2500)
+        self.assertEqual(count, 2503)
+        #WITHOUT COMMIT, THE ROWS MUST BE KEPT FOR THE CALLER TO COMMIT (EVEN WITH A POOL)
+        self._db.open_pool(min_size=1, max_size=2)
+        stats = self._db.insert_many(table='people', columns=['id', 'name'], rows=[(9, 'z')],
+                                     commit=False)
+        self._db.conn.commit()
+        self.assertEqual(stats['rows'], 1)
+        self.assertEqual(self._db.fetch(sql='SELECT COUNT(*) FROM people'), [(2504,)])
+
+
+    #ITER_QUERY MUST STREAM ALL ROWS, ACROSS MULTIPLE BATCHES
+    def test_iter_query(self):
+        #STREAM IN BATCHES OF TWO
+        rows = self._db.iter_query(sql='SELECT id FROM people WHERE id > ? ORDER BY id',
+                                   params=(0,), batch_size=2)
+        #TEST
+        self.assertEqual(next(rows), (1,))
+        self.assertEqual(list(rows), [(2,), (3,)])
+
+
+    #STATEMENTS MUST BE TIMED, GROUPED BY NORMALISED TEXT, AND LOGGED WHEN SLOW
+    def test_query_stats(self):
+        #VARIABLES
+        path = os.path.join(self._dir, 'slow.csv')
+        #LOG EVERY STATEMENT >> FETCH WITH DIFFERENT LITERALS
+        self._db.enable_slow_query_log(filepath=path, threshold=0)
+        self._db.fetch(sql='SELECT name FROM people WHERE id = 1')
+        self._db.fetch(sql='SELECT name FROM people WHERE id = 2')
+        stats = self._db.query_stats()['statements']['SELECT name FROM people WHERE id = ?']
+        with open(path) as f: lines = f.read().splitlines()
+        #TEST
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['rows'], 2)
+        self.assertEqual(sum(stats['histogram'].values()), 2)
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].endswith('seconds,rows,statement'))
+        #RESET
+        self._db.reset_query_stats()
+        self.assertEqual(self._db.query_stats()['statements'], {})
+
+
+    #FETCH_COLUMNS MUST BUILD TYPED COLUMNS ACROSS BATCHES, WIDENING FOR NULLS
+    def test_fetch_columns(self):
+        #ADD A ROW WITH A NULL ID
+        self._db.execute(sql='INSERT INTO people VALUES (NULL, ?)', params=('d',), commit=True)
+        df = self._db.fetch_columns(sql='SELECT id, name FROM people ORDER BY rowid',
+                                    batch_size=2)
+        #TEST
+        self.assertEqual(list(df.columns), ['id', 'name'])
+        self.assertEqual(len(df), 4)
+        self.assertEqual(df['id'].dtype.kind, 'f')
+        self.assertEqual(list(df['id'][:3]), [1, 2, 3])
+        self.assertTrue(df['id'].isnull()[3])
+        self.assertEqual(list(df['name']), ['a', 'b', 'c', 'd'])
+
+
+    #FETCH_COLUMNS MUST KEEP THE TYPE OF EACH VALUE IN A MIXED COLUMN
+    def test_fetch_columns_mixed(self):
+        #ADD A COLUMN OF MIXED TYPES
+        self._db.execute(sql='CREATE TABLE mixed (v)')
+        self._db.insert_many(table='mixed', columns=['v'], rows=[(1,), ('a',), (2.5,)])
+        #TEST (IN ONE BATCH, AND ACROSS BATCHES)
+        for batch_size in (10, 2):
+            cols = self._db.fetch_columns(sql='SELECT v FROM mixed ORDER BY rowid',
+                                          batch_size=batch_size, frame=False)
+            self.assertEqual(cols['v'].dtype.kind, 'O')
+            self.assertEqual([(v, type(v)) for v in cols['v']],
+                             [(1, int), ('a', str), (2.5, float)])
+
+
+    #WRITE_DATAFRAME MUST CREATE THE TABLE, AND LOAD ALL CHUNKS WITH NULLS
+    def test_write_dataframe(self):
+        #IMPORTS
+        import pandas as pd
+        #BUILD DATAFRAME
+        df = pd.DataFrame({'Item ID': [1, 2, 3], 'Price': [1.5, None, 3.0],
+                           'Item Name': pd.Series([' x ', 'y', None], dtype=object)})
+        stats = self._db.write_dataframe(df=df, table='items', chunksize=2, clean=True)
+        rows = self._db.fetch(sql='SELECT item_id, price, item_name FROM items ORDER BY 1')
+        #TEST
+        self.assertEqual(stats['rows'], 3)
+        self.assertEqual(stats['chunks'], 2)
+        self.assertEqual(rows, [(1, 1.5, 'x'), (2, None, 'y'), (3, 3.0, None)])
+        self.assertEqual(self._db.column_types('items')['item_id'], 'INTEGER')
+        #TABLE EXISTS >> FAIL, THEN APPEND
+        self.assertIsNone(self._db.write_dataframe(df=df, table='items', clean=True))
+        self.assertEqual(self._db.write_dataframe(df=df, table='items', if_exists='append',
+                                                  clean=True)['rows'], 3)
+
+
+    #EXPORT_CSV MUST STREAM ALL ROWS, WITH AND WITHOUT COMPRESSION
+    def test_export_csv(self):
+        #VARIABLES
+        import gzip
+        sql = 'SELECT id, name FROM people ORDER BY id'
+        path = os.path.join(self._dir, 'people.csv')
+        #EXPORT
+        stats = self._db.export_csv(sql=sql, path=path, batch_size=2)
+        with open(path) as f: lines = f.read().splitlines()
+        stats_gz = self._db.export_csv(sql=sql, path=path + '.gz', batch_size=2,
+                                       compress='gzip', threaded=False)
+        with gzip.open(path + '.gz', 'rt') as f: lines_gz = f.read().splitlines()
+        #TEST
+        self.assertEqual(lines, ['id,name', '1,a', '2,b', '3,c'])
+        self.assertEqual(lines_gz, lines)
+        self.assertEqual(stats['rows'], 3)
+        self.assertEqual(stats['bytes'], os.path.getsize(path))
+        self.assertEqual(stats_gz['rows'], 3)
+
+
+    #LOAD_CSV MUST LOAD ALL BATCHES WITH INFERRED TYPES, AND RESTORE THE SETTINGS
+    def test_load_csv(self):
+        #WRITE CSV
+        path = os.path.join(self._dir, 'data.csv')
+        with open(path, 'w') as f:
+            f.write('id,value,label\n')
+            for i in range(2500): f.write('%d,%s,x%d\n' % (i, '' if i == 5 else i / 2.0, i))
+        mode = self._db.cur.execute('PRAGMA journal_mode').fetchone()[0]
+        stats = self._db.load_csv(path=path, table='data', batch_size=1000)
+        #TEST
+        self.assertEqual(stats['rows'], 2500)
+        self.assertEqual(list(self._db.column_types('data').values()),
+                         ['INTEGER', 'REAL', 'TEXT'])
+        self.assertEqual(self._db.fetch(sql='SELECT * FROM data WHERE id IN (5, 7)'),
+                         [(5, None, 'x5'), (7, 3.5, 'x7')])
+        self.assertEqual(self._db.cur.execute('PRAGMA journal_mode').fetchone()[0], mode)
+
+
+    #A PROFILE MUST BE APPLIED ON CONNECT, WITH EXPLICIT PRAGMAS OVERRIDING IT
+    def test_sqlite_profile(self):
+        #CONNECT WITH A PROFILE
+        db = database.SQLite(db_file_path=self._path, profile='read_heavy',
+                             pragmas={'cache_size': -1000})
+        db.connect()
+        settings = db.settings()
+        db.disconnect()
+        #TEST
+        self.assertEqual(settings['journal_mode'], 'wal')
+        self.assertEqual(settings['cache_size'], -1000)
+        self.assertEqual(settings['temp_store'], 2)
+        self.assertRaises(database.DatabaseError, database.SQLite, db_file_path=self._path,
+                          pragmas={'page_size; DROP TABLE people': 1})
+
+
+    #AN IN-MEMORY COPY MUST SERVE QUERIES, AND RELOAD WHEN THE FILE CHANGES
+    def test_sqlite_in_memory(self):
+        #CONNECT
+        db = database.SQLite(db_file_path=self._path, in_memory=True, resync_interval=0)
+        db.connect()
+        sql = 'SELECT COUNT(*) FROM people'
+        first = db.fetch(sql=sql, cache=False)
+        #WRITE TO THE COPY (NOT THE FILE)
+        db.execute(sql="INSERT INTO people VALUES (4, 'd')", commit=True)
+        second = db.fetch(sql=sql)
+        #CHANGE THE FILE >> FORCE A NEWER MODIFICATION TIME
+        conn = sqlite3.connect(self._path)
+        conn.execute("DELETE FROM people WHERE id = 1")
+        conn.commit()
+        conn.close()
+        os.utime(self._path, (time.time() + 10, time.time() + 10))
+        third = db.fetch(sql=sql)
+        db.disconnect()
+        #TEST
+        self.assertEqual(first, [(3,)])
+        self.assertEqual(second, [(4,)])
+        self.assertEqual(third, [(2,)])
+
+
+    #EACH THREAD MUST HAVE ITS OWN READ-ONLY CONNECTION, ALL CLOSED ON DISCONNECT
+    def test_sqlite_thread_local(self):
+        #VARIABLES
+        conns = []
+        results = []
+        #CONNECT
+        db = database.SQLite(db_file_path=self._path, thread_local=True, read_only=True)
+        db.connect()
+
+        def worker():
+            with db.checkout() as conn: conns.append(conn)
+            results.append(db.fetch(sql='SELECT COUNT(*) FROM people', cache=False))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        #TEST
+        self.assertEqual(results, [[(3,)]] * 4)
+        self.assertEqual(len(set(id(conn) for conn in conns)), 4)
+        self.assertRaises(sqlite3.OperationalError, db.execute,
+                          sql="INSERT INTO people VALUES (4, 'd')")
+        db.disconnect()
+        self.assertRaises(sqlite3.ProgrammingError, conns[0].execute, 'SELECT 1')
+
+
+    #PARALLEL_MAP MUST SCAN EVERY ROW ONCE, ACROSS WORKER PROCESSES
+    def test_parallel_map(self):
+        #LOAD ROWS
+        self._db.insert_many(table='people', columns=['id', 'name'],
+                             rows=((i, 'x') for i in range(4, 1001)))
+        total = self._db.parallel_map(table='people', func=_sum_ids, workers=2,
+                                      reducer=operator.add, columns='id')
+        parts = self._db.parallel_map(table='people', func=_sum_ids, workers=2, partitions=3,
+                                      columns='id')
+        #TEST
+        self.assertEqual(total, sum(range(1, 1001)))
+        self.assertEqual(len(parts), 3)
+        self.assertEqual(sum(parts), total)
+
+
+    #PARALLEL_EXTRACT MUST DELIVER EVERY ROW; AS A STREAM, OR TO PARTITION FILES
+    def test_parallel_extract(self):
+        #LOAD ROWS
+        self._db.insert_many(table='people', columns=['id', 'name'],
+                             rows=((i, 'x') for i in range(4, 1001)))
+        ids = list(range(1, 1001))
+        timings = []
+        #STREAM (ORDERED AND UNORDERED)
+        ordered = [row[0] for row in self._db.parallel_extract(
+            table='people', split_column='id', partitions=4, workers=2, columns='id',
+            batch_size=50, stats=timings)]
+        unordered = [row[0] for row in self._db.parallel_extract(
+            table='people', split_column='id', partitions=4, columns='id', batch_size=50,
+            ordered=False)]
+        #STOP EARLY
+        rows = self._db.parallel_extract(table='people', split_column='id', batch_size=10)
+        next(rows)
+        rows.close()
+        #FILES
+        path = os.path.join(self._dir, 'people_{partition}.csv')
+        stats = self._db.parallel_extract(table='people', split_column='id', partitions=3,
+                                          path=path)
+        #TEST
+        self.assertEqual(ordered, ids)
+        self.assertEqual(sorted(unordered), ids)
+        self.assertEqual(sorted(stat['partition'] for stat in timings), [0, 1, 2, 3])
+        self.assertEqual([stat['partition'] for stat in stats], [0, 1, 2])
+        self.assertEqual(sum(stat['rows'] for stat in stats), 1000)
+        self.assertTrue(os.path.exists(path.format(partition=2)))
+
+
+    #COPY_TABLE MUST CREATE THE TARGET AND COPY ALL ROWS, FROM A TABLE OR A QUERY
+    def test_copy_table(self):
+        #CREATE TARGET DATABASE
+        path = os.path.join(self._dir, 'target.db')
+        sqlite3.connect(path).close()
+        dst = database.SQLite(db_file_path=path)
+        dst.connect()
+        #COPY
+        stats = database.copy_table(src_db=self._db, dst_db=dst, table_or_query='people',
+                                    batch_size=2)
+        database.copy_table(src_db=self._db, dst_db=dst, target='some_people',
+                            table_or_query='SELECT id * 1.5 AS score, name FROM people '
+                                           'WHERE id > 1')
+        #TEST
+        self.assertEqual(stats['rows'], 3)
+        self.assertEqual(dst.fetch(sql='SELECT * FROM people'), [(1, 'a'), (2, 'b'), (3, 'c')])
+        self.assertEqual(list(dst.column_types('some_people').values()), ['REAL', 'TEXT'])
+        self.assertEqual(dst.fetch(sql='SELECT COUNT(*) FROM some_people'), [(2,)])
+        #DECIMAL VALUES (E.G. FROM DECIMAL OR NUMBER COLUMNS) MUST BE BOUND BY SQLITE
+        dst.execute(sql='CREATE TABLE prices (id INTEGER, price REAL, exact TEXT)', commit=True)
+        dst.insert_many(table='prices', columns=['id', 'price', 'exact'],
+                        rows=[(Decimal('1'), Decimal('2.50'), Decimal('0.1'))])
+        self.assertEqual(dst.fetch(sql='SELECT * FROM prices'), [(1, 2.5, '0.1')])
+        #NO PROCESS-WIDE ADAPTER MUST BE REGISTERED
+        self.assertNotIn((Decimal, sqlite3.PrepareProtocol), sqlite3.adapters)
+        dst.disconnect()
+        #TYPE NAMES MUST BE MATCHED WHOLE; AN ORACLE NUMBER KEY NARROWED BY ITS SCALE
+        self.assertEqual([database._sql_kind(name) for name in
+                          ('INTERVAL DAY(2) TO SECOND(6)', 'POINT', 'BIGINT UNSIGNED',
+                           'NUMBER(10)', 'NUMBER')], ['O', 'O', 'i', 'i', 'f'])
+        catalog = type('Catalog', (object,),
+                       dict(column_types=lambda self, table: {'id': 'NUMBER'},
+                            _column_dtype=staticmethod(database.Oracle._column_dtype)))
+        description = [('id', 'NUMBER', None, None, 10, 0, True)]
+        self.assertEqual(database._column_kinds(db=catalog(), table='t', description=description,
+                                                rows=[]), ['i'])
+
+
+    #BUFFERED ROWS MUST BE WRITTEN IN BATCHES, AND ALL ROWS ON CLOSE
+    def test_buffered_writer(self):
+        #VARIABLES
+        self._db.open_pool(min_size=1, max_size=2)
+        writer = database.BufferedWriter(db=self._db, table='people', columns=['id', 'name'],
+                                         max_rows=2, max_latency=0.05, max_queue=4)
+        #WRITE >> WAIT FOR THE LATENCY FLUSH
+        writer.write_many(rows=[(4, 'd'), (5, 'e'), (6, 'f')])
+        time.sleep(0.5)
+        self.assertEqual(writer.stats()['rows'], 3)
+        #WRITE >> CLOSE
+        writer.write(row=(7, 'g'))
+        writer.close()
+        stats = writer.stats()
+        #TEST
+        self.assertEqual(self._db.fetch(sql='SELECT COUNT(*) FROM people'), [(7,)])
+        self.assertEqual(stats['rows'], 4)
+        self.assertEqual(stats['flushes'], 3)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertRaises(database.DatabaseError, writer.write, row=(8, 'h'))
+        #A PERMANENT ERROR MUST NOT BE RETRIED, OR STOP LATER BATCHES
+        failed = []
+        self._db.execute(sql='CREATE TABLE keyed (id INTEGER PRIMARY KEY)', commit=True)
+        for on_error in (None, lambda rows, err: failed.append(rows)):
+            writer = database.BufferedWriter(db=self._db, table='keyed', columns=['id'],
+                                             max_rows=2, on_error=on_error)
+            writer.write_many(rows=[(1,), (1,), (2,), (3,)])
+            if on_error is None:
+                self.assertRaises(database.DatabaseError, writer.close)
+                self.assertEqual(writer.unwritten, [(1,), (1,)])
+            else:
+                writer.close()
+                self.assertEqual(failed, [[(1,), (1,)]])
+            self.assertEqual(writer.stats()['errors'], 1)
+            self.assertEqual(writer.stats()['failed'], 2)
+            self.assertEqual(self._db.fetch(sql='SELECT id FROM keyed ORDER BY id'), [(2,), (3,)])
+            self._db.execute(sql='DELETE FROM keyed', commit=True)
+
+
+    #CONCURRENT IDENTICAL QUERIES MUST SHARE ONE EXECUTION
+    def test_single_flight(self):
+        #VARIABLES
+        calls = []
+        results = []
+        fetch = self._db._fetch
+        barrier = threading.Barrier(4)
+        #SLOW THE QUERY, SO THE CALLS OVERLAP
+        def slow(sql, params=None):
+            calls.append(sql)
+            time.sleep(0.3)
+            return fetch(sql=sql, params=params)
+        def worker():
+            barrier.wait()
+            results.append(self._db.fetch(sql='SELECT  name FROM people ORDER BY id'))
+        self._db._fetch = slow
+        self._db.open_pool(min_size=1, max_size=4)
+        self._db.enable_single_flight()
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        stats = self._db.single_flight_stats()
+        #TEST
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[('a',), ('b',), ('c',)]] * 4)
+        self.assertEqual(stats, {'queries': 1, 'shared': 3})
+        #A LATER CALL RUNS THE QUERY AGAIN
+        self._db.fetch(sql='SELECT name FROM people ORDER BY id')
+        self.assertEqual(len(calls), 2)
+        #LITERALS DIFFERING ONLY IN WHITESPACE MUST NOT SHARE A QUERY
+        self._db.execute(sql="INSERT INTO people VALUES (4, 'a  b')", commit=True)
+        sqls = ["SELECT id FROM people WHERE name = 'a  b'",
+                "SELECT id FROM people WHERE name = 'a b'"]
+        results = dict()
+        fetch_one = lambda sql: results.update({sql: self._db.fetch(sql=sql)})
+        threads = [threading.Thread(target=fetch_one, args=(sql,)) for sql in sqls]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(results, {sqls[0]: [(4,)], sqls[1]: []})
+        #IDENTICAL WITH (CTE) WRITES MUST EACH BE RUN
+        def slow_write(sql, params=None):
+            calls.append(sql)
+            time.sleep(0.3)
+            return []
+        self._db._fetch = slow_write
+        sql = 'WITH x AS (SELECT 5) INSERT INTO people SELECT *, 0 FROM x'
+        threads = [threading.Thread(target=self._db.fetch, args=(sql,)) for _ in range(2)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        self.assertEqual(len(calls), 6)
+
+
+    #A SNAPSHOT MUST BE READ LOCALLY UNTIL EXPIRED OR REFRESHED
+    def test_snapshot(self):
+        #VARIABLES
+        path = os.path.join(self._dir, 'snapshots.db')
+        sql = 'SELECT id, name FROM people WHERE id > ? ORDER BY id'
+        #BUILD >> CHANGE THE SOURCE >> READ THE SNAPSHOT
+        rows1 = self._db.snapshot(sql=sql, name='people_snap', path=path, params=(1,))
+        self._db.execute(sql='DELETE FROM people WHERE id = 3', commit=True)
+        rows2 = self._db.snapshot(sql=sql, name='people_snap', path=path, params=(1,))
+        #REFRESH, AND EXPIRY
+        rows3 = self._db.snapshot(sql=sql, name='people_snap', path=path, params=(1,),
+                                  refresh=True)
+        rows4 = self._db.snapshot(sql=sql, name='people_snap', path=path, params=(0,), ttl=0)
+        #TEST
+        self.assertEqual(rows1, [(2, 'b'), (3, 'c')])
+        self.assertEqual(rows2, rows1)
+        self.assertEqual(rows3, [(2, 'b')])
+        self.assertEqual(rows4, [(1, 'a'), (2, 'b')])
+        self.assertRaises(database.DatabaseError, self._db.snapshot, sql=sql, name='a b',
+                          path=path)
+        #THE METADATA TABLE MUST NOT BE REPLACED
+        self.assertRaises(database.DatabaseError, self._db.snapshot, sql=sql, name='_snapshots',
+                          path=path, params=(1,))
+        self.assertEqual(self._db.snapshot(sql=sql, name='people_snap', path=path, params=(0,)),
+                         rows4)
+
+
+    #ONLY ROWS AFTER THE COMMITTED WATERMARK MUST BE EXTRACTED
+    def test_extract_incremental(self):
+        for name in ('state.json', 'state.db'):
+            #VARIABLES
+            path = os.path.join(self._dir, name)
+            extract = lambda: self._db.extract_incremental(table='people', watermark_column='id',
+                                                           state_file=path, batch_size=2)
+            #FIRST RUN >> UNCOMMITTED RUN >> NEW ROW
+            with extract() as ext:
+                self.assertRaises(database.DatabaseError, ext.commit)
+                rows1 = list(ext)
+                ext.commit()
+            rows2 = list(extract())
+            self._db.execute(sql='INSERT INTO people VALUES (4, ?)', params=(name,), commit=True)
+            ext = extract()
+            rows3 = list(ext)
+            ext.commit()
+            #TEST
+            self.assertEqual(rows1, [(1, 'a'), (2, 'b'), (3, 'c')])
+            self.assertEqual(rows2, [])
+            self.assertEqual(rows3, [(4, name)])
+            self.assertEqual(ext.stats()['previous'], 3)
+            self.assertEqual(ext.stats()['watermark'], 4)
+            self.assertEqual(list(extract()), [])
+            self._db.execute(sql='DELETE FROM people WHERE id = 4', commit=True)
+
+
+    #A TRANSIENT READ ERROR MUST BE RETRIED, AND COUNTED
+    def test_retry_read(self):
+        #VARIABLES
+        calls = []
+        fetch_once = self._db._fetch_once
+        #FAIL THE FIRST ATTEMPT WITH A TRANSIENT ERROR
+        def flaky(sql, params=None):
+            calls.append(sql)
+            if len(calls) == 1: raise sqlite3.OperationalError('database is locked')
+            return fetch_once(sql=sql, params=params)
+        self._db._fetch_once = flaky
+        self._db.retry_policy = database.RetryPolicy(max_attempts=3, base_delay=0.01)
+        rows = self._db.fetch(sql='SELECT COUNT(*) FROM people')
+        stats = self._db.retry_stats()
+        #TEST
+        self.assertEqual(rows, [(3,)])
+        self.assertEqual(stats['read']['attempts'], 2)
+        self.assertEqual(stats['read']['retries'], 1)
+        self.assertEqual(stats['breaker']['state'], 'closed')
+        #A NON-TRANSIENT ERROR IS NOT RETRIED
+        self.assertRaises(sqlite3.OperationalError, self._db.fetch, sql='SELECT * FROM nowhere')
+        self.assertEqual(self._db.retry_stats()['read']['attempts'], 3)
+        #A WITH (CTE) WRITE IS NOT RETRIED
+        del calls[:]
+        self.assertRaises(sqlite3.OperationalError, self._db.fetch,
+                          sql='WITH x AS (SELECT 4) INSERT INTO people SELECT *, 0 FROM x')
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self._db.retry_stats()['read']['attempts'], 3)
+
+
+    #ONLY A TRANSIENT CONNECTION ERROR MUST BE RETRIED (NOT A REJECTED LOGIN)
+    def test_retry_connect(self):
+        for message, attempts, failures in (('ORA-01017: invalid username/password', 1, 0),
+                                            ('ORA-12541: TNS:no listener', 3, 1)):
+            #VARIABLES
+            db = database.SQLite(db_file_path=self._path)
+            db.retry_policy = database.RetryPolicy(max_attempts=3, base_delay=0.01)
+            def fail(creds, message=message):
+                raise sqlite3.OperationalError(message)
+            db._open_connection = fail
+            #CONNECT
+            db.connect()
+            stats = db.retry_stats()['connect']
+            #TEST
+            self.assertFalse(db.connected)
+            self.assertEqual(stats['attempts'], attempts)
+            self.assertEqual(stats['failures'], failures)
+
+
+    #THE CIRCUIT MUST OPEN AFTER REPEATED FAILURES, AND CLOSE AFTER A GOOD PROBE
+    def test_circuit_breaker(self):
+        #FAIL UNTIL OPEN
+        breaker = database.CircuitBreaker(threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        breaker.record_failure()
+        #TEST
+        self.assertEqual(breaker.state, 'open')
+        self.assertRaises(database.CircuitOpenError, breaker.allow)
+        #WAIT >> ONE PROBE ONLY
+        time.sleep(0.06)
+        breaker.allow()
+        self.assertRaises(database.CircuitOpenError, breaker.allow)
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+
+#-----------------------------------------------------------------------
+#MAIN PROGRAM CONTROLLER
+def main():
+
+    #RUN UNIT TESTS
+    unittest.main()
+
+
+#RUN PROGRAM
+if __name__ == '__main__': main()
@@ -0,0 +1,142 @@
+'''------------------------------------------------------------------------------------------------
+Program:    test_sqlscript
+Version:    0.0.1
+Py Ver:     2.7
+Purpose:    Unit testing module for the utils.sqlscript module.
+
+Dependents: os
+            sys
+            unittest
+            utils.sqlscript
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:   Pylint knowingly flags the following:
+                - C0413: utils.sqlscript import should be at top of module
+
+Use:        > cd /package_root/test
+            > python test_sqlscript.py
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.0.1       Written
+------------------------------------------------------------------------------------------------'''
+
+import os
+import sys
+import unittest
+
+#ENSURE UTILS IS IMPORTED FROM LOCAL DIRECTORY TREE, RELATIVE TO THIS FILE
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+import utils.sqlscript as sqlscript
+
+
+#UNIT TEST CLASS FOR THE SQLSCRIPT MODULE
+class TestSQLScript(unittest.TestCase):
+
+    #SEMICOLONS IN STRINGS AND COMMENTS MUST NOT SPLIT A STATEMENT
+    def test_quotes_and_comments(self):
+        #VARIABLES
+        script = ("-- leading; comment\n"
+                  "INSERT INTO t VALUES ('a;b', 'it''s');\n"
+                  "/* block; comment */\n"
+                  "SELECT /*+ hint */ a FROM t;  -- trailing; comment\n")
+        expected = ["INSERT INTO t VALUES ('a;b', 'it''s')",
+                    "SELECT /*+ hint */ a FROM t"]
+        #TEST
+        self.assertEqual(sqlscript.parse_script(script), expected)
+
+
+    #PROCEDURAL BLOCKS MUST BE KEPT WHOLE, INCLUDING THE FINAL SEMICOLON
+    def test_blocks(self):
+        #VARIABLES
+        script = ("BEGIN TRANSACTION;\n"
+                  "DECLARE\n"
+                  "  v NUMBER;\n"
+                  "BEGIN\n"
+                  "  IF v > 0 THEN v := 1; END IF;\n"
+                  "END;\n"
+                  "/\n"
+                  "CREATE OR REPLACE PACKAGE pk AS\n"
+                  "  PROCEDURE x;\n"
+                  "END pk;\n"
+                  "/\n"
+                  "SELECT 1\n")
+        stmts = sqlscript.parse_script(script)
+        #TEST
+        self.assertEqual(len(stmts), 4)
+        self.assertEqual(stmts[0], 'BEGIN TRANSACTION')
+        self.assertTrue(stmts[1].startswith('DECLARE') and stmts[1].endswith('END;'))
+        self.assertTrue(stmts[2].endswith('END pk;'))
+        self.assertEqual(stmts[3], 'SELECT 1')
+
+
+    #A NESTED SUBPROGRAM'S END MUST NOT END THE ENCLOSING BLOCK
+    def test_nested_subprograms(self):
+        #VARIABLES
+        script = ("CREATE OR REPLACE PROCEDURE p IS\n"
+                  "  CURSOR c IS SELECT a AS b FROM t;\n"
+                  "  FUNCTION f RETURN NUMBER;\n"
+                  "  PROCEDURE inner IS\n"
+                  "  BEGIN\n"
+                  "    NULL;\n"
+                  "  END;\n"
+                  "  FUNCTION f RETURN NUMBER IS BEGIN RETURN 1; END f;\n"
+                  "BEGIN\n"
+                  "  inner;\n"
+                  "END p;\n"
+                  "DECLARE\n"
+                  "  PROCEDURE q AS BEGIN NULL; END;\n"
+                  "BEGIN\n"
+                  "  q;\n"
+                  "END;\n"
+                  "CREATE PROCEDURE m()\n"
+                  "BEGIN\n"
+                  "  DECLARE x INT;\n"
+                  "  SELECT a AS x FROM t;\n"
+                  "END;\n"
+                  "SELECT 1\n")
+        stmts = sqlscript.parse_script(script)
+        #TEST
+        self.assertEqual(len(stmts), 4)
+        self.assertTrue(stmts[0].startswith('CREATE OR REPLACE PROCEDURE p') and
+                        stmts[0].endswith('END p;'))
+        self.assertTrue(stmts[1].startswith('DECLARE') and stmts[1].endswith('  q;\nEND;'))
+        self.assertTrue(stmts[2].startswith('CREATE PROCEDURE m') and stmts[2].endswith('END;'))
+        self.assertEqual(stmts[3], 'SELECT 1')
+
+
+    #WHITESPACE MUST ONLY BE COLLAPSED OUTSIDE QUOTED TEXT AND COMMENTS
+    def test_normalise(self):
+        #VARIABLES
+        sql = "SELECT  a,\n  [b  c]\nFROM t  -- it's\nWHERE d = 'x  y'  /* z  z */"
+        #TEST
+        self.assertEqual(sqlscript.normalise(sql),
+                         "SELECT a, [b  c] FROM t -- it's\nWHERE d = 'x  y' /* z  z */")
+        self.assertEqual(sqlscript.normalise("SELECT 'a\\'  b'", backslash_escapes=True),
+                         "SELECT 'a\\'  b'")
+        self.assertNotEqual(sqlscript.normalise("SELECT 'a  b'"),
+                            sqlscript.normalise("SELECT 'a b'"))
+
+
+    #STATEMENTS MUST BE YIELDED WITH THEIR STARTING LINE NUMBER
+    def test_lineno(self):
+        #VARIABLES
+        lines = ['SELECT 1;\n', '\n', 'SELECT\n', '2;\n']
+        #TEST
+        self.assertEqual(list(sqlscript.iter_statements(lines, with_lineno=True)),
+                         [(1, 'SELECT 1'), (3, 'SELECT\n2')])
+
+
+#-----------------------------------------------------------------------
+#MAIN PROGRAM CONTROLLER
+def main():
+
+    #RUN UNIT TESTS
+    unittest.main()
+
+
+#RUN PROGRAM
+if __name__ == '__main__': main()
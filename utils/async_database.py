@@ -0,0 +1,200 @@
+"""------------------------------------------------------------------------------------------------
+Program:    async_database
+Py Ver:     3.7+
+Purpose:    This class module provides an asyncio facade over the utils.database classes, so the
+            (blocking) database wrappers can be used from an event loop without stalling it.
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:   This module requires Python 3.7+ (asyncio.get_running_loop() and asynchronous
+            generators), so is kept separate from the database module, which requires Python
+            3.4+.
+
+Use:        >>> import utils.database as db
+            >>> from utils.async_database import AsyncDatabase
+            >>>
+            >>> ora = db.Oracle(host='my_host', user='my_user', password='my_pass')
+            >>> ora.connect()
+            >>>
+            >>> async with AsyncDatabase(db=ora, max_workers=8) as adb:
+            >>>     rows = await adb.fetch('SELECT * FROM my_table WHERE id = :1', (1,))
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written
+------------------------------------------------------------------------------------------------"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+
+class AsyncDatabase(object):
+
+    """
+    PURPOSE:
+    This class is an asyncio facade over a connected MySQL, Oracle,
+    SQLite or SQLServer object.
+
+    DESIGN:
+    Each driver call is run on a bounded thread pool executor, so the
+    event loop is never blocked.  As each worker thread needs its own
+    connection, a connection pool (of max_workers connections) is
+    opened on the database object if one is not already open.
+
+    Back-pressure is applied using a semaphore, which limits the number
+    of driver calls in flight to max_pending; further calls wait on the
+    event loop (not in the executor queue) until a slot is free.
+
+    PARAMETERS:
+    - db
+    A connected utils.database object (e.g. Oracle, SQLServer).
+    - max_workers (default 4)
+    Number of executor threads (and pooled connections).
+    - max_pending (default None)
+    Maximum number of driver calls in flight.  If None, max_workers is
+    used.
+
+    USE:
+    > async with AsyncDatabase(db=ora, max_workers=8) as adb:
+    >     # SINGLE QUERY
+    >     rows = await adb.fetch('SELECT * FROM my_table WHERE id = :1', (1,))
+    >
+    >     # STREAMED QUERY
+    >     async for row in adb.stream('SELECT * FROM big_table', batch_size=5000):
+    >         ...
+    >
+    >     # CONCURRENT QUERIES
+    >     a, b = await adb.gather('SELECT * FROM a', ('SELECT * FROM b WHERE x = :1', (1,)))
+    """
+
+    # ------------------------------------------------------------------
+    def __init__(self, db, max_workers=4, max_pending=None):
+
+        # INITIALISE
+        self._db        = db
+        self._executor  = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending   = max_pending or max_workers
+        self._sem       = None
+
+        # OPEN A POOL, SO EACH WORKER HAS ITS OWN CONNECTION
+        if db.pool_stats() is None:
+            db.open_pool(min_size=1, max_size=max_workers)
+
+    # ------------------------------------------------------------------
+    async def __aenter__(self):
+        return self
+
+    # ------------------------------------------------------------------
+    async def __aexit__(self, *args):
+        await self.close()
+
+    # ------------------------------------------------------------------
+    async def close(self):
+        """Shut down the executor, once all running calls are complete.
+
+        The database object (and its pool) is left open.
+        """
+
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    # ------------------------------------------------------------------
+    async def fetch(self, sql, params=None):
+        """
+        Execute a query on the executor, and return all rows as a list.
+
+        PARAMETERS:
+        - sql
+        The SQL query to be executed.
+        - params (default None)
+        Parameters to be bound, using the driver's parameter style.
+        """
+
+        return await self.run(self._db.fetch, sql, params)
+
+    # ------------------------------------------------------------------
+    async def gather(self, *queries, return_exceptions=False):
+        """
+        Run several independent queries concurrently, and return a list
+        of results (one list of rows per query) in the order passed.
+
+        DESIGN:
+        All queries are scheduled at once, and the max_pending limit
+        controls how many are sent to the database at the same time.
+
+        PARAMETERS:
+        - *queries
+        Each query is either an SQL string, or a tuple of
+        (sql, params).
+        - return_exceptions (default False)
+        Return an exception in place of a query's result, rather than
+        raising the first exception.
+        """
+
+        # BUILD A FETCH FOR EACH QUERY
+        fetches = [self.fetch(query) if isinstance(query, str) else self.fetch(*query)
+                   for query in queries]
+
+        return await asyncio.gather(*fetches, return_exceptions=return_exceptions)
+
+    # ------------------------------------------------------------------
+    async def run(self, func, *args):
+        """
+        Run a blocking function on the executor, within the max_pending
+        limit, and return its result.
+
+        This can be used for any other database method; for example:
+        > await adb.run(db.insert_many, 'my_table', ['id'], rows)
+        """
+
+        async with self._semaphore():
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # ------------------------------------------------------------------
+    async def stream(self, sql, params=None, batch_size=1000):
+        """
+        Asynchronous generator which executes a query and yields the
+        result set, one row at a time.
+
+        DESIGN:
+        The query is streamed using the database object's iter_query()
+        method, and each batch of rows is read on the executor; so only
+        one batch is held in memory, and the event loop is only used
+        to hand rows to the consumer.
+
+        PARAMETERS:
+        - sql
+        The SQL query to be executed.
+        - params (default None)
+        Parameters to be bound, using the driver's parameter style.
+        - batch_size (default 1000)
+        Number of rows read in each executor call.
+        """
+
+        # INITIALISE
+        rows = self._db.iter_query(sql=sql, params=params, batch_size=batch_size)
+
+        try:
+            while True:
+                # READ THE NEXT BATCH ON THE EXECUTOR
+                batch = await self.run(lambda: list(islice(rows, batch_size)))
+                if not batch: break
+                for row in batch: yield row
+        finally:
+            # RELEASE THE CURSOR AND CONNECTION
+            await self.run(rows.close)
+
+    # ------------------------------------------------------------------
+    def _semaphore(self):
+        """
+        Return the semaphore limiting the calls in flight.
+
+        The semaphore is created on first use, so it belongs to the
+        running event loop.
+        """
+
+        if self._sem is None: self._sem = asyncio.Semaphore(self._pending)
+
+        return self._sem
@@ -1,6 +1,6 @@
 """------------------------------------------------------------------------------------------------
 Program:    database
-Py Ver:     2.7
+Py Ver:     3.4+
 Purpose:    This class module is a lightweight wrapper to help make database connection and
             interfacing easier.
 
@@ -22,12 +22,188 @@ Date        Programmer      Version     Update
 21.12.17                                Added the MySQL() class.
                                         Added the SQLite() class.  pylint (10/10)
 05.03.18    J. Berendt      0.1.1       Added __future__ import to support Python 2/3.
+18.10.26    J. Berendt      0.2.0       Added the ConnectionPool() class and a pooled mode on the
+                                        Database() class; open_pool(), close_pool(), checkout()
+                                        and pool_stats().
+                                        Added an _open_connection() method to each sub-class, so
+                                        additional connections can be created from the stored
+                                        credentials.
+18.10.26    J. Berendt      0.3.0       Added the iter_query() generator, which streams a result
+                                        set using fetchmany(); using an unbuffered cursor for
+                                        MySQL.
+18.10.26    J. Berendt      0.4.0       Added the insert_many() method for batched bulk inserts
+                                        through executemany().
+18.10.26    J. Berendt      0.5.0       Moved execute_script() from the Oracle() class into the
+                                        Database() class, so it is available for all databases.
+                                        Scripts are now split by the streaming utils.sqlscript
+                                        tokenizer, which understands quotes, comments and
+                                        procedural blocks, and reads the script line by line.
+                                        Updated _parse_script() to use the sqlscript tokenizer.
+18.10.26    J. Berendt      0.6.0       Added a commit policy to execute_script(); commit once at
+                                        the end (default), every n statements, or every n seconds.
+                                        On failure, the transaction is rolled back to the last
+                                        commit and the failing statement is reported.
+                                        Replaced _execute_commit() with _run_script().
+18.10.26    J. Berendt      0.7.0       Added the execute() and fetch() methods, which always bind
+                                        parameters and reuse prepared cursors from a per-connection
+                                        LRU statement cache (the _StatementCache() class).
+                                        Updated all table_exists() methods to bind the table name
+                                        using fetch(), rather than building the SQL string.
+                                        Removed the MySQL._table_exists() override.
+18.10.26    J. Berendt      0.8.0       Added a metadata cache, loaded from the database catalog in
+                                        a single query, with a TTL and explicit invalidation.
+                                        Added tables_exist(), columns(), column_types() and
+                                        invalidate_metadata().
+                                        Moved table_exists() into the Database() class, using the
+                                        metadata cache; each sub-class now provides its catalog
+                                        query as the _CATALOG_SQL attribute.
+18.10.26    J. Berendt      0.9.0       Added an opt-in query result cache (the _ResultCache()
+                                        class) for fetch(); with LRU entry and byte limits, a per-
+                                        query TTL, and invalidation on writes through the wrapper.
+                                        Added enable_result_cache(), disable_result_cache() and
+                                        result_cache_stats().
+18.10.26    J. Berendt      0.10.0      Added per-statement instrumentation (the _QueryStats()
+                                        class); latency histogram, rows and bytes per normalised
+                                        statement, and connection acquire time.
+                                        Added query_stats(), reset_query_stats() and
+                                        enable_slow_query_log(), which writes statements slower
+                                        than a threshold to a CSV file using utils.log.Log().
+18.10.26    J. Berendt      0.11.0      Added the RetryPolicy() and CircuitBreaker() classes.
+                                        Connections (including pooled connections) and read
+                                        queries through fetch() are retried with exponential
+                                        backoff and jitter, and fail fast through a per-DSN
+                                        circuit breaker while the target is down.
+                                        Added retry_stats().
+18.10.26    J. Berendt      0.12.0      Added fetch_columns(), which fills typed NumPy arrays
+                                        batch by batch and returns a pandas DataFrame, without
+                                        building a list of row tuples.
+18.10.26    J. Berendt      0.13.0      Added write_dataframe(), which creates the target table
+                                        from the DataFrame's data types (the _DDL_TYPES class
+                                        attribute) and loads it in chunks, with one transaction
+                                        per chunk; optionally cleaned using utils.clean_df().
+18.10.26    J. Berendt      0.14.0      Added export_csv(), which streams a query to a (optionally
+                                        gzipped) CSV file, with fetching and writing overlapped
+                                        on separate threads.
+18.10.26    J. Berendt      0.15.0      Added SQLite.load_csv(), a streaming CSV bulk loader with
+                                        column type inference, and the journal_mode and
+                                        synchronous settings relaxed for the load.
+18.10.26    J. Berendt      0.16.0      Added named performance profiles (read_heavy, bulk_load,
+                                        concurrent) and explicit PRAGMA settings to the SQLite()
+                                        class, applied to each new connection.
+                                        Added SQLite.settings().
+18.10.26    J. Berendt      0.17.0      Added an in-memory mirror mode to the SQLite() class; the
+                                        file is copied into a shared in-memory database using the
+                                        backup API, and optionally re-synced when the file
+                                        changes.  Added SQLite.resync().
+18.10.26    J. Berendt      0.18.0      Added a thread-local connection mode and a read-only
+                                        (mode=ro URI) mode to the SQLite() class.
+18.10.26    J. Berendt      0.19.0      Added SQLite.parallel_map(), which scans a table in key
+                                        ranges across a pool of worker processes.
+18.10.26    J. Berendt      0.20.0      Added parallel_extract(), which extracts a table in key
+                                        ranges over several connections at once; as a single
+                                        (ordered or unordered) row stream, or to a CSV file per
+                                        partition, with per-partition timing.
+                                        Moved _close_connection() to the Database() class.
+18.10.26    J. Berendt      0.21.0      Added the copy_table() function; a streaming table (or
+                                        query) copy between any two database objects, with the
+                                        target created using mapped column types.
+18.10.26    J. Berendt      0.22.0      Added the BufferedWriter() class; a background,
+                                        write-behind batch inserter with back-pressure.
+18.10.26    J. Berendt      0.23.0      Added opt-in single-flight fetch() queries, where
+                                        concurrent identical queries share one execution.
+18.10.26    J. Berendt      0.24.0      Added Database.snapshot(); query results materialised
+                                        into a local SQLite file, and reused until the TTL
+                                        expires.  Added params to copy_table().
+18.10.26    J. Berendt      0.25.0      Added Database.extract_incremental() and the
+                                        IncrementalExtract() class; high-watermark extracts
+                                        with the watermark saved to a JSON or SQLite file.
+18.10.26    J. Berendt      0.26.0      Python 3.4+ is required (atomic file replacement, text
+                                        mode gzip files and SQLite URI connections); removed the
+                                        __future__ import and the Python 2 import fallbacks.
 ------------------------------------------------------------------------------------------------"""
 
-from __future__ import absolute_import, print_function
+import csv
+import datetime
+import gzip
+import io
+import multiprocessing
+import os
+import queue
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from decimal import Decimal
+from functools import partial, reduce
+from itertools import chain, islice
+from urllib.request import pathname2url
+import utils.log as log
 import utils.utils as utils
+import utils.sqlscript as sqlscript
 import utils.user_interface as ui
 
+# DDL STATEMENTS WHICH INVALIDATE THE METADATA CACHE
+_RE_DDL = re.compile(r'\s*(?:CREATE|ALTER|DROP|RENAME)\b', re.IGNORECASE)
+# STATEMENTS WHICH DO NOT WRITE TO THE DATABASE (A WITH STATEMENT IS TESTED BY _is_read())
+_RE_READ = re.compile(r'\s*(SELECT|WITH|SHOW|DESCRIBE|DESC|EXPLAIN|PRAGMA)\b', re.IGNORECASE)
+# DATA-MODIFYING KEYWORDS WHICH MAKE A WITH (CTE) STATEMENT A WRITE
+_RE_CTE_WRITE = re.compile(r'\b(?:INSERT|UPDATE|DELETE|MERGE)\b', re.IGNORECASE)
+# QUOTED TEXT AND COMMENTS, IGNORED WHEN CLASSIFYING A STATEMENT
+_RE_QUOTED = re.compile(r"""'[^']*'|"[^"]*"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?\*/""", re.DOTALL)
+# THE TABLE WRITTEN BY A STATEMENT
+_RE_WRITE_TABLE = re.compile(r'\s*(?:INSERT\s+(?:INTO\s+)?|REPLACE\s+(?:INTO\s+)?|UPDATE\s+|'
+                             r'DELETE\s+(?:FROM\s+)?|MERGE\s+INTO\s+|TRUNCATE\s+TABLE\s+|'
+                             r'(?:DROP|ALTER)\s+TABLE\s+(?:IF\s+EXISTS\s+)?)'
+                             r'([\w$#.`"\[\]]+)', re.IGNORECASE)
+# WORDS (E.G. TABLE NAMES) WITHIN A STATEMENT
+_RE_WORDS = re.compile(r'[A-Z_][A-Z0-9_$#]*')
+# VALID (SQLITE) PRAGMA VALUE
+_RE_PRAGMA_VALUE = re.compile(r'^-?\w+$')
+# VALID SNAPSHOT (LOCAL TABLE) NAME; A LEADING UNDERSCORE IS RESERVED (E.G. _SNAPSHOTS)
+_RE_SNAPSHOT_NAME = re.compile(r'^[A-Za-z]\w*$')
+# FILE EXTENSIONS OF A SQLITE WATERMARK STATE FILE
+_SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+# WATERMARK TYPES STORED AS TEXT, AND THEIR TEXT FORMAT
+_WATERMARK_FORMATS = {'datetime': '%Y-%m-%dT%H:%M:%S.%f', 'date': '%Y-%m-%d'}
+# TRANSIENT ERRORS (NETWORK, TIMEOUT, LOCK AND DEADLOCK) WHICH ARE WORTH RETRYING
+_RE_TRANSIENT = re.compile(r'time[d ]?\s*out|connection (?:reset|refused|lost|closed|aborted)|'
+                           r'lost connection|gone away|broken pipe|network|temporar|'
+                           r"can't connect to|"
+                           r'database is (?:locked|busy)|deadlock|lock wait|'
+                           r'ORA-(?:00060|03113|03114|03135|12170|12514|12537|12541|12543)|'
+                           r'\b(?:08S01|08001|40613|HYT00|HYT01)\b', re.IGNORECASE)
+# LITERAL VALUES, REPLACED WHEN NORMALISING A STATEMENT FOR STATISTICS
+_RE_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+# NUMPY DATA TYPES FOR PYTHON (E.G. PYODBC) AND MYSQL FIELD TYPE CODES
+_PYTYPE_DTYPES = {int: 'int64', float: 'float64', Decimal: 'float64'}
+_MYSQL_DTYPES = {0: 'float64', 1: 'int64', 2: 'int64', 3: 'int64', 4: 'float64',
+                 5: 'float64', 8: 'int64', 9: 'int64', 246: 'float64'}
+
+# NUMPY DATA TYPE KINDS FOR DATABASE COLUMN TYPE NAMES
+_SQL_KINDS = dict([(name, 'b') for name in ('BIT', 'BOOL', 'BOOLEAN')] +
+                  [(name, 'i') for name in ('BIGINT', 'BINARY_INTEGER', 'INT', 'INT2', 'INT4',
+                                            'INT8', 'INTEGER', 'MEDIUMINT', 'PLS_INTEGER',
+                                            'SMALLINT', 'TINYINT')] +
+                  [(name, 'f') for name in ('BINARY_DOUBLE', 'BINARY_FLOAT', 'DEC', 'DECIMAL',
+                                            'DOUBLE', 'FLOAT', 'FLOAT4', 'FLOAT8', 'MONEY',
+                                            'NUMBER', 'NUMERIC', 'REAL', 'SMALLMONEY')] +
+                  [(name, 'M') for name in ('DATE', 'DATETIME', 'DATETIME2', 'DATETIMEOFFSET',
+                                            'SMALLDATETIME', 'TIME', 'TIMESTAMP')])
+
+# CIRCUIT BREAKERS, SHARED BY ALL CONNECTIONS TO THE SAME DSN
+_BREAKERS = dict()
+_BREAKERS_LOCK = threading.Lock()
+
+# IN-FLIGHT SINGLE-FLIGHT QUERIES, SHARED BY ALL CONNECTIONS TO THE SAME DSN
+_FLIGHTS = dict()
+_FLIGHTS_LOCK = threading.Lock()
+
 # ALLOW ANY NUMBER OF PUBLIC METHODS
 # pylint: disable=too-few-public-methods
 # ALLOW ANY NUMBER OF INSTANCE ATTRIBUTES
@@ -42,6 +218,18 @@ class Database(object):
     functions used by the more specific sub-classes.
     """
 
+    # SQL STATEMENT USED TO TEST A CONNECTION IS ALIVE
+    _PING_SQL = 'SELECT 1'
+    # DB-API PARAMETER STYLE USED BY THE DRIVER
+    _PARAMSTYLE = 'qmark'
+    # A BACKSLASH ESCAPES A QUOTE CHARACTER WITHIN A STRING LITERAL
+    _BACKSLASH_ESCAPES = False
+    # QUERY RETURNING (TABLE, COLUMN, DATA TYPE) FOR ALL TABLES
+    _CATALOG_SQL = None
+    # COLUMN DATA TYPES FOR A NUMPY DATA TYPE KIND, USED TO CREATE A TABLE
+    _DDL_TYPES = {'b': 'SMALLINT', 'i': 'BIGINT', 'u': 'BIGINT', 'f': 'DOUBLE PRECISION',
+                  'M': 'TIMESTAMP', 'O': 'VARCHAR(4000)'}
+
     # ------------------------------------------------------------------
     def __init__(self):
 
@@ -49,519 +237,1188 @@ class Database(object):
         self.conn       = None
         self.cur        = None
         self.connected  = False
+        self._creds     = None
+        self._pool      = None
+        self._lock      = threading.Lock()
+        self._stmts     = dict()
+        self._meta      = None
+        self._meta_time = 0
+        self._meta_lock = threading.Lock()
+        self._results   = None
+        self._flights   = None
+        self._qstats    = _QueryStats()
+        self._slow_log  = None
+        self._slow_secs = None
+        self._retries   = dict(connect=_retry_counters(), read=_retry_counters())
         self._ui        = ui.UserInterface()
+        # RETRY POLICY FOR CONNECTIONS AND READ QUERIES
+        self.retry_policy = RetryPolicy()
+        # CONSECUTIVE FAILURES WHICH OPEN THE CIRCUIT, AND SECONDS BEFORE A PROBE
+        self.breaker_threshold = 5
+        self.breaker_reset = 30
+        # NUMBER OF PREPARED CURSORS CACHED PER CONNECTION
+        self.statement_cache_size = 50
+        # NUMBER OF SECONDS THE METADATA CACHE IS VALID
+        self.metadata_ttl = 300
+
+    # ------------------------------------------------------------------
+    @contextmanager
+    def checkout(self):
+        """
+        Context manager which provides a database connection for the
+        duration of the with block.
+
+        DESIGN:
+        If a connection pool has been opened using open_pool(), a
+        connection is borrowed from the pool and returned on exit.
+        Any uncommitted work is rolled back as the connection is
+        returned, so commit inside the with block.
+
+        If a pool is *not* open, the class' own connection (.conn) is
+        provided, and left untouched on exit.
+
+        USE:
+        > with db.checkout() as conn:
+        >     cur = conn.cursor()
+        >     cur.execute('SELECT COUNT(*) FROM my_table')
+        >     count = cur.fetchall()[0][0]
+        """
+
+        # TEST FOR AN OPEN POOL
+        if self._pool is None:
+            yield self.conn
+        else:
+            # BORROW A CONNECTION >> RECORD THE ACQUIRE TIME
+            start = time.time()
+            conn = self._pool.acquire()
+            self._qstats.record_acquire(seconds=time.time() - start)
+            try:
+                yield conn
+            finally:
+                self._pool.release(conn)
+
+    # ------------------------------------------------------------------
+    def close_pool(self):
+        """Close the connection pool, and all connections it holds."""
+
+        # TEST FOR AN OPEN POOL >> CLOSE
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    # ------------------------------------------------------------------
+    def column_types(self, table_name):
+        """
+        Return an ordered dictionary of column name and data type for
+        a table, or None if the table does not exist.
+
+        DESIGN:
+        The column details are served from the metadata cache.  Refer
+        to the table_exists() method for details.
+
+        PARAMETERS:
+        - table_name
+        The name of the table (not case sensitive).
+        """
+
+        # GET THE TABLE FROM THE METADATA CACHE
+        table = self._metadata().get(table_name.upper())
+
+        return None if table is None else OrderedDict(table)
+
+    # ------------------------------------------------------------------
+    def columns(self, table_name):
+        """
+        Return a list of column names for a table, or None if the table
+        does not exist.
+
+        PARAMETERS:
+        - table_name
+        The name of the table (not case sensitive).
+        """
+
+        # GET THE TABLE FROM THE METADATA CACHE
+        table = self._metadata().get(table_name.upper())
+
+        return None if table is None else list(table.keys())
 
     # ------------------------------------------------------------------
     def disconnect(self):
         """
         Disconnect a database connection, and change the .connected
         property to False.
+
+        If a connection pool is open, the pool is also closed.
         """
 
+        # CLOSE THE CONNECTION POOL
+        self.close_pool()
         # CLOSE THE DATABASE CONNECTION
+        self._forget_connection(conn=self.conn)
         self.conn.close()
         self.connected = False
 
+    # ------------------------------------------------------------------
+    def disable_result_cache(self):
+        """Disable the query result cache, and clear its entries."""
+
+        self._results = None
 
     # ------------------------------------------------------------------
-    @staticmethod
-    def _parse_script(script_string):
-        r"""
-        Return a list of SQL statements which were parsed from the
-        script_string value.
+    def disable_single_flight(self):
+        """Disable single-flight queries, and clear their statistics."""
 
-        DESIGN:
-        The design is very simple in that a list of statements is
-        created and returned using a split() function on the ';'
-        character.
+        self._flights = None
+
+    # ------------------------------------------------------------------
+    def enable_result_cache(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl=300):
+        """
+        Enable an in-process cache of query results for the fetch()
+        method.
 
-        Additionally, parsed statements containing *only* the newline
-        character (\n) are removed.  Also, the newline character is
-        removed from a line starting with the newline character.
+        DESIGN:
+        Results are keyed by the normalised SQL text (whitespace
+        collapsed, except within quoted strings) and the parameters.
+        The least recently used entries are evicted once either the
+        max_entries or max_bytes (an estimate of the rows' memory)
+        limit is reached, and each entry expires after its TTL.
+
+        When a write (INSERT, UPDATE, DELETE, etc.) to a table is run
+        through this class (e.g. execute(), execute_script(),
+        insert_many()), all cached results referring to that table are
+        cleared.  If the written table cannot be determined (e.g. a
+        procedure call), the whole cache is cleared.  Writes made
+        outside this class (or by another process) are *not* detected;
+        so use the TTL to bound staleness.
 
         PARAMETERS:
-        - script_string
-        The string value of the script to be parsed.
+        - max_entries (default 256)
+        Maximum number of cached results.
+        - max_bytes (default 64 MB)
+        Maximum estimated size of all cached results, in bytes.
+        - ttl (default 300)
+        Default number of seconds a result is cached.
+
+        USE:
+        > db.enable_result_cache(max_entries=1000, ttl=600)
+        > rows = db.fetch('SELECT * FROM ref_currency')           # FROM THE DATABASE
+        > rows = db.fetch('SELECT * FROM ref_currency')           # FROM THE CACHE
+        > db.result_cache_stats()
         """
 
-        # PARSE THE SCRIPT INTO INDIVIDUAL STATEMENTS
-        cmds = [line for line in script_string.split(';')]
+        self._results = _ResultCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
 
-        # LOOP THROUGH EACH STATEMENT
-        for idx, cmd in enumerate(cmds):
-            # TEST FOR NEWLINE CHAR LINES >> REMOVE THEM
-            if cmd == '\n':
-                cmds.pop(idx)
-            # TEST FOR STATEMENTS STARTWITH WITH A NEWLINE CHARACTER
-            elif cmd.startswith('\n'):
-                # SLICE TO REMOVE THE STARTING NEWLINE CHARACTER
-                cmds[idx] = cmd[1:]
+    # ------------------------------------------------------------------
+    def enable_single_flight(self):
+        """
+        Enable single-flight read queries for the fetch() method.
 
-        # RETURN THE CLEANED LIST OF STATEMENTS
-        return cmds
+        DESIGN:
+        While a read query (e.g. SELECT) is running, any other caller
+        (in any thread, using any database object for the same DSN)
+        running the same query waits for the running query and shares
+        its rows, rather than sending a duplicate query to the
+        database.  Queries are matched on the normalised SQL text
+        (whitespace collapsed, except within quoted strings) and the
+        parameters.  Each caller receives its own copy of the row
+        list; if the query fails, each waiting caller raises the same
+        exception.
+
+        Unlike the result cache, nothing is kept once the query
+        completes; so a later call always runs the query again.  If
+        the result cache is also enabled, only cache misses are
+        shared.
+
+        Single-flight is only used by database objects on which it has
+        been enabled.
+
+        USE:
+        > db.enable_single_flight()
+        > rows = db.fetch('SELECT * FROM ref_currency')     # CALLED BY MANY THREADS AT ONCE
+        > db.single_flight_stats()
+        """
 
+        self._flights = dict(queries=0, shared=0)
 
     # ------------------------------------------------------------------
-    def _table_exists(self, sql):
+    def enable_slow_query_log(self, filepath, threshold=1.0):
         """
-        Run the passed sql statement to test if a table exists, and
-        return the result as a boolean value.
+        Log each statement which takes longer than the threshold to a
+        CSV file.
+
+        DESIGN:
+        The log is written using the utils.log.Log() class, so each
+        entry is prefixed with the datetime, host and user name; and is
+        followed by the duration (seconds), row count and the
+        statement.  The header is written when the file is created.
+
+        PARAMETERS:
+        - filepath
+        Full path to the CSV log file.
+        - threshold (default 1.0)
+        Statements taking this number of seconds (or longer) are
+        logged.  Use None to disable the log.
+
+        USE:
+        > db.enable_slow_query_log(filepath='/path/to/slow_queries.csv', threshold=0.5)
         """
 
-        try:
-            # RUN QUERY >> CONVERT RESULT TO BOOLEAN
-            return bool(self.cur.execute(sql).fetchall()[0][0])
+        # TEST IF THE LOG IS TO BE DISABLED
+        if threshold is None:
+            self._slow_log = None
+            return
 
-        except Exception as err:
-            # USER NOTIFICATION
-            self._ui.print_error(err)
+        self._slow_secs = threshold
+        self._slow_log = log.Log(filepath=filepath, autofill=True, printheader=True,
+                                 headertext='datetime,host,user,seconds,rows,statement')
 
+    # ------------------------------------------------------------------
+    def execute(self, sql, params=None, commit=False):
+        """
+        Execute an SQL statement on the class' connection, binding the
+        passed parameters, and return the cursor.
 
-# ----------------------------------------------------------------------
-class MySQL(Database):
+        DESIGN:
+        Values should always be passed using the params argument
+        (rather than being formatted into the SQL string), using the
+        driver's parameter style:
+            - MySQL:        %s
+            - Oracle:       :1, :2 (or :name, with a dictionary)
+            - SQLite:       ?
+            - SQL Server:   ?
+
+        A prepared cursor is kept for each distinct SQL statement in a
+        per-connection LRU cache (of statement_cache_size cursors), so
+        a repeated statement is not parsed by the server again.  As
+        the cursor is reused, its results must be read before the same
+        statement is executed again.
+
+        Exceptions are raised to the caller.
 
-    """
-    PURPOSE:
-    This class is a lightweight wrapper for mysql-connector, and used
-    to handle database objects for MySQL.
+        PARAMETERS:
+        - sql
+        The SQL statement to be executed.
+        - params (default None)
+        Sequence (or dictionary) of parameters to be bound.
+        - commit (default False)
+        Commit the transaction after the statement is executed.
 
-    PARAMETERS:
-    - host (default None)
-    IP address or machine name of the host or database server.
-    - database (default None)
-    The name of the database to be connected.
-    - user (default None)
-    Login: user name
-    - password (default None)
-    Login: password
-    - port (default 3306)
-    The TCP/IP port of the MySQL server; must be an integer.
-    - from_file (default False)
-    Load the database credentials from a config file.
-      - valid keys: host, database, port, user, password
-    - filename (default None)
-    Full path to the file holding the database credentials.
+        USE:
+        > cur = db.execute(sql='UPDATE my_table SET name = ? WHERE id = ?',
+        >                  params=('x', 1), commit=True)
+        > cur.rowcount
+        """
 
-    DEPENDENCIES:
-    - mysql-connector (2.1.4)
-    Installation: > pip install mysql-connector==2.1.4
+        # EXECUTE THE PREPARED CURSOR
+        start = time.time()
+        cur = self._statements(conn=self.conn).cursor(sql=sql, params=params)
+        self._execute_prepared(cur=cur, sql=sql, params=params)
+        # COMMIT?
+        if commit: self.conn.commit()
+        self._record(sql=sql, seconds=time.time() - start, rows=max(cur.rowcount, 0))
+        # CLEAR CACHES AFFECTED BY THE STATEMENT
+        self._after_statement(sql=sql)
 
-    USE:
-    > from utils.database import MySQL
-    >
-    > # LOAD CREDENTIALS
-    > sql = MySQL(host='my_host', database='my_db',
-                  user='my_user', password='my_pass')
-    >
-    > # CONNECT TO THE DB
-    > sql.connect()
-    > # CHECK CONNECTION WAS SUCCESSFUL
-    > sql.connected
-    > True
-    """
+        return cur
 
     # ------------------------------------------------------------------
-    def __init__(self, host=None, database=None, user=None,
-                 password=None, port=3306, from_file=False,
-                 filename=None):
+    def execute_script(self, sql_file, commit=False, commit_every=None, commit_interval=None):
+        """
+        Execute a full SQL script on the database.
 
-        # INHERIT SUPER-CLASS PROPERTIES
-        super(MySQL, self).__init__()
-        # INITIALISE
-        self._host      = host
-        self._database  = database
-        self._user      = user
-        self._password  = password
-        self._port      = port
-        self._from_file = from_file
-        self._filename  = filename
+        DESIGN:
+        This method is designed to handle a full SQL script consisting
+        of multiple SQL statements, as most database drivers cannot
+        natively handle this.
+
+        The script is read line by line, and split into individual
+        statements by the utils.sqlscript tokenizer; which understands
+        quoted strings, comments, procedural (BEGIN ... END;) blocks
+        and '/' or 'GO' terminator lines.  Each statement is executed
+        as soon as it has been read, so the script is never held in
+        memory.
+
+        COMMIT POLICY:
+        If commit is True, the work is committed once, at the end of
+        the script; unless a checkpoint is requested using the
+        commit_every and/or commit_interval parameters.  To commit
+        after every statement, use commit_every=1.
+
+        Execution stops at the first statement which fails.  If commit
+        is True, the transaction is rolled back to the last checkpoint,
+        and the failing statement (number, line and text) is reported.
+        Note that most databases (aside from SQLite and SQL Server)
+        implicitly commit on DDL statements.
+
+        PARAMETERS:
+        - sql_file
+        The full file path to the script to be run.
+        - commit (default False)
+        Boolean flag to execute a commit.
+        - commit_every (default None)
+        Commit after every n statements.
+        - commit_interval (default None)
+        Commit after a statement, if n seconds have passed since the
+        last commit.
+
+        USE:
+        > db.execute_script(sql_file='/path/to/seed.sql', commit=True, commit_every=5000)
+        """
+
+        try:
+            # INITIALISE
+            success = False
 
+            # TEST IF THE FILE EXISTS
+            if utils.fileexists(sql_file):
+                with open(sql_file) as script:
+                    # RUN EACH STATEMENT AS IT IS PARSED
+                    success = self._run_script(script=script, commit=commit,
+                                               commit_every=commit_every,
+                                               commit_interval=commit_interval)
+
+        except Exception as err:
+            success = False
+            self._ui.print_error(err)
+
+        return success
 
     # ------------------------------------------------------------------
-    def connect(self):
+    def export_csv(self, sql, path, params=None, batch_size=10000, compress=None,
+                   header=True, delimiter=',', encoding='utf-8', threaded=True):
         """
-        Connect to the database.  Update class properties accordingly.
+        Stream the result of a query to a CSV file, and return a
+        dictionary of export statistics.
 
         DESIGN:
-        Function designed to create a connection to a MySQL database
-        using the provided login parameters, or directly from a config
-        file. If a login detail is not provided, the user is prompted;
-        which can be used as a security feature.
+        Rows are fetched in batches using fetchmany(), and each batch
+        is written using the csv module's writer; so only a few batches
+        are held in memory at a time, regardless of the result size.
 
-        NOTE: To prompt for login details, leave the parameter(s)
-        blank.
+        If threaded is True, batches are fetched on a reader thread and
+        passed to the writer through a small bounded queue; so the
+        next batch is read from the database while the previous batch
+        is being written (and compressed), and a slow disk applies
+        back-pressure to the reader.
 
-        Working in the background for the credential validation and
-        handling the actual database connection, are several other
-        functions which can be found in the utils module.
+        On error, the partial file is removed and None is returned.
 
-        SOURCE:
-        The connection argument keys for a MySQL connection using the
-        mysql.connection library, are listed here:
-        https://dev.mysql.com/doc/connector-python/en/connector-python-connectargs.html
+        PARAMETERS:
+        - sql
+        The SQL query to be executed.
+        - path
+        Full path to the CSV file to be written.
+        - params (default None)
+        Parameters to be bound to the query, using the driver's
+        parameter style.
+        - batch_size (default 10000)
+        Number of rows fetched from the database in each round trip.
+        - compress (default None)
+        Use 'gzip' to write a gzip compressed file.
+        - header (default True)
+        Write the column names as the first line.
+        - delimiter (default ',')
+        Field delimiter character.
+        - encoding (default 'utf-8')
+        Text encoding of the file.
+        - threaded (default True)
+        Overlap fetching and writing on separate threads.
+
+        RETURN KEYS:
+        - rows:         Number of rows written.
+        - seconds:      Time taken for the export.
+        - rows_per_sec: Rows written per second.
+        - bytes:        Size of the written file, in bytes.
+
+        USE:
+        > db.export_csv(sql='SELECT * FROM sales', path='/tmp/sales.csv.gz', compress='gzip')
+        > {'rows': 1000000, 'seconds': 6.2, 'rows_per_sec': 161290.3, 'bytes': 18874368}
         """
 
-        try:
-            # INITIALISE
-            creds = dict()
-            dbtype = 'mysql'
+        # VALIDATION
+        if compress not in (None, 'gzip'):
+            self._ui.print_alert('\nThe compress argument must be None or \'gzip\'.')
+            return None
 
-            # TEST IF A CONFIG FILE IS TO BE USED
-            if self._from_file:
-                # DEFINE CREDENTIAL KEYS
-                db_keys = ['host', 'database', 'port', 'user', 'password']
-                # GET CREDENTIALS FROM THE CONFIG FILE
-                creds = utils._dbconn_fields(dbtype=dbtype, fields=db_keys,
-                                             filename=self._filename)
-            else:
-                # GET CREDENTIALS FROM PASSED PARAMETERS
-                creds = utils._dbconn_params(dbtype=dbtype, host=self._host,
-                                             database=self._database, user=self._user,
-                                             password=self._password)
+        # INITIALISE
+        start = time.time()
+        count = 0
+        partial = False
 
-            # TEST IF CREDENTIALS ARE POPULATED
-            if creds is not None:
-                # CONNECT TO THE DATABASE >> UPDATE CLASS PROPERTIES
-                self._connect(creds=creds)
+        try:
+            with self.checkout() as conn:
+                # CREATE A STREAMING CURSOR >> RUN THE QUERY
+                cur = self._stream_cursor(conn=conn, batch_size=batch_size)
+                batches = None
+                try:
+                    self._execute_cursor(cur=cur, sql=sql, params=params)
+                    batches = _fetch_batches(cur=cur, batch_size=batch_size)
+                    if threaded: batches = _read_ahead(batches=batches)
+                    # WRITE EACH BATCH
+                    partial = True
+                    with _open_text(path=path, compress=compress, encoding=encoding) as f:
+                        writer = csv.writer(f, delimiter=delimiter)
+                        if header: writer.writerow([col[0] for col in cur.description])
+                        for rows in batches:
+                            writer.writerows(rows)
+                            count += len(rows)
+                finally:
+                    # STOP THE READER >> CLOSE THE CURSOR
+                    if batches is not None: batches.close()
+                    self._close_cursor(conn=conn, cur=cur)
 
         except Exception as err:
-            # USER NOTIFICATION
-            self._ui.print_alert('\nAn error occurred while connecting to the MySQL database.')
+            # REMOVE THE PARTIAL FILE >> USER NOTIFICATION
+            if partial and os.path.exists(path): os.remove(path)
+            self._ui.print_alert('\nAn error occurred while exporting to %s, after %d rows.' %
+                                 (path, count))
             self._ui.print_error(err)
+            return None
 
+        stats = self._load_stats(rows=count, start=start)
+        stats['bytes'] = os.path.getsize(path)
+        self._record(sql=sql, seconds=stats['seconds'], rows=count, nbytes=stats['bytes'])
+
+        return stats
 
     # ------------------------------------------------------------------
-    def table_exists(self, table_name):
+    def extract_incremental(self, table, watermark_column, state_file, columns='*',
+                            batch_size=10000, where=None, state_key=None):
         """
-        Return a boolean value based on if a table exists.
+        Return an IncrementalExtract object, which streams the rows of
+        a table added (or changed) since the last committed extract.
 
         DESIGN:
-        This function wraps the local _table_exists() function and
-        provides the SQL statement to be run.
+        The highest value of the watermark column (e.g. a last updated
+        timestamp, or an increasing ID) extracted by the last committed
+        run is read from the state file, and only rows with a greater
+        value are queried; ordered by the watermark column.  On the
+        first run (with no saved watermark), all rows are extracted.
+
+        The new watermark is only saved when the consumer calls the
+        returned object's commit() method, once the rows have been
+        processed; so a failed run is simply extracted again.  Refer
+        to the IncrementalExtract class.
+
+        The state file holds any number of watermarks, keyed by the
+        DSN, table and watermark column (or the state_key).  A file
+        ending in .db, .sqlite or .sqlite3 is a SQLite database
+        (created if required); otherwise a JSON file is used.
+
+        NOTE: Rows with a NULL watermark are only extracted by the
+        first run.  Rows written later with a watermark value lower
+        than (or equal to) the saved watermark are not extracted; so
+        the watermark column should be set by the database as rows
+        are committed.
 
         PARAMETERS:
-        - table_name
-        The name of the table to be tested.
+        - table
+        Name of the table to be extracted.
+        - watermark_column
+        Name of the column used as the watermark.
+        - state_file
+        Full path to the JSON or SQLite state file.
+        - columns (default '*')
+        Comma separated string of columns to be extracted.
+        - batch_size (default 10000)
+        Number of rows fetched from the database in each round trip.
+        - where (default None)
+        Additional SQL filter applied to the rows (without WHERE).
+        - state_key (default None)
+        Key of the watermark in the state file.  If None, the key is
+        built from the DSN, table and watermark column.
+
+        USE:
+        > extract = ora.extract_incremental(table='sales', watermark_column='updated_at',
+        >                                   state_file='/data/state/watermarks.json')
+        > for row in extract:
+        >     load(row)
+        > extract.commit()
+        """
+
+        # INITIALISE
+        key = state_key or '%s/%s.%s' % (self._dsn(creds=self._creds), table, watermark_column)
+        is_sqlite = os.path.splitext(state_file)[1].lower() in _SQLITE_EXTENSIONS
+        store = _SQLiteState(path=state_file) if is_sqlite else _JsonState(path=state_file)
+        previous = store.get(key=key)
+
+        # BUILD THE QUERY
+        filters = ['(%s)' % where] if where else []
+        if previous is not None: filters.append('%s > %s' % (watermark_column,
+                                                             self._placeholders(1)))
+        sql = 'SELECT %s FROM %s%s ORDER BY %s' % (columns, table,
+                                                   ' WHERE ' + ' AND '.join(filters)
+                                                   if filters else '', watermark_column)
+
+        return IncrementalExtract(db=self, sql=sql, params=None if previous is None else
+                                  (previous,), watermark_column=watermark_column,
+                                  store=store, key=key, previous=previous,
+                                  batch_size=batch_size)
+
+    # ------------------------------------------------------------------
+    def fetch(self, sql, params=None, cache=True, ttl=None):
+        """
+        Execute a query, binding the passed parameters, and return all
+        rows as a list.
+
+        DESIGN:
+        This method uses the same parameter binding and prepared
+        statement cache as the execute() method.  However, a connection
+        is borrowed from the pool (if open) for the query, so this
+        method can be used by many threads at once *if a pool is open*
+        (refer to open_pool()).  Without a pool, every thread shares
+        self.conn and its statement cache, which are not thread-safe.
+
+        If the result cache has been enabled (using
+        enable_result_cache()), the rows of a SELECT query are returned
+        from the cache while the entry is valid.  If single-flight
+        queries have been enabled (using enable_single_flight()),
+        concurrent identical SELECT queries share a single execution.
+
+        Exceptions are raised to the caller.
+
+        PARAMETERS:
+        - sql
+        The SQL query to be executed.
+        - params (default None)
+        Sequence (or dictionary) of parameters to be bound.
+        - cache (default True)
+        Use the result cache (if enabled) for this query.
+        - ttl (default None)
+        Number of seconds this query's result is cached.  If None, the
+        result cache's default TTL is used.
+
+        USE:
+        > rows = db.fetch(sql='SELECT name FROM my_table WHERE id = ?', params=(1,))
         """
 
-        # BUILD SQL STATEMENT
-        sql = """
-        SELECT COUNT(*)
-        FROM INFORMATION_SCHEMA.TABLES
-        WHERE table_name = '%s'
-        LIMIT 1
-        """ % table_name
+        # TEST IF THE RESULT CACHE AND SINGLE-FLIGHT ARE TO BE USED (READS ONLY)
+        read = _is_read(sql)
+        results = self._results if cache and read else None
+        fetch = self._fetch_shared if read and self._flights is not None else self._fetch
+        if results is None: return fetch(sql=sql, params=params)
 
-        # GET >> RETURN BOOLEAN RESULT
-        return self._table_exists(sql=sql)
+        # TEST THE CACHE >> QUERY >> ADD TO THE CACHE
+        key = (_normalise_sql(sql, backslash_escapes=self._BACKSLASH_ESCAPES), repr(params))
+        rows = results.get(key=key)
+        if rows is None:
+            rows = fetch(sql=sql, params=params)
+            results.put(key=key, rows=rows, sql=sql, ttl=ttl)
 
+        return list(rows)
 
     # ------------------------------------------------------------------
-    def _connect(self, creds):
+    def fetch_columns(self, sql, params=None, batch_size=10000, frame=True):
         """
-        Connect to the database using the passed credentials, update
-        class properties accordingly.
+        Execute a query and return the result set as a pandas DataFrame
+        (or as an ordered dictionary of NumPy arrays), built column by
+        column.
 
         DESIGN:
-        The cursor is set with the buffered parameter set to True;
-        allowing the cursor to fetch all rows, rather than being
-        'lazily' loaded.
+        Rather than building a list of row tuples and converting it,
+        rows are fetched in batches using fetchmany(), and each batch
+        is transposed into a preallocated, typed NumPy array per
+        column.  So only one batch of row tuples is held in memory at a
+        time.  The arrays grow geometrically as required, and are
+        trimmed to the row count at the end.
+
+        The initial data type of each column is taken from the cursor
+        description where the driver provides a usable type (refer to
+        the _column_dtype() method), otherwise from the values in the
+        first batch.  A column is widened as later batches require;
+        for example, an integer column containing a NULL becomes
+        float64 (NaN), and a column of strings, dates or mixed values
+        is held as object.
 
-        SOURCE: https://stackoverflow.com/a/33632767/6340496
+        PARAMETERS:
+        - sql
+        The SQL query to be executed.
+        - params (default None)
+        Parameters to be bound to the query, using the driver's
+        parameter style.
+        - batch_size (default 10000)
+        Number of rows fetched from the database in each round trip.
+        - frame (default True)
+        Return a pandas DataFrame.  If False, an ordered dictionary of
+        column name and NumPy array is returned.
+
+        DEPENDENCIES:
+        - numpy
+        - pandas (if frame is True)
+
+        USE:
+        > df = db.fetch_columns(sql='SELECT * FROM sales WHERE year = ?', params=(2018,))
         """
 
-        try:
-            # MAKE THE CONNECTION
-            dbo = utils._dbconn_mysql_conn(creds=creds)
-            # SET CLASS PROPERTIES
-            self.conn       = dbo['conn']
-            self.cur        = self.conn.cursor(buffered=True)
-            self.connected  = True
-        except Exception:
-            self.connected = False
-
+        # INITIALISE
+        start = time.time()
+        count = 0
+        nbytes = 0
+
+        with self.checkout() as conn:
+            # CREATE A STREAMING CURSOR >> RUN THE QUERY
+            cur = self._stream_cursor(conn=conn, batch_size=batch_size)
+            try:
+                self._execute_cursor(cur=cur, sql=sql, params=params)
+                names = [col[0] for col in cur.description]
+                arrays = [_new_column(dtype=self._column_dtype(column=col), size=batch_size)
+                          for col in cur.description]
+                # FETCH >> TRANSPOSE EACH BATCH INTO THE COLUMN ARRAYS
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows: break
+                    nbytes += _batch_size_estimate(rows)
+                    for idx, values in enumerate(zip(*rows)):
+                        arrays[idx] = _fill_column(array=arrays[idx], pos=count, values=values)
+                    count += len(rows)
+            finally:
+                self._close_cursor(conn=conn, cur=cur)
+
+        self._record(sql=sql, seconds=time.time() - start, rows=count, nbytes=nbytes)
+        # TRIM THE ARRAYS TO THE ROW COUNT (AN UNFILLED, UNTYPED COLUMN IS OBJECT)
+        columns = OrderedDict((name, array[:count] if len(array) else array.astype(object))
+                              for name, array in zip(names, arrays))
+
+        if not frame: return columns
+
+        import pandas as pd
+        return pd.DataFrame(columns, columns=names, copy=False)
 
     # ------------------------------------------------------------------
-    def _table_exists(self, sql):
+    def insert_many(self, table, columns, rows, batch_size=1000, commit=True):
         """
-        Test if a table exists and return a boolean result.
+        Insert rows into a table in batches, and return a dictionary
+        of load statistics.
 
         DESIGN:
-        This function is used rather than the general _table_exists()
-        function as the MySQL cur.execute object does not have a
-        fetchall attribute, so these must be done in separate steps.
+        The rows are read from the passed iterable (which can be a
+        generator) in chunks of batch_size, and each chunk is sent to
+        the database using the cursor's executemany() method; so only
+        one batch is held in memory at a time.
+
+        Each driver's fastest executemany path is used:
+            - MySQL:        mysql-connector rewrites the INSERT into a
+                            multi-row VALUES statement.
+            - Oracle:       cx_Oracle uses array binding.
+            - SQLite:       All batches are run in a single
+                            transaction.
+            - SQL Server:   pyodbc's fast_executemany is enabled.
+
+        If commit is True, a single commit is issued once all rows are
+        inserted, on a connection borrowed from the pool (if open).
+        If commit is False, the rows are inserted on the class'
+        connection (never a pooled connection, which is rolled back
+        when returned to the pool), so the caller can commit the
+        transaction; for example, using execute(..., commit=True) or
+        conn.commit().  On error, the transaction is rolled back and
+        None is returned.
+
+        PARAMETERS:
+        - table
+        Name of the table to be loaded.
+        - columns
+        List of column names, in the same order as the row values.
+        - rows
+        Iterable of row sequences (e.g. a list of tuples).
+        - batch_size (default 1000)
+        Number of rows sent in each executemany() call.
+        - commit (default True)
+        Commit the transaction after all rows are inserted.
+
+        RETURN KEYS:
+        - rows:         Number of rows inserted.
+        - seconds:      Time taken for the load.
+        - rows_per_sec: Rows inserted per second.
+
+        USE:
+        > db.insert_many(table='my_table', columns=['id', 'name'],
+        >                rows=[(1, 'a'), (2, 'b')])
+        > {'rows': 2, 'seconds': 0.001, 'rows_per_sec': 2000.0}
         """
 
+        # INITIALISE
+        start = time.time()
+        progress = dict(rows=0)
+
         try:
-            # RUN QUERY
-            self.cur.execute(sql)
-            # GET >> CONVERT RESULT TO BOOLEAN AND RETURN
-            return bool(self.cur.fetchall()[0][0])
+            if commit:
+                # LOAD ON A BORROWED CONNECTION >> COMMIT
+                with self.checkout() as conn:
+                    self._insert_rows(conn=conn, table=table, columns=columns, rows=rows,
+                                      batch_size=batch_size, commit=True, progress=progress)
+            else:
+                # LOAD ON THE CLASS' CONNECTION; THE CALLER COMMITS
+                self._insert_rows(conn=self.conn, table=table, columns=columns, rows=rows,
+                                  batch_size=batch_size, commit=False, progress=progress)
 
         except Exception as err:
             # USER NOTIFICATION
+            self._ui.print_alert('\nAn error occurred while inserting into %s, in the '
+                                 'batch starting at row %d.' % (table, progress['rows'] + 1))
             self._ui.print_error(err)
+            return None
 
+        return self._load_stats(rows=progress['rows'], start=start)
 
-# ----------------------------------------------------------------------
-class Oracle(Database):
-
-    """
-    PURPOSE:
-    This class is a lightweight wrapper for cx_Oracle, where commonly
-    used cx_Oracle methods and functions have been added as class
-    properties.
+    # ------------------------------------------------------------------
+    def invalidate_metadata(self):
+        """
+        Clear the metadata cache, so the catalog is reloaded on the next
+        metadata request.
 
-    PARAMETERS:
-    - host (default None)
-    Database name, or TNS host
-    - user (default None)
-    Login: user name
-    - password (default None)
-    Login: password
-    - from_file (default False)
-    Load the database credentials from a config file.
-      - valid keys: host, user, password
-    - filename (default None)
-    Full path to the file holding the database credentials.
+        This is called automatically when a DDL statement (CREATE,
+        ALTER, DROP, RENAME) is run through execute() or
+        execute_script().
+        """
 
-    USE:
-    > from utils.database import Oracle
-    >
-    > # LOAD CREDENTIALS
-    > ora = Oracle(host='my_host', user='my_user', password='my_pass')
-    >
-    > # CONNECT TO THE DB
-    > ora.connect()
-    > # CHECK CONNECTION WAS SUCCESSFUL
-    > ora.connected
-    > True
-    """
+        with self._meta_lock:
+            self._meta = None
 
     # ------------------------------------------------------------------
-    def __init__(self, host=None, user=None, password=None,
-                 from_file=False, filename=None):
+    def iter_query(self, sql, params=None, batch_size=1000):
+        """
+        Generator which executes a query and yields the result set,
+        one row at a time.
 
-        # INHERIT SUPER-CLASS PROPERTIES
-        super(Oracle, self).__init__()
-        # INITIALISE
-        self.connstr    = ''
-        self._host      = host
-        self._user      = user
-        self._password  = password
-        self._from_file = from_file
-        self._filename  = filename
+        DESIGN:
+        Rows are fetched from the database in batches using the
+        cursor's fetchmany() method, so a large result set is streamed
+        in constant memory, and the first rows are available as soon
+        as the first batch arrives.
+
+        A new cursor is created for the query (using a connection from
+        the pool, if open), rather than using the class' .cur property;
+        which for MySQL is buffered.  The cursor is closed when the
+        generator is exhausted or closed.
+
+        PARAMETERS:
+        - sql
+        The SQL query to be executed.
+        - params (default None)
+        Parameters to be bound to the query, using the driver's
+        parameter style.
+        - batch_size (default 1000)
+        Number of rows fetched from the database in each round trip.
+
+        USE:
+        > for row in db.iter_query(sql='SELECT * FROM big_table', batch_size=5000):
+        >     process(row)
+        """
 
+        # INITIALISE (DATABASE TIME ONLY; NOT THE CONSUMER'S TIME)
+        seconds = 0.0
+        count = 0
+        nbytes = 0
+
+        with self.checkout() as conn:
+            # CREATE A STREAMING CURSOR >> RUN THE QUERY
+            cur = self._stream_cursor(conn=conn, batch_size=batch_size)
+            try:
+                start = time.time()
+                self._execute_cursor(cur=cur, sql=sql, params=params)
+                seconds += time.time() - start
+                # FETCH >> YIELD EACH BATCH
+                while True:
+                    start = time.time()
+                    rows = cur.fetchmany(batch_size)
+                    seconds += time.time() - start
+                    if not rows: break
+                    count += len(rows)
+                    nbytes += _batch_size_estimate(rows)
+                    for row in rows: yield row
+            finally:
+                self._close_cursor(conn=conn, cur=cur)
+                self._record(sql=sql, seconds=seconds, rows=count, nbytes=nbytes)
 
     # ------------------------------------------------------------------
-    def connect(self):
+    def open_pool(self, min_size=1, max_size=5, idle_timeout=300, timeout=30,
+                  health_check=True):
         """
-        Connect to the database.  Update class properties accordingly.
+        Open a pool of connections to the database, using the
+        credentials of the current connection.
 
         DESIGN:
-        Function designed to create a connection to an Oracle
-        database using the provided login parameters, or directly from
-        a config file. If a login detail is not provided, the user is
-        prompted; which can be used as a security feature.
+        The pool is a ConnectionPool object, which uses this class'
+        _open_connection() method (through the retry policy and
+        circuit breaker) to create new connections.  Once
+        open, connections are borrowed from the pool using the
+        checkout() context manager.
 
-        NOTE: To prompt for login details, leave the parameter(s)
-        blank.
+        The connect() method must be called (successfully) first, as
+        the pool is created from the stored connection credentials.
 
-        Working in the background for the credential validation and
-        handling the actual database connection, are several other
-        functions which can be found in the utils module.
+        PARAMETERS:
+        - min_size (default 1)
+        Number of connections opened on pool creation, and kept open
+        through idle eviction.
+        - max_size (default 5)
+        Maximum number of connections (borrowed and idle) in the pool.
+        - idle_timeout (default 300)
+        Number of seconds after which an idle connection is closed.
+        - timeout (default 30)
+        Number of seconds to wait for a connection on checkout, before
+        a PoolTimeoutError is raised.
+        - health_check (default True)
+        Test each connection as it is borrowed from the pool, and
+        replace a dead connection with a new one.
+
+        USE:
+        > db.connect()
+        > db.open_pool(min_size=2, max_size=10)
+        >
+        > with db.checkout() as conn:
+        >     ...
+        >
+        > db.pool_stats()
         """
 
         try:
-            # INITIALISE
-            creds = dict()
-            dbtype = 'oracle'
-
-            # TEST IF A CONFIG FILE IS TO BE USED
-            if self._from_file:
-                # DEFINE CREDENTIAL KEYS
-                db_keys = ['host', 'user', 'password']
-                # GET CREDENTIALS FROM THE CONFIG FILE
-                creds = utils._dbconn_fields(dbtype=dbtype, fields=db_keys,
-                                             filename=self._filename)
-            else:
-                # GET CREDENTIALS FROM PASSED PARAMETERS
-                creds = utils._dbconn_params(dbtype=dbtype, host=self._host, user=self._user,
-                                             password=self._password)
-
-            # TEST IF CREDENTIALS ARE POPULATED
-            if creds is not None:
-                # CONNECT TO THE DATABASE >> UPDATE CLASS PROPERTIES
-                self._connect(creds=creds)
+            # TEST FOR CONNECTION CREDENTIALS
+            if self._creds is None:
+                self._ui.print_alert('\nThe connect() method must be called before a '
+                                     'connection pool can be opened.')
+                return False
+
+            # CLOSE AN EXISTING POOL >> OPEN A NEW POOL
+            self.close_pool()
+            self._pool = ConnectionPool(factory=lambda: self._open(creds=self._creds),
+                                        min_size=min_size, max_size=max_size,
+                                        idle_timeout=idle_timeout, timeout=timeout,
+                                        ping=self._ping if health_check else None,
+                                        on_close=self._forget_connection)
+            return True
 
         except Exception as err:
             # USER NOTIFICATION
-            self._ui.print_alert('\nAn error occurred while connecting to the Oracle database.')
+            self._ui.print_alert('\nAn error occurred while opening the connection pool.')
             self._ui.print_error(err)
-
+            return False
 
     # ------------------------------------------------------------------
-    def execute_script(self, sql_file, commit=False):
+    def parallel_extract(self, table, split_column, partitions=4, workers=None, columns='*',
+                         batch_size=10000, ordered=True, path=None, compress=None, stats=None):
         """
-        Execute a full SQL script on the database.
+        Extract a table in key ranges over several connections at
+        once; as a single stream of rows, or to a CSV file per
+        partition.
 
         DESIGN:
-        This method is a wrapper around cx_Oracle's execute() method
-        and is designed specifically to handle a full Oracle
-        SQL script consisting of multiple SQL statements, as cx_Oracle
-        cannot natively handle this.
-
-        Once the script is parsed into individual statements using
-        the ';' character, each individual statement is run using
-        cx_Oracle's execute() method.
+        The range of the (integer) split column is read, and split into
+        partitions of equal width.  Each worker thread opens its own
+        connection (from the stored credentials), and fetches
+        partitions in key order until all are taken; so the extract is
+        not limited by the throughput of a single session.
+
+        If path is None, a generator is returned, which yields the
+        rows of all partitions:
+            - ordered=True:  Partitions are yielded in key order (rows
+                             within a partition are in the database's
+                             order).  Each partition is buffered in a
+                             small bounded queue, so workers ahead of
+                             the consumer wait rather than using more
+                             memory.
+            - ordered=False: Rows are yielded in the order in which
+                             batches arrive from any partition.
+        Closing the generator stops the workers.
+
+        If path is provided, each partition is written to its own CSV
+        file (with a header line) and a list of partition statistics is
+        returned once all partitions are complete.
 
         PARAMETERS:
-        - sql_file
-        The full file path to the script to be run.
-        - commit (default False)
-        Boolean flag to execute a commit.
+        - table
+        Name of the table to be extracted.
+        - split_column
+        Integer column used to split the table into ranges; ideally
+        the primary key, or an indexed column.
+        - partitions (default 4)
+        Number of key ranges.
+        - workers (default None)
+        Number of connections (and threads).  If None, one per
+        partition is used.
+        - columns (default '*')
+        Column list to be selected.
+        - batch_size (default 10000)
+        Number of rows fetched in each round trip.
+        - ordered (default True)
+        Yield partitions in key order.  Refer to the DESIGN section.
+        - path (default None)
+        Path for the partition files, containing a '{partition}'
+        placeholder for the partition number; for example,
+        '/tmp/sales_{partition}.csv'.
+        - compress (default None)
+        Use 'gzip' to compress the partition files.
+        - stats (default None)
+        A list, to which a dictionary of statistics for each partition
+        is appended as the partition completes; holding partition,
+        start, stop, rows, seconds and rows_per_sec (and path and
+        bytes when writing files).
+
+        USE:
+        > # STREAM
+        > timings = []
+        > for row in db.parallel_extract(table='sales', split_column='sale_id', partitions=8,
+        >                                stats=timings):
+        >     ...
+        >
+        > # FILES
+        > db.parallel_extract(table='sales', split_column='sale_id', partitions=8,
+        >                     path='/data/sales_{partition}.csv.gz', compress='gzip')
         """
 
-        try:
-            # INITIALISE
-            success = False
-
-            # TEST IF THE FILE EXISTS
-            if utils.fileexists(sql_file):
-                # RE-INITIALISE (SO FIRST EXECUTE WILL RUN)
-                success = True
-                # PARSE THE SCRIPT INTO INDIVIDUAL COMMANDS
-                cmds = self._parse_script(script_string=open(sql_file).read())
+        # INITIALISE
+        stats = [] if stats is None else stats
+        lo, hi = self._fetch(sql='SELECT MIN(%s), MAX(%s) FROM %s' %
+                             (split_column, split_column, table))[0]
+        ranges = [] if lo is None else _key_ranges(lo=int(lo), hi=int(hi), partitions=partitions)
+        marks = self._placeholders(2).split(', ')
+        sql = 'SELECT %s FROM %s WHERE %s >= %s AND %s < %s' % (columns, table, split_column,
+                                                              marks[0], split_column, marks[1])
+        workers = min(workers or partitions, len(ranges)) or 1
+
+        # TEST FOR A STREAM
+        if path is None:
+            return self._extract_rows(sql=sql, ranges=ranges, workers=workers,
+                                      batch_size=batch_size, ordered=ordered, stats=stats)
+
+        # WRITE EACH PARTITION TO A FILE
+        errors = []
+        stop = threading.Event()
+
+        def handle(conn, idx, start, stop_):
+            # WRITE THE PARTITION >> RECORD THE FILE DETAILS
+            path_ = path.format(partition=idx)
+            with _open_text(path=path_, compress=compress) as f:
+                writer = csv.writer(f)
+                stat = self._extract_partition(conn=conn, sql=sql, idx=idx, start=start,
+                                               stop=stop_, batch_size=batch_size,
+                                               emit=writer.writerows, header=writer.writerow)
+            stat.update(path=path_, bytes=os.path.getsize(path_))
+            stats.append(stat)
+
+        for thread in self._run_partitions(ranges=ranges, workers=workers, handle=handle,
+                                           on_error=lambda idx, err: errors.append(err),
+                                           stop=stop):
+            thread.join()
+
+        # TEST FOR A FAILED PARTITION
+        if errors: raise errors[0]
+
+        return sorted(stats, key=lambda stat: stat['partition'])
 
-                # LOOP THROUGH EACH STATEMENT
-                for cmd in cmds:
-                    # EXECUTE COMMAND
-                    if success: success = self._execute_commit(sql=cmd, commit=commit)
+    # ------------------------------------------------------------------
+    def pool_stats(self):
+        """
+        Return a dictionary of connection pool statistics, or None if a
+        pool is not open.
 
-        except Exception as err:
-            success = False
-            self._ui.print_error(err)
+        Refer to the ConnectionPool.stats() method for a description
+        of the returned keys.
+        """
 
-        return success
+        return None if self._pool is None else self._pool.stats()
 
 
     # ------------------------------------------------------------------
-    def table_exists(self, table_name):
+    def query_stats(self):
         """
-        Return a boolean value based on if a table exists.
+        Return a dictionary of statement statistics, collected for
+        every statement run through this class.
 
         DESIGN:
-        This is an Oracle specific function which wraps the general
-        _table_exists() function and provides the SQL statement to be
-        run.
-
-        PARAMETERS:
-        - table_name
-        The name of the table to be tested.
+        Statements are grouped by their normalised text, where literal
+        values are replaced with '?' and whitespace is collapsed.
+
+        KEYS:
+        - statements
+        Dictionary of normalised statement, holding:
+            - count:    Number of executions.
+            - seconds:  Total database time.
+            - min / max / avg: Database time per execution.
+            - rows:     Total rows fetched (or affected).
+            - bytes:    Estimated bytes fetched.
+            - histogram: Ordered dictionary of latency bucket upper
+                         bound (seconds) and execution count.
+        - acquire
+        Dictionary of pooled connection acquire statistics; count,
+        seconds and max.
+
+        USE:
+        > stats = db.query_stats()
+        > slowest = sorted(stats['statements'].items(), key=lambda i: -i[1]['seconds'])[:10]
         """
 
-        # BUILD THE SQL STATEMENT
-        sql = """
-        SELECT COUNT(*) FROM dual WHERE EXISTS (
-            SELECT *
-            FROM sys.user_tables
-            WHERE upper(table_name) = '%s'
-        )
-        """ % table_name.upper()
+        return self._qstats.stats()
 
-        # GET >> RETURN BOOLEAN RESULT
-        return self._table_exists(sql=sql)
+    # ------------------------------------------------------------------
+    def reset_query_stats(self):
+        """Clear the statement statistics."""
 
+        self._qstats = _QueryStats()
 
     # ------------------------------------------------------------------
-    def _execute_commit(self, sql, commit):
-        """Execute an SQL statement and commit if instructed.
+    def result_cache_stats(self):
+        """
+        Return a dictionary of result cache statistics, or None if the
+        cache is not enabled.
 
-        DESIGN:
-        This is a simple execute / commit wrapper around cx_Oracle's
-        execute() method.
+        Refer to the _ResultCache.stats() method for a description of
+        the returned keys.
         """
 
-        try:
-            # EXECUTE COMMAND
-            self.cur.execute(sql)
-            # COMMIT?
-            if commit: self.conn.commit()
-            success = True
-        except Exception as err:
-            success = False
-            self._ui.print_error(err)
+        return None if self._results is None else self._results.stats()
 
-        return success
+    # ------------------------------------------------------------------
+    def retry_stats(self):
+        """
+        Return a dictionary of retry and circuit breaker statistics.
+
+        KEYS:
+        - connect / read
+        Dictionary of statistics for new connections, and for read
+        queries through fetch(), holding:
+            - calls:    Number of operations.
+            - attempts: Number of attempts, including retries.
+            - retries:  Number of retried attempts.
+            - failures: Number of operations which failed, after all
+                        attempts.
+            - rejected: Number of attempts refused by an open circuit.
+            - seconds / max_seconds: Total and maximum latency of a
+                        successful attempt.
+        - breaker
+        The circuit breaker statistics for this database's DSN; refer to
+        the CircuitBreaker.stats() method.
+        """
+
+        with self._lock:
+            stats = dict((op, dict(counters)) for op, counters in self._retries.items())
 
+        stats['breaker'] = self._breaker().stats()
+
+        return stats
 
     # ------------------------------------------------------------------
-    def _connect(self, creds):
+    def single_flight_stats(self):
         """
-        Connect to the database using the passed credentials, update
-        class properties accordingly.
+        Return a dictionary of single-flight statistics, or None if
+        single-flight queries are not enabled.
 
-        DESIGN:
-        In addition to setting the 'typical' class properties, a
-        connection string property has been added to this Oracle
-        specific connection.
+        KEYS:
+        - queries:  Number of queries run by this object.
+        - shared:   Number of calls which shared the rows of a query
+                    already running.
         """
 
-        try:
-            # MAKE THE CONNECTION
-            dbo = utils._dbconn_oracle_conn(creds=creds)
-            # SET CLASS PROPERTIES
-            self.conn       = dbo['conn']
-            self.cur        = dbo['cur']
-            self.connstr    = '%s/%s@%s' % (creds['user'], creds['password'], creds['host'])
-            self.connected  = True
-        except Exception:
-            self.connected = False
+        if self._flights is None: return None
 
+        with self._lock:
+            return dict(self._flights)
 
-# ----------------------------------------------------------------------
-class SQLite(Database):
+    # ------------------------------------------------------------------
+    def snapshot(self, sql, name, ttl=3600, path=None, params=None, refresh=False,
+                 batch_size=10000):
+        """
+        Return the rows of a query from a local SQLite snapshot of its
+        result; the snapshot is (re)built from this database if it
+        does not exist, has expired or a refresh is requested.
 
-    """
-    PURPOSE:
-    This class is a lightweight wrapper for sqlite3, and used to handle
-    database objects for SQLite.
+        DESIGN:
+        The query result is stored as a table (of the passed name) in
+        a local SQLite file, and each snapshot's source query, DSN and
+        creation time are recorded in the file's _snapshots table.
+        While the snapshot is younger than its TTL (and the query and
+        DSN are unchanged), the rows are read from the local file and
+        the source database is not queried.
 
-    PARAMETERS:
-    - db_file_path
-    Full path to the SQLite database file.
+        A snapshot is built by streaming the query result into a new
+        table using copy_table(); then, in a single transaction, the
+        old table is replaced and the _snapshots entry updated.  So a
+        failed build leaves the previous snapshot in place, and readers
+        (in other processes) never see a partial table.
 
-    USE:
-    > from utils.database import SQLite
-    >
-    > # LOAD CREDENTIALS
-    > sql = SQLite(db_file_path='path/to/data.db')
-    >
-    > # CONNECT TO THE DB
-    > sql.connect()
-    > # CHECK CONNECTION WAS SUCCESSFUL
-    > sql.connected
-    > True
-    """
+        The file is opened with the SQLite 'concurrent' profile, so
+        many processes can share a snapshot file.
 
-    # ------------------------------------------------------------------
-    def __init__(self, db_file_path):
+        Exceptions are raised to the caller.
+
+        PARAMETERS:
+        - sql
+        The SQL query to be executed.
+        - name
+        Name of the snapshot, used as the local table name.  The name
+        must start with a letter; names starting with an underscore
+        are reserved for the snapshot file's own tables.
+        - ttl (default 3600)
+        Number of seconds the snapshot is valid.
+        - path (default None)
+        Full path to the SQLite snapshot file, which is created if it
+        does not exist.  If None, utils_snapshots.db in the system's
+        temp directory is used.
+        - params (default None)
+        Parameters to be bound to the query, using the driver's
+        parameter style.
+        - refresh (default False)
+        Rebuild the snapshot, even if it is still valid.
+        - batch_size (default 10000)
+        Number of rows in each fetch and insert batch, when building.
+
+        USE:
+        > rows = ora.snapshot(sql='SELECT * FROM dim_region', name='dim_region',
+        >                     ttl=86400, path='/data/cache/reporting.db')
+        """
 
-        # INHERIT SUPER-CLASS PROPERTIES
-        super(SQLite, self).__init__()
         # INITIALISE
-        self._db_file_path = db_file_path
+        path = path or os.path.join(tempfile.gettempdir(), 'utils_snapshots.db')
+        source = '%s %s %r' % (self._dsn(creds=self._creds), _normalise_sql(sql), params)
 
+        # VALIDATION
+        if not _RE_SNAPSHOT_NAME.match(name):
+            raise DatabaseError('Invalid snapshot name: %s' % name)
+
+        # CREATE AND OPEN THE SNAPSHOT FILE
+        if not os.path.exists(path): sqlite3.connect(path).close()
+        local = SQLite(db_file_path=path, profile='concurrent')
+        local.connect()
+        if not local.connected: raise DatabaseError('Cannot open the snapshot file: %s' % path)
+
+        try:
+            # TEST FOR A VALID SNAPSHOT >> BUILD
+            local.execute(sql='CREATE TABLE IF NOT EXISTS _snapshots (name TEXT PRIMARY KEY, '
+                              'source TEXT, created REAL, rows INTEGER)', commit=True)
+            meta = local.fetch(sql='SELECT source, created FROM _snapshots WHERE name = ?',
+                               params=(name,), cache=False)
+            if (refresh or not meta or meta[0][0] != source or
+                    time.time() - meta[0][1] >= ttl or not local.table_exists(name)):
+                self._save_snapshot(local=local, sql=sql, params=params, name=name,
+                                    source=source, batch_size=batch_size)
+
+            # READ THE SNAPSHOT
+            return local.fetch(sql='SELECT * FROM %s' % name, cache=False)
+        finally:
+            local.disconnect()
 
     # ------------------------------------------------------------------
-    def connect(self):
-        """Connect to the SQLite database file."""
+    def statement_cache_stats(self):
+        """
+        Return a dictionary of prepared statement cache statistics,
+        summed over all connections.
+
+        KEYS:
+        - size:         Number of cached cursors.
+        - hits:         Number of statements served from the cache.
+        - misses:       Number of statements prepared.
+        - evictions:    Number of cursors closed to make space.
+        """
 
-        # TEST IF THE DB FILE EXISTS
-        if utils.fileexists(self._db_file_path):
-            # CONNECT
-            self._connect()
+        # INITIALISE
+        stats = dict(size=0, hits=0, misses=0, evictions=0)
 
+        with self._lock:
+            # SUM THE STATS FOR EACH CONNECTION
+            for _, cache in self._stmts.values():
+                for key, value in cache.stats().items(): stats[key] += value
+
+        return stats
 
     # ------------------------------------------------------------------
     def table_exists(self, table_name):
@@ -569,186 +1426,3979 @@ class SQLite(Database):
         Return a boolean value based on if a table exists.
 
         DESIGN:
-        This is an SQLite specific function which wraps the general
-        _table_exists() function and provides the SQL statement to be
-        run.
+        Rather than querying the database for each table, the full
+        catalog of tables, columns and data types is loaded in a
+        single query (the sub-class' _CATALOG_SQL), and held in a
+        metadata cache for metadata_ttl seconds (default 300).
+
+        The cache is also used by the tables_exist(), columns() and
+        column_types() methods, and can be cleared using the
+        invalidate_metadata() method.
 
         PARAMETERS:
         - table_name
-        The name of the table to be tested.
+        The name of the table to be tested (not case sensitive).
         """
 
-        # BUILD THE SQL STATEMENT
-        sql = """
-        SELECT COUNT(*)
-        FROM sqlite_master
-        WHERE type = "table"
-        	AND upper(name) = '%s'
-        LIMIT 1
-
-        """ % table_name.upper()
-
-        # GET >> RETURN BOOLEAN RESULT
-        return self._table_exists(sql=sql)
+        try:
+            # TEST THE METADATA CACHE
+            return table_name.upper() in self._metadata()
 
+        except Exception as err:
+            # USER NOTIFICATION
+            self._ui.print_error(err)
 
     # ------------------------------------------------------------------
-    def _connect(self):
-        """
-        Connect to the database file, update class properties
-        accordingly.
+    def tables_exist(self, table_names):
         """
+        Return a dictionary of table name and a boolean value based on
+        if the table exists.
 
-        try:
-            # MAKE THE CONNECTION
-            dbo = utils.dbconn_sqlite(db_path=self._db_file_path)
-            # SET CLASS PROPERTIES
-            self.conn       = dbo['conn']
-            self.cur        = dbo['cur']
-            self.connected  = True
-        except Exception:
-            self.connected = False
-
-
-# ----------------------------------------------------------------------
-class SQLServer(Database):
-
-    """
-    PURPOSE:
-    This class is a lightweight wrapper for pyodbc, and used to handle
-    database objects for SQL Server.
-
-    PARAMETERS:
-    - server (default None)
-    Name of the server where the SQL Server database lives.
-    - database (default None)
-    The name of the database to be connected.
-    - user (default None)
-    Login: user name
-    - password (default None)
-    Login: password
-    - from_file (default False)
-    Load the database credentials from a config file.
-      - valid keys: server, database, user, password
-    - filename (default None)
-    Full path to the file holding the database credentials.
+        DESIGN:
+        All tables are tested against the metadata cache, so at most
+        one query is made to the database.  Refer to the table_exists()
+        method for details.
 
-    USE:
-    > from utils.database import SQLServer
-    >
-    > # LOAD CREDENTIALS
-    > sql = SQLServer(server='my_server', database='my_db',
-                      user='my_user', password='my_pass')
-    >
-    > # CONNECT TO THE DB
-    > sql.connect()
-    > # CHECK CONNECTION WAS SUCCESSFUL
-    > sql.connected
-    > True
-    """
+        PARAMETERS:
+        - table_names
+        A list of table names to be tested (not case sensitive).
 
-    # ------------------------------------------------------------------
-    def __init__(self, server=None, database=None, user=None,
-                 password=None, from_file=False, filename=None):
+        USE:
+        > db.tables_exist(['customers', 'orders', 'nowhere'])
+        > {'customers': True, 'orders': True, 'nowhere': False}
+        """
 
-        # INHERIT SUPER-CLASS PROPERTIES
-        super(SQLServer, self).__init__()
-        # INITIALISE
-        self._server    = server
-        self._database  = database
-        self._user      = user
-        self._password  = password
-        self._from_file = from_file
-        self._filename  = filename
+        try:
+            # TEST EACH TABLE AGAINST THE METADATA CACHE
+            meta = self._metadata()
+            return dict((name, name.upper() in meta) for name in table_names)
 
+        except Exception as err:
+            # USER NOTIFICATION
+            self._ui.print_error(err)
 
     # ------------------------------------------------------------------
-    def connect(self):
+    def write_dataframe(self, df, table, if_exists='fail', chunksize=10000, clean=False):
         """
-        Connect to the database.  Update class properties accordingly.
+        Write a pandas DataFrame to a table, in chunks, and return a
+        dictionary of load statistics.
 
         DESIGN:
-        Function designed to create a connection to a SQL Server
-        database using the provided login parameters, or directly from
-        a config file. If a login detail is not provided, the user is
-        prompted; which can be used as a security feature.
+        If the table does not exist (or is to be replaced), it is
+        created once, with column types derived from the DataFrame's
+        data types (refer to the _DDL_TYPES class attribute).
 
-        NOTE: To prompt for login details, leave the parameter(s)
-        blank.
+        The DataFrame is then written in chunks of chunksize rows.
+        Each chunk is converted to rows in a single (vectorised) step,
+        with NaN/NaT values sent as NULL, and loaded using the
+        insert_many() method; so each chunk is sent through the
+        driver's fastest executemany path, and committed as its own
+        transaction.  Only one chunk is copied at a time, so memory
+        use stays flat regardless of the DataFrame's size.
 
-        Working in the background for the credential validation and
-        handling the actual database connection, are several other
-        functions which can be found in the utils module.
+        If a chunk fails, it is rolled back, the previously committed
+        chunks remain, and None is returned.
+
+        PARAMETERS:
+        - df
+        The pandas DataFrame to be written.
+        - table
+        Name of the target table.
+        - if_exists (default 'fail')
+        Action if the table already exists:
+            - 'fail':       Do not write; return None.
+            - 'replace':    Drop and re-create the table.
+            - 'append':     Add the rows to the existing table.
+        - chunksize (default 10000)
+        Number of rows in each chunk (and transaction).
+        - clean (default False)
+        Clean each chunk using the utils.clean_df() function; column
+        names are lower cased (with spaces replaced by underscores) and
+        whitespace is stripped from text values.
+
+        RETURN KEYS:
+        - rows:         Number of rows written.
+        - seconds:      Time taken for the load.
+        - rows_per_sec: Rows written per second.
+        - chunks:       Number of chunks (transactions) committed.
+
+        USE:
+        > db.write_dataframe(df=df, table='sales', if_exists='replace', clean=True)
+        > {'rows': 1000000, 'seconds': 9.7, 'rows_per_sec': 103092.8, 'chunks': 100}
         """
 
-        try:
-            # INITIALISE
-            creds = dict()
-            dbtype = 'sql_server'
+        # VALIDATION
+        if if_exists not in ('fail', 'replace', 'append'):
+            self._ui.print_alert('\nThe if_exists argument must be one of: fail, replace, '
+                                 'append.')
+            return None
 
-            # TEST IF A CONFIG FILE IS TO BE USED
-            if self._from_file:
-                # DEFINE CREDENTIAL KEYS
-                db_keys = ['server', 'database', 'user', 'password']
-                # GET CREDENTIALS FROM THE CONFIG FILE
-                creds = utils._dbconn_fields(dbtype=dbtype, fields=db_keys,
-                                             filename=self._filename)
-            else:
-                # GET CREDENTIALS FROM PASSED PARAMETERS
-                creds = utils._dbconn_params(dbtype=dbtype, server=self._server,
-                                             database=self._database, user=self._user,
-                                             password=self._password)
+        # INITIALISE
+        start = time.time()
+        count = 0
+        chunks = 0
 
-            # TEST IF CREDENTIALS ARE POPULATED
-            if creds is not None:
-                # CONNECT TO THE DATABASE >> UPDATE CLASS PROPERTIES
-                self._connect(creds=creds)
+        try:
+            # TEST IF THE TABLE EXISTS >> CREATE (OR RE-CREATE)
+            columns = list((utils.clean_df(df.iloc[:0]) if clean else df).columns)
+            exists = self.table_exists(table)
+            if exists and if_exists == 'fail':
+                self._ui.print_alert('\nThe %s table already exists.' % table)
+                return None
+            if exists and if_exists == 'replace':
+                self.execute(sql='DROP TABLE %s' % table, commit=True)
+            if not exists or if_exists == 'replace':
+                self.execute(sql=self._table_ddl(table=table, columns=columns,
+                                                 kinds=[dtype.kind for dtype in df.dtypes]),
+                             commit=True)
+
+            # WRITE EACH CHUNK
+            for pos in range(0, len(df), chunksize):
+                chunk = df.iloc[pos:pos + chunksize]
+                if clean: chunk = utils.clean_df(chunk)
+                rows = _frame_rows(frame=chunk)
+                if self.insert_many(table=table, columns=columns, rows=rows,
+                                    batch_size=len(rows), commit=True) is None:
+                    self._ui.print_alert('The chunk starting at row %d of the DataFrame was '
+                                         'rolled back.  %d rows were written.' %
+                                         (pos + 1, count))
+                    return None
+                count += len(rows)
+                chunks += 1
 
         except Exception as err:
             # USER NOTIFICATION
-            self._ui.print_alert('\nAn error occurred while connecting to the SQLServer database.')
+            self._ui.print_alert('\nAn error occurred while writing to the %s table.' % table)
             self._ui.print_error(err)
+            return None
 
+        stats = self._load_stats(rows=count, start=start)
+        stats['chunks'] = chunks
+
+        return stats
 
     # ------------------------------------------------------------------
-    def table_exists(self, table_name):
+    def _after_statement(self, sql):
         """
-        Return a boolean value based on if a table exists.
+        Clear the cache entries affected by a statement which has been
+        run through this class.
 
         DESIGN:
-        This is a SQL Server specific function which wraps the general
-        _table_exists() function and provides the SQL statement to be
-        run.
-
-        PARAMETERS:
-        - table_name
-        The name of the table to be tested.
+        - DDL statements clear the metadata cache.
+        - Writes clear the result cache entries referring to the
+          written table; or all entries if the table is not known.
         """
 
-        # BUILD SQL STATEMENT
-        sql = """
-        SELECT COUNT(*)
-        FROM INFORMATION_SCHEMA.TABLES
-        WHERE upper(table_name) = '%s'
-        """ % table_name.upper()
+        # CLEAR THE METADATA CACHE ON DDL
+        if _RE_DDL.match(sql): self.invalidate_metadata()
 
-        # GET >> RETURN BOOLEAN RESULT
-        return self._table_exists(sql=sql)
+        # CLEAR THE RESULT CACHE ON WRITE
+        results = self._results
+        if results is not None and not _is_read(sql):
+            match = _RE_WRITE_TABLE.match(sql)
+            results.invalidate(table=_table_word(match.group(1)) if match else None)
 
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _batches(rows, batch_size):
+        """
+        Generator which yields lists of (up to) batch_size rows from
+        the passed iterable.
+        """
+
+        # INITIALISE
+        rows = iter(rows)
+
+        while True:
+            # READ THE NEXT BATCH
+            batch = list(islice(rows, batch_size))
+            if not batch: break
+            yield batch
 
     # ------------------------------------------------------------------
-    def _connect(self, creds):
+    @staticmethod
+    def _bind_rows(batch):
         """
-        Connect to the database using the passed credentials, update
-        class properties accordingly.
+        Return the batch of rows, with any values the driver cannot
+        bind converted.  All values are bound as they are, unless
+        overridden by the sub-class.
+        """
+
+        return batch
+
+    # ------------------------------------------------------------------
+    def _breaker(self, creds=None):
+        """
+        Return the circuit breaker for this database's DSN, or for the
+        passed credentials.
         """
 
+        # INITIALISE
+        dsn = self._dsn(creds=creds or self._creds)
+
+        with _BREAKERS_LOCK:
+            # CREATE THE BREAKER ON FIRST USE OF THE DSN
+            if dsn not in _BREAKERS:
+                _BREAKERS[dsn] = CircuitBreaker(threshold=self.breaker_threshold,
+                                                reset_timeout=self.breaker_reset)
+            return _BREAKERS[dsn]
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _bulk_cursor(conn):
+        """Return a new cursor, suitable for executemany() loads."""
+
+        return conn.cursor()
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _close_cursor(conn, cur):
+        """Close a cursor, ignoring any errors."""
+
         try:
-            # MAKE THE CONNECTION
-            dbo = utils._dbconn_sql_conn(creds=creds)
-            # SET CLASS PROPERTIES
-            self.conn       = dbo['conn']
-            self.cur        = dbo['cur']
-            self.connected  = True
+            cur.close()
         except Exception:
-            self.connected = False
+            pass
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _column_dtype(column):
+        """
+        Return the NumPy data type for a column of a cursor's
+        description, or None if the type should be inferred from the
+        values.
+
+        DESIGN:
+        Some drivers (e.g. pyodbc) describe a column's type using a
+        Python type, which is mapped here.  Drivers using their own
+        type codes override this method.
+        """
+
+        return _PYTYPE_DTYPES.get(column[1])
+
+    # ------------------------------------------------------------------
+    def _close_connection(self, conn):
+        """
+        Close a connection opened outside of the pool (e.g. a thread or
+        partition connection), ignoring any errors.
+        """
+
+        try:
+            self._forget_connection(conn=conn)
+            conn.close()
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------
+    def _count(self, op, key, value=1):
+        """Update a retry counter (refer to retry_stats())."""
+
+        with self._lock:
+            counters = self._retries[op]
+            counters[key] += value
+            if key == 'seconds': counters['max_seconds'] = max(counters['max_seconds'], value)
+
+    # ------------------------------------------------------------------
+    def _count_flight(self, key):
+        """Update a single-flight counter (refer to single_flight_stats())."""
+
+        with self._lock:
+            if self._flights is not None: self._flights[key] += 1
+
+    # ------------------------------------------------------------------
+    def _dsn(self, creds):
+        """
+        Return a string identifying the database target, used to key
+        the circuit breaker and single-flight queries.
+
+        DESIGN:
+        The DSN is built from the class name and the credential values,
+        excluding the password.
+        """
+
+        # TEST FOR CREDENTIALS
+        if not creds: return type(self).__name__.lower()
+
+        return '%s://%s' % (type(self).__name__.lower(),
+                            ';'.join('%s=%s' % (key, creds[key]) for key in sorted(creds)
+                                     if key != 'password'))
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _execute_cursor(cur, sql, params=None):
+        """
+        Execute an SQL statement on the passed cursor; binding the
+        parameters, if provided.
+        """
+
+        # SOME DRIVERS DO NOT ACCEPT A NONE PARAMETER ARGUMENT
+        if params is None:
+            cur.execute(sql)
+        else:
+            cur.execute(sql, params)
+
+        return cur
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _execute_prepared(cur, sql, params=None):
+        """
+        Execute a cursor created by the _prepare() method, binding the
+        parameters, if provided.
+        """
+
+        return Database._execute_cursor(cur=cur, sql=sql, params=params)
+
+    # ------------------------------------------------------------------
+    def _extract_partition(self, conn, sql, idx, start, stop, batch_size, emit, header=None):
+        """
+        Fetch one key range of a parallel_extract(), passing each batch
+        of rows to the emit function, and return the partition's
+        statistics.  If provided, the header function is passed the
+        column names first.
+        """
+
+        # INITIALISE
+        began = time.time()
+        count = 0
+        cur = self._stream_cursor(conn=conn, batch_size=batch_size)
+
+        try:
+            # RUN THE RANGE QUERY >> EMIT EACH BATCH
+            self._execute_cursor(cur=cur, sql=sql, params=(start, stop))
+            if header is not None: header([col[0] for col in cur.description])
+            for rows in _fetch_batches(cur=cur, batch_size=batch_size):
+                if emit(rows) is False: break
+                count += len(rows)
+        finally:
+            self._close_cursor(conn=conn, cur=cur)
+
+        stat = self._load_stats(rows=count, start=began)
+        stat.update(partition=idx, start=start, stop=stop)
+        self._record(sql=sql, seconds=stat['seconds'], rows=count)
+
+        return stat
+
+    # ------------------------------------------------------------------
+    def _extract_rows(self, sql, ranges, workers, batch_size, ordered, stats):
+        """
+        Generator which yields the rows of a parallel_extract(), as the
+        partitions are fetched by the worker threads.
+
+        DESIGN:
+        Each worker puts (partition, batch, error) items on a bounded
+        queue; one queue per partition if ordered, otherwise a single
+        shared queue.  A batch of None marks the end of a partition.
+        """
+
+        # INITIALISE
+        count = len(ranges)
+        shared = queue.Queue(maxsize=2 * workers)
+        queues = [queue.Queue(maxsize=2) for _ in ranges] if ordered else [shared] * count
+        stop = threading.Event()
+
+        def handle(conn, idx, start, stop_):
+            # FETCH THE PARTITION >> MARK ITS END
+            emit = lambda rows: _put(items=queues[idx], item=(idx, rows, None), stop=stop)
+            stats.append(self._extract_partition(conn=conn, sql=sql, idx=idx, start=start,
+                                                 stop=stop_, batch_size=batch_size, emit=emit))
+            _put(items=queues[idx], item=(idx, None, None), stop=stop)
+
+        def on_error(idx, err):
+            _put(items=queues[idx], item=(idx, None, err), stop=stop)
+
+        threads = self._run_partitions(ranges=ranges, workers=workers, handle=handle,
+                                       on_error=on_error, stop=stop)
+
+        try:
+            done = 0
+            while done < count:
+                # GET THE NEXT BATCH (FROM THE CURRENT PARTITION, IF ORDERED)
+                _, rows, err = queues[done if ordered else 0].get()
+                if err is not None: raise err
+                if rows is None:
+                    done += 1
+                    continue
+                for row in rows: yield row
+        finally:
+            # STOP >> JOIN THE WORKERS
+            stop.set()
+            for thread in threads: thread.join()
+
+    # ------------------------------------------------------------------
+    def _fetch(self, sql, params=None):
+        """
+        Execute a query on a borrowed connection, and return all rows.
+
+        A read query (e.g. SELECT) is idempotent, so is retried using
+        the retry policy.  Other statements (including a WITH ... INSERT,
+        refer to _is_read()) are run once, so a write is not repeated.
+        """
+
+        # TEST FOR A READ QUERY
+        if not _is_read(sql): return self._fetch_once(sql=sql, params=params)
+
+        return self._retry(op='read', func=self._fetch_once, sql=sql, params=params)
+
+    # ------------------------------------------------------------------
+    def _fetch_once(self, sql, params=None):
+        """Execute a query on a borrowed connection, and return all rows."""
+
+        with self.checkout() as conn:
+            # EXECUTE THE PREPARED CURSOR >> FETCH
+            start = time.time()
+            cur = self._statements(conn=conn).cursor(sql=sql, params=params)
+            self._execute_prepared(cur=cur, sql=sql, params=params)
+            rows = cur.fetchall()
+            self._record(sql=sql, seconds=time.time() - start, rows=len(rows),
+                         nbytes=_batch_size_estimate(rows))
+            return rows
+
+    # ------------------------------------------------------------------
+    def _fetch_shared(self, sql, params=None):
+        """
+        Execute a read query, sharing one execution between concurrent
+        callers of the same query (refer to enable_single_flight()).
+
+        DESIGN:
+        The first caller registers the query as in flight and runs
+        it, while later callers wait on the flight's event.  The flight
+        is removed from the registry as soon as the query completes.
+        """
+
+        # INITIALISE
+        key = (self._dsn(creds=self._creds),
+               _normalise_sql(sql, backslash_escapes=self._BACKSLASH_ESCAPES), repr(params))
+
+        with _FLIGHTS_LOCK:
+            # JOIN A RUNNING QUERY, OR START A NEW ONE
+            flight = _FLIGHTS.get(key)
+            leader = flight is None
+            if leader: flight = _FLIGHTS[key] = _Flight()
+            flight.waiting += not leader
+
+        # WAIT FOR THE RUNNING QUERY >> SHARE ITS ROWS
+        if not leader:
+            self._count_flight(key='shared')
+            flight.done.wait()
+            if flight.error is not None: raise flight.error
+            return list(flight.rows)
+
+        try:
+            self._count_flight(key='queries')
+            flight.rows = self._fetch(sql=sql, params=params)
+        except Exception as err:
+            flight.error = err
+            raise
+        finally:
+            # REMOVE THE FLIGHT >> RELEASE THE WAITING CALLERS
+            with _FLIGHTS_LOCK:
+                _FLIGHTS.pop(key, None)
+            flight.done.set()
+
+        # RETURN A COPY IF THE ROWS ARE SHARED
+        return list(flight.rows) if flight.waiting else flight.rows
+
+    # ------------------------------------------------------------------
+    def _forget_connection(self, conn):
+        """
+        Close and remove the statement cache for a connection which is
+        being closed.
+        """
+
+        with self._lock:
+            entry = self._stmts.pop(id(conn), None)
+
+        if entry is not None: entry[1].clear()
+
+    # ------------------------------------------------------------------
+    def _insert_rows(self, conn, table, columns, rows, batch_size, commit, progress):
+        """
+        Insert rows into a table in batches on the passed connection;
+        adding the number of rows loaded to progress['rows'] as each
+        batch is sent.
+
+        On error, the transaction is rolled back and the exception is
+        raised.  Refer to the insert_many() method.
+        """
+
+        # INITIALISE
+        sql = 'INSERT INTO %s (%s) VALUES (%s)' % (table, ', '.join(columns),
+                                                  self._placeholders(len(columns)))
+        cur = self._bulk_cursor(conn=conn)
+
+        try:
+            # LOAD EACH BATCH
+            for batch in self._batches(rows=rows, batch_size=batch_size):
+                batch_start = time.time()
+                cur.executemany(sql, self._bind_rows(batch))
+                self._record(sql=sql, seconds=time.time() - batch_start, rows=len(batch))
+                progress['rows'] += len(batch)
+            # COMMIT?
+            if commit: conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._close_cursor(conn=conn, cur=cur)
+
+        self._after_statement(sql=sql)
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _load_stats(rows, start):
+        """
+        Return a dictionary of load statistics, for the number of rows
+        processed since the start time.
+        """
+
+        # CALCULATE THROUGHPUT
+        seconds = time.time() - start
+        rate = rows / seconds if seconds > 0 else float(rows)
+
+        return dict(rows=rows, seconds=seconds, rows_per_sec=rate)
+
+    # ------------------------------------------------------------------
+    def _metadata(self):
+        """
+        Return the metadata cache; reloading the catalog from the
+        database if the cache is empty or has expired.
+
+        DESIGN:
+        The cache is a dictionary of upper case table names, each
+        holding an ordered dictionary of column name and data type.
+        The table names are those returned by the sub-class'
+        _CATALOG_SQL; for SQL Server, these are schema qualified (with
+        the default schema's tables also held by name alone).
+        """
+
+        with self._meta_lock:
+            # TEST FOR AN EMPTY OR EXPIRED CACHE >> RELOAD THE CATALOG
+            if self._meta is None or time.time() - self._meta_time > self.metadata_ttl:
+                meta = dict()
+                for table, column, dtype in self._fetch(sql=self._CATALOG_SQL):
+                    meta.setdefault(table.upper(), OrderedDict())[column] = dtype
+                self._meta = meta
+                self._meta_time = time.time()
+
+            return self._meta
+
+    # ------------------------------------------------------------------
+    def _open(self, creds):
+        """
+        Return a new connection object, opened using the retry policy
+        and the circuit breaker.
+
+        DESIGN:
+        The driver's exception is raised by _open_connection(), so only
+        a transient failure (e.g. a network error, but not a rejected
+        login) is retried.  The user is notified once, if the final
+        attempt fails.
+        """
+
+        try:
+            return self._retry(op='connect', func=self._open_connection, creds=creds)
+        except CircuitOpenError as err:
+            # USER NOTIFICATION
+            self._ui.print_alert('\n%s' % err)
+            raise
+        except Exception as err:
+            # USER NOTIFICATION (THE DSN EXCLUDES THE PASSWORD)
+            self._ui.print_alert('\nThe database connection failed for: %s' %
+                                 self._dsn(creds=creds))
+            self._ui.print_error(err)
+            raise
+
+    # ------------------------------------------------------------------
+    def _parse_script(self, script_string):
+        """
+        Return a list of SQL statements which were parsed from the
+        script_string value.
+
+        DESIGN:
+        This is a wrapper around the utils.sqlscript tokenizer, for a
+        script which is already held in memory.  Refer to the
+        sqlscript.iter_statements() function for the parsing rules.
+
+        PARAMETERS:
+        - script_string
+        The string value of the script to be parsed.
+        """
+
+        return sqlscript.parse_script(script_string=script_string,
+                                      backslash_escapes=self._BACKSLASH_ESCAPES)
+
+    # ------------------------------------------------------------------
+    def _ping(self, conn):
+        """
+        Return a boolean value based on if the passed connection is
+        alive, by running a trivial statement on it.
+        """
+
+        try:
+            # RUN THE PING STATEMENT
+            cur = conn.cursor()
+            cur.execute(self._PING_SQL)
+            cur.fetchall()
+            cur.close()
+            return True
+        except Exception:
+            return False
+
+    # ------------------------------------------------------------------
+    def _placeholders(self, count):
+        """
+        Return a comma separated string of count parameter
+        placeholders, in the driver's parameter style.
+        """
+
+        # BUILD PLACEHOLDERS FOR THE PARAMETER STYLE
+        if self._PARAMSTYLE == 'numeric':
+            marks = [':%d' % (i + 1) for i in range(count)]
+        elif self._PARAMSTYLE == 'format':
+            marks = ['%s'] * count
+        else:
+            marks = ['?'] * count
+
+        return ', '.join(marks)
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _prepare(conn, sql, params=None):
+        """
+        Return a new cursor for the passed SQL statement, to be held
+        in the statement cache.
+
+        DESIGN:
+        For pyodbc and sqlite3, re-executing the same SQL on the same
+        cursor reuses the prepared statement, so a plain cursor is
+        returned.
+        """
+
+        return conn.cursor()
+
+    # ------------------------------------------------------------------
+    def _record(self, sql, seconds, rows=0, nbytes=0):
+        """
+        Record the timing of a statement, and write it to the slow query
+        log if it exceeds the threshold.
+        """
+
+        # INITIALISE
+        key = _statement_key(sql)
+
+        self._qstats.record(key=key, seconds=seconds, rows=rows, nbytes=nbytes)
+        # LOG A SLOW STATEMENT
+        if self._slow_log is not None and seconds >= self._slow_secs:
+            with self._lock:
+                self._slow_log.write(text='%.6f,%d,"%s"' % (seconds, rows,
+                                                            key.replace('"', '""')))
+
+    # ------------------------------------------------------------------
+    def _retry(self, op, func, **kwargs):
+        """
+        Call the function using the retry policy and the circuit
+        breaker, and return its result.
+
+        DESIGN:
+        An attempt is refused (with a CircuitOpenError) while the
+        circuit is open.  Only a transient error (refer to the
+        _is_transient() function) is counted against the circuit and
+        retried; any other error (e.g. a rejected login, or an invalid
+        query) shows the target is reachable, so is raised immediately.
+        So a wrong password is tried once, rather than risking an
+        account lockout.
+
+        PARAMETERS:
+        - op
+        Name of the operation ('connect' or 'read'), used for stats.
+        - func
+        The function to be called.
+        - **kwargs
+        Keyword arguments passed to the function.
+        """
+
+        # INITIALISE
+        breaker = self._breaker(creds=kwargs.get('creds'))
+        policy = self.retry_policy
+        self._count(op=op, key='calls')
+
+        for attempt in range(1, policy.max_attempts + 1):
+            # TEST THE CIRCUIT
+            try:
+                breaker.allow()
+            except CircuitOpenError:
+                self._count(op=op, key='rejected')
+                self._count(op=op, key='failures')
+                raise
+            self._count(op=op, key='attempts')
+            if attempt > 1: self._count(op=op, key='retries')
+
+            start = time.time()
+            try:
+                result = func(**kwargs)
+            except Exception as err:
+                # TEST FOR A FAILURE OF THE TARGET (RATHER THAN OF THE REQUEST)
+                if not _is_transient(err):
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                # TEST FOR THE FINAL ATTEMPT >> WAIT BEFORE RETRYING
+                if attempt >= policy.max_attempts:
+                    self._count(op=op, key='failures')
+                    raise
+                time.sleep(policy.delay(attempt=attempt))
+            else:
+                breaker.record_success()
+                self._count(op=op, key='seconds', value=time.time() - start)
+                return result
+
+    # ------------------------------------------------------------------
+    def _run_partitions(self, ranges, workers, handle, on_error, stop):
+        """
+        Start, and return, the worker threads of a parallel_extract().
+
+        DESIGN:
+        Each worker opens its own connection, then takes partitions
+        (in key order) from a shared task queue and passes each to the
+        handle function, as handle(conn, idx, start, stop).  A failure
+        (including a failed connection) is passed to the on_error
+        function, as on_error(idx, err), and the worker exits.  Workers
+        also exit once the stop event is set.
+        """
+
+        # INITIALISE
+        tasks = queue.Queue()
+        for idx, (start, stop_) in enumerate(ranges): tasks.put((idx, start, stop_))
+
+        def worker():
+            conn = None
+            while not stop.is_set():
+                # TAKE THE NEXT PARTITION
+                try:
+                    idx, start, stop_ = tasks.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    if conn is None: conn = self._open(creds=self._creds)
+                    handle(conn, idx, start, stop_)
+                except Exception as err:
+                    on_error(idx, err)
+                    break
+            if conn is not None: self._close_connection(conn=conn)
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        return threads
+
+    # ------------------------------------------------------------------
+    def _run_script(self, script, commit, commit_every, commit_interval):
+        """
+        Execute each statement of an open script file, and return a
+        boolean value based on the success of the script.
+
+        DESIGN:
+        Refer to the execute_script() method for the commit policy.
+        """
+
+        # INITIALISE
+        count = 0
+        committed = 0
+        checkpoint = time.time()
+
+        for lineno, sql in sqlscript.iter_statements(stream=script,
+                                                     backslash_escapes=self._BACKSLASH_ESCAPES,
+                                                     with_lineno=True):
+            try:
+                # EXECUTE COMMAND
+                start = time.time()
+                self.cur.execute(sql)
+                self._record(sql=sql, seconds=time.time() - start,
+                             rows=max(self.cur.rowcount, 0))
+            except Exception as err:
+                # ROLLBACK TO THE LAST CHECKPOINT >> USER NOTIFICATION
+                if commit: self.conn.rollback()
+                self._ui.print_alert('\nStatement %d (starting on line %d) of the script failed:'
+                                     '\n%s' % (count + 1, lineno, sql[:200]))
+                if commit: self._ui.print_alert('The transaction was rolled back. %d statement(s) '
+                                                'were committed.' % committed)
+                self._ui.print_error(err)
+                return False
+
+            count += 1
+            # CLEAR CACHES AFFECTED BY THE STATEMENT
+            self._after_statement(sql=sql)
+
+            # COMMIT AT A CHECKPOINT?
+            if commit and ((commit_every and count - committed >= commit_every) or
+                           (commit_interval and time.time() - checkpoint >= commit_interval)):
+                self.conn.commit()
+                committed = count
+                checkpoint = time.time()
+
+        # FINAL COMMIT
+        if commit and count > committed: self.conn.commit()
+
+        return True
+
+    # ------------------------------------------------------------------
+    def _save_snapshot(self, local, sql, params, name, source, batch_size):
+        """
+        Build a snapshot table in the local SQLite database, and
+        replace the existing snapshot in a single transaction (refer
+        to snapshot()).
+        """
+
+        # INITIALISE
+        build = '_%s_%d_%d' % (name, os.getpid(), threading.current_thread().ident)
+
+        try:
+            # COPY THE QUERY RESULT INTO A NEW TABLE
+            local.execute(sql='DROP TABLE IF EXISTS %s' % build, commit=True)
+            stats = copy_table(src_db=self, dst_db=local, table_or_query=sql, target=build,
+                               batch_size=batch_size, params=params)
+            if stats is None: raise DatabaseError('The snapshot %s could not be built.' % name)
+
+            # REPLACE THE SNAPSHOT >> RECORD ITS SOURCE
+            local.execute(sql='INSERT OR REPLACE INTO _snapshots VALUES (?, ?, ?, ?)',
+                          params=(name, source, time.time(), stats['rows']))
+            local.execute(sql='DROP TABLE IF EXISTS %s' % name)
+            local.execute(sql='ALTER TABLE %s RENAME TO %s' % (build, name), commit=True)
+        except Exception:
+            # ROLL BACK >> REMOVE THE NEW TABLE
+            local.conn.rollback()
+            local.execute(sql='DROP TABLE IF EXISTS %s' % build, commit=True)
+            raise
+
+    # ------------------------------------------------------------------
+    def _statements(self, conn):
+        """Return the statement cache for the passed connection."""
+
+        with self._lock:
+            # TEST THE CACHE BELONGS TO THIS CONNECTION (IDS CAN BE REUSED)
+            entry = self._stmts.get(id(conn))
+            if entry is None or entry[0] is not conn:
+                cache = _StatementCache(prepare=partial(self._prepare, conn),
+                                        size=self.statement_cache_size)
+                entry = self._stmts[id(conn)] = (conn, cache)
+
+        return entry[1]
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _stream_cursor(conn, batch_size):
+        """
+        Return a new cursor, suitable for streaming a large result
+        set from the passed connection.
+        """
+
+        # CREATE CURSOR >> SET FETCH SIZE (WHERE SUPPORTED)
+        cur = conn.cursor()
+        if hasattr(cur, 'arraysize'): cur.arraysize = batch_size
+
+        return cur
+
+    # ------------------------------------------------------------------
+    def _table_ddl(self, table, columns, kinds):
+        """
+        Return a CREATE TABLE statement for the column names and their
+        NumPy data type kinds, using the _DDL_TYPES class attribute.
+        Any other kind (e.g. timedelta) is created as a text column.
+        """
+
+        # BUILD EACH COLUMN DEFINITION
+        cols = ['%s %s' % (col, self._DDL_TYPES.get(kind, self._DDL_TYPES['O']))
+                for col, kind in zip(columns, kinds)]
+
+        return 'CREATE TABLE %s (%s)' % (table, ', '.join(cols))
+
+
+# ----------------------------------------------------------------------
+class MySQL(Database):
+
+    """
+    PURPOSE:
+    This class is a lightweight wrapper for mysql-connector, and used
+    to handle database objects for MySQL.
+
+    PARAMETERS:
+    - host (default None)
+    IP address or machine name of the host or database server.
+    - database (default None)
+    The name of the database to be connected.
+    - user (default None)
+    Login: user name
+    - password (default None)
+    Login: password
+    - port (default 3306)
+    The TCP/IP port of the MySQL server; must be an integer.
+    - from_file (default False)
+    Load the database credentials from a config file.
+      - valid keys: host, database, port, user, password
+    - filename (default None)
+    Full path to the file holding the database credentials.
+
+    DEPENDENCIES:
+    - mysql-connector (2.1.4)
+    Installation: > pip install mysql-connector==2.1.4
+
+    USE:
+    > from utils.database import MySQL
+    >
+    > # LOAD CREDENTIALS
+    > sql = MySQL(host='my_host', database='my_db',
+                  user='my_user', password='my_pass')
+    >
+    > # CONNECT TO THE DB
+    > sql.connect()
+    > # CHECK CONNECTION WAS SUCCESSFUL
+    > sql.connected
+    > True
+    """
+
+    # QUERY RETURNING (TABLE, COLUMN, DATA TYPE) FOR ALL TABLES
+    _CATALOG_SQL = """
+    SELECT table_name, column_name, data_type
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE table_schema = DATABASE()
+    ORDER BY table_name, ordinal_position
+    """
+    # DB-API PARAMETER STYLE USED BY THE DRIVER
+    _PARAMSTYLE = 'format'
+    # A BACKSLASH ESCAPES A QUOTE CHARACTER WITHIN A STRING LITERAL
+    _BACKSLASH_ESCAPES = True
+    # COLUMN DATA TYPES FOR A NUMPY DATA TYPE KIND, USED TO CREATE A TABLE
+    _DDL_TYPES = {'b': 'TINYINT(1)', 'i': 'BIGINT', 'u': 'BIGINT', 'f': 'DOUBLE',
+                  'M': 'DATETIME', 'O': 'TEXT'}
+
+    # ------------------------------------------------------------------
+    def __init__(self, host=None, database=None, user=None,
+                 password=None, port=3306, from_file=False,
+                 filename=None):
+
+        # INHERIT SUPER-CLASS PROPERTIES
+        super(MySQL, self).__init__()
+        # INITIALISE
+        self._host      = host
+        self._database  = database
+        self._user      = user
+        self._password  = password
+        self._port      = port
+        self._from_file = from_file
+        self._filename  = filename
+
+
+    # ------------------------------------------------------------------
+    def connect(self):
+        """
+        Connect to the database.  Update class properties accordingly.
+
+        DESIGN:
+        Function designed to create a connection to a MySQL database
+        using the provided login parameters, or directly from a config
+        file. If a login detail is not provided, the user is prompted;
+        which can be used as a security feature.
+
+        NOTE: To prompt for login details, leave the parameter(s)
+        blank.
+
+        Working in the background for the credential validation and
+        handling the actual database connection, are several other
+        functions which can be found in the utils module.
+
+        SOURCE:
+        The connection argument keys for a MySQL connection using the
+        mysql.connection library, are listed here:
+        https://dev.mysql.com/doc/connector-python/en/connector-python-connectargs.html
+        """
+
+        try:
+            # INITIALISE
+            creds = dict()
+            dbtype = 'mysql'
+
+            # TEST IF A CONFIG FILE IS TO BE USED
+            if self._from_file:
+                # DEFINE CREDENTIAL KEYS
+                db_keys = ['host', 'database', 'port', 'user', 'password']
+                # GET CREDENTIALS FROM THE CONFIG FILE
+                creds = utils._dbconn_fields(dbtype=dbtype, fields=db_keys,
+                                             filename=self._filename)
+            else:
+                # GET CREDENTIALS FROM PASSED PARAMETERS
+                creds = utils._dbconn_params(dbtype=dbtype, host=self._host,
+                                             database=self._database, user=self._user,
+                                             password=self._password)
+
+            # TEST IF CREDENTIALS ARE POPULATED
+            if creds is not None:
+                # CONNECT TO THE DATABASE >> UPDATE CLASS PROPERTIES
+                self._connect(creds=creds)
+
+        except Exception as err:
+            # USER NOTIFICATION
+            self._ui.print_alert('\nAn error occurred while connecting to the MySQL database.')
+            self._ui.print_error(err)
+
+
+    # ------------------------------------------------------------------
+    def _connect(self, creds):
+        """
+        Connect to the database using the passed credentials, update
+        class properties accordingly.
+
+        DESIGN:
+        The cursor is set with the buffered parameter set to True;
+        allowing the cursor to fetch all rows, rather than being
+        'lazily' loaded.
+
+        SOURCE: https://stackoverflow.com/a/33632767/6340496
+        """
+
+        try:
+            # MAKE THE CONNECTION
+            self.conn       = self._open(creds=creds)
+            # SET CLASS PROPERTIES
+            self.cur        = self.conn.cursor(buffered=True)
+            self._creds     = creds
+            self.connected  = True
+        except Exception:
+            self.connected = False
+
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _open_connection(creds):
+        """
+        Return a new connection object, using the passed credentials.
+
+        The driver is called directly (rather than through the utils
+        connection function, which reports and hides the error), so the
+        driver's exception is raised if the connection fails.
+        """
+
+        import mysql.connector as sql
+
+        return sql.connect(**creds)
+
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _close_cursor(conn, cur):
+        """
+        Close a cursor, ignoring any errors.
+
+        DESIGN:
+        An unbuffered MySQL cursor which has not been fully read
+        leaves unread rows on the connection, which must be consumed
+        before the connection can be used again.
+        """
+
+        try:
+            # CONSUME ANY UNREAD ROWS >> CLOSE
+            if conn.unread_result: conn.get_rows()
+            cur.close()
+        except Exception:
+            pass
+
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _column_dtype(column):
+        """
+        Return the NumPy data type for a column of a cursor's
+        description, from the MySQL field type code; or None if the
+        type should be inferred from the values.
+        """
+
+        return _MYSQL_DTYPES.get(column[1])
+
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _prepare(conn, sql, params=None):
+        """
+        Return a new cursor for the passed SQL statement, to be held
+        in the statement cache.
+
+        DESIGN:
+        If parameters are passed, a prepared cursor (using the MySQL
+        binary protocol) is returned, which is prepared once on first
+        execution and reused for later executions of the same SQL.
+        Otherwise, a buffered cursor is returned.
+        """
+
+        return conn.cursor(prepared=True) if params is not None else conn.cursor(buffered=True)
+
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _stream_cursor(conn, batch_size):
+        """
+        Return a new unbuffered cursor, suitable for streaming a large
+        result set from the passed connection.
+
+        DESIGN:
+        Unlike the class' .cur property, this cursor is *not* buffered,
+        so rows are read from the server as they are fetched, rather
+        than the full result set being loaded into memory on execute.
+        """
+
+        return conn.cursor(buffered=False)
+
+
+# ----------------------------------------------------------------------
+class Oracle(Database):
+
+    """
+    PURPOSE:
+    This class is a lightweight wrapper for cx_Oracle, where commonly
+    used cx_Oracle methods and functions have been added as class
+    properties.
+
+    PARAMETERS:
+    - host (default None)
+    Database name, or TNS host
+    - user (default None)
+    Login: user name
+    - password (default None)
+    Login: password
+    - from_file (default False)
+    Load the database credentials from a config file.
+      - valid keys: host, user, password
+    - filename (default None)
+    Full path to the file holding the database credentials.
+
+    USE:
+    > from utils.database import Oracle
+    >
+    > # LOAD CREDENTIALS
+    > ora = Oracle(host='my_host', user='my_user', password='my_pass')
+    >
+    > # CONNECT TO THE DB
+    > ora.connect()
+    > # CHECK CONNECTION WAS SUCCESSFUL
+    > ora.connected
+    > True
+    """
+
+    # QUERY RETURNING (TABLE, COLUMN, DATA TYPE) FOR ALL TABLES
+    _CATALOG_SQL = """
+    SELECT c.table_name, c.column_name, c.data_type
+    FROM sys.user_tab_columns c
+    JOIN sys.user_tables t ON t.table_name = c.table_name
+    ORDER BY c.table_name, c.column_id
+    """
+    # SQL STATEMENT USED TO TEST A CONNECTION IS ALIVE
+    _PING_SQL = 'SELECT 1 FROM dual'
+    # DB-API PARAMETER STYLE USED BY THE DRIVER
+    _PARAMSTYLE = 'numeric'
+    # COLUMN DATA TYPES FOR A NUMPY DATA TYPE KIND, USED TO CREATE A TABLE
+    _DDL_TYPES = {'b': 'NUMBER(1)', 'i': 'NUMBER(19)', 'u': 'NUMBER(20)', 'f': 'BINARY_DOUBLE',
+                  'M': 'TIMESTAMP', 'O': 'VARCHAR2(4000)'}
+
+    # ------------------------------------------------------------------
+    def __init__(self, host=None, user=None, password=None,
+                 from_file=False, filename=None):
+
+        # INHERIT SUPER-CLASS PROPERTIES
+        super(Oracle, self).__init__()
+        # INITIALISE
+        self.connstr    = ''
+        self._host      = host
+        self._user      = user
+        self._password  = password
+        self._from_file = from_file
+        self._filename  = filename
+
+
+    # ------------------------------------------------------------------
+    def connect(self):
+        """
+        Connect to the database.  Update class properties accordingly.
+
+        DESIGN:
+        Function designed to create a connection to an Oracle
+        database using the provided login parameters, or directly from
+        a config file. If a login detail is not provided, the user is
+        prompted; which can be used as a security feature.
+
+        NOTE: To prompt for login details, leave the parameter(s)
+        blank.
+
+        Working in the background for the credential validation and
+        handling the actual database connection, are several other
+        functions which can be found in the utils module.
+        """
+
+        try:
+            # INITIALISE
+            creds = dict()
+            dbtype = 'oracle'
+
+            # TEST IF A CONFIG FILE IS TO BE USED
+            if self._from_file:
+                # DEFINE CREDENTIAL KEYS
+                db_keys = ['host', 'user', 'password']
+                # GET CREDENTIALS FROM THE CONFIG FILE
+                creds = utils._dbconn_fields(dbtype=dbtype, fields=db_keys,
+                                             filename=self._filename)
+            else:
+                # GET CREDENTIALS FROM PASSED PARAMETERS
+                creds = utils._dbconn_params(dbtype=dbtype, host=self._host, user=self._user,
+                                             password=self._password)
+
+            # TEST IF CREDENTIALS ARE POPULATED
+            if creds is not None:
+                # CONNECT TO THE DATABASE >> UPDATE CLASS PROPERTIES
+                self._connect(creds=creds)
+
+        except Exception as err:
+            # USER NOTIFICATION
+            self._ui.print_alert('\nAn error occurred while connecting to the Oracle database.')
+            self._ui.print_error(err)
+
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _column_dtype(column):
+        """
+        Return the NumPy data type for a column of a cursor's
+        description, from the cx_Oracle type; or None if the type
+        should be inferred from the values.
+
+        DESIGN:
+        A NUMBER column with a precision and a scale of zero is an
+        integer; any other NUMBER (or binary float) column is float64.
+        """
+
+        # GET THE TYPE NAME (E.G. 'NUMBER' OR 'DB_TYPE_NUMBER')
+        code = column[1]
+        name = getattr(code, 'name', getattr(code, '__name__', str(code))).upper()
+
+        if name.endswith('NUMBER'): return 'int64' if column[4] and column[5] == 0 else 'float64'
+        if 'FLOAT' in name or 'DOUBLE' in name: return 'float64'
+
+        return None
+
+    # ------------------------------------------------------------------
+    def _connect(self, creds):
+        """
+        Connect to the database using the passed credentials, update
+        class properties accordingly.
+
+        DESIGN:
+        In addition to setting the 'typical' class properties, a
+        connection string property has been added to this Oracle
+        specific connection.
+        """
+
+        try:
+            # MAKE THE CONNECTION
+            self.conn       = self._open(creds=creds)
+            # SET CLASS PROPERTIES
+            self.cur        = self.conn.cursor()
+            self.connstr    = '%s/%s@%s' % (creds['user'], creds['password'], creds['host'])
+            self._creds     = creds
+            self.connected  = True
+        except Exception:
+            self.connected = False
+
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _execute_prepared(cur, sql, params=None):
+        """
+        Execute a cursor created by the _prepare() method, binding the
+        parameters, if provided.
+
+        DESIGN:
+        The statement has already been prepared on the cursor, so None
+        is passed as the statement; which instructs cx_Oracle to reuse
+        the prepared statement.
+        """
+
+        if params is None:
+            cur.execute(None)
+        else:
+            cur.execute(None, params)
+
+        return cur
+
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _open_connection(creds):
+        """
+        Return a new connection object, using the passed credentials.
+
+        The driver is called directly (rather than through the utils
+        connection function, which reports and hides the error), so the
+        driver's exception is raised if the connection fails.
+        """
+
+        import cx_Oracle
+
+        return cx_Oracle.connect('%s/%s@%s' % (creds['user'], creds['password'], creds['host']))
+
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _prepare(conn, sql, params=None):
+        """
+        Return a new cursor on which the passed SQL statement has been
+        prepared, to be held in the statement cache.
+        """
+
+        cur = conn.cursor()
+        cur.prepare(sql)
+
+        return cur
+
+
+# ----------------------------------------------------------------------
+class SQLite(Database):
+
+    """
+    PURPOSE:
+    This class is a lightweight wrapper for sqlite3, and used to handle
+    database objects for SQLite.
+
+    PARAMETERS:
+    - db_file_path
+    Full path to the SQLite database file.
+    - profile (default None)
+    Name of a performance profile, applied to each connection as it
+    is opened:
+        - 'read_heavy': WAL journal, memory mapped I/O (256 MB) and a
+                        64 MB page cache.
+        - 'bulk_load':  In-memory journal, no fsync and a 256 MB page
+                        cache.  A crash during a write may corrupt the
+                        database; only use on a file which can be
+                        rebuilt.
+        - 'concurrent': WAL journal (readers do not block the writer)
+                        and a 30 second busy timeout.
+    If None, the SQLite defaults are used.
+    - pragmas (default None)
+    Dictionary of PRAGMA settings, which override the profile's
+    settings.  Valid keys: journal_mode, synchronous, mmap_size,
+    cache_size, temp_store, busy_timeout.
+
+    - in_memory (default False)
+    Copy the database file into memory on connect, and run all
+    queries against the in-memory copy.  Refer to the DESIGN section.
+    - resync_interval (default None)
+    For an in-memory copy, the number of seconds between tests of
+    the file's modification time; if the file has changed, the copy
+    is reloaded.  If None, the copy is only reloaded by resync().
+    - thread_local (default False)
+    Provide each thread with its own connection through checkout()
+    (and so fetch(), iter_query(), etc.), opened on the thread's first
+    use.  This takes the place of a connection pool.
+    - read_only (default False)
+    Open all connections to the file using a read-only (mode=ro) URI,
+    so the file cannot be written, and readers take no write locks.
+
+    NOTE: The WAL journal mode is stored in the database file, so
+    remains set for later connections.
+
+    DESIGN:
+    In in-memory mode, the file is copied using the sqlite3 backup
+    API into a named, shared-cache in-memory database; so the class'
+    connection and any pooled connections all read the same copy,
+    and lookups are served from RAM rather than disk pages.  The copy
+    lives until disconnect() is called.
+
+    The in-memory copy is intended for read-heavy use.  Writes are
+    made to the copy only (never the file), and are lost when the copy
+    is reloaded.
+
+    In thread-local mode, connections of finished threads are closed
+    as new connections are opened, and all thread connections are
+    closed by disconnect(); so a thread pool can query the same file
+    in parallel without sharing a connection.
+
+    USE:
+    > from utils.database import SQLite
+    >
+    > # LOAD CREDENTIALS
+    > sql = SQLite(db_file_path='path/to/data.db')
+    > sql = SQLite(db_file_path='path/to/data.db', profile='read_heavy',
+    >              pragmas={'cache_size': -131072})
+    > sql = SQLite(db_file_path='path/to/lookup.db', in_memory=True, resync_interval=60)
+    > sql = SQLite(db_file_path='path/to/data.db', thread_local=True, read_only=True)
+    >
+    > # CONNECT TO THE DB
+    > sql.connect()
+    > # CHECK CONNECTION WAS SUCCESSFUL
+    > sql.connected
+    > True
+    """
+
+    # QUERY RETURNING (TABLE, COLUMN, DATA TYPE) FOR ALL TABLES
+    _CATALOG_SQL = """
+    SELECT m.name, p.name, p.type
+    FROM sqlite_master m
+    JOIN pragma_table_info(m.name) p
+    WHERE m.type = 'table'
+    ORDER BY m.name, p.cid
+    """
+    # COLUMN DATA TYPES FOR A NUMPY DATA TYPE KIND, USED TO CREATE A TABLE
+    _DDL_TYPES = {'b': 'INTEGER', 'i': 'INTEGER', 'u': 'INTEGER', 'f': 'REAL',
+                  'M': 'TIMESTAMP', 'O': 'TEXT'}
+    # PRAGMA SETTINGS FOR EACH PERFORMANCE PROFILE
+    _PROFILES = {'read_heavy': OrderedDict([('journal_mode', 'WAL'), ('synchronous', 'NORMAL'),
+                                            ('mmap_size', 268435456), ('cache_size', -65536),
+                                            ('temp_store', 'MEMORY')]),
+                 'bulk_load': OrderedDict([('journal_mode', 'MEMORY'), ('synchronous', 'OFF'),
+                                           ('cache_size', -262144), ('temp_store', 'MEMORY')]),
+                 'concurrent': OrderedDict([('journal_mode', 'WAL'), ('synchronous', 'NORMAL'),
+                                            ('busy_timeout', 30000), ('cache_size', -16384)])}
+    # PRAGMA SETTINGS WHICH CAN BE APPLIED, AND REPORTED BY SETTINGS()
+    _PRAGMAS = ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store',
+                'busy_timeout')
+
+    # ------------------------------------------------------------------
+    def __init__(self, db_file_path, profile=None, pragmas=None, in_memory=False,
+                 resync_interval=None, thread_local=False, read_only=False):
+
+        # INHERIT SUPER-CLASS PROPERTIES
+        super(SQLite, self).__init__()
+        # INITIALISE
+        self._db_file_path = db_file_path
+        self._settings = OrderedDict()
+        self._in_memory = in_memory
+        self._resync_interval = resync_interval
+        self._mtime = None
+        self._checked = 0
+        self._mirror_lock = threading.Lock()
+        self._thread_local = thread_local
+        self._read_only = read_only
+        self._local = threading.local()
+        self._thread_conns = dict()
+        self._generation = 0
+
+        # VALIDATION
+        if profile is not None and profile not in self._PROFILES:
+            raise DatabaseError('The profile must be one of: %s' %
+                                ', '.join(sorted(self._PROFILES)))
+        for name, value in (pragmas or {}).items():
+            if name not in self._PRAGMAS or not _RE_PRAGMA_VALUE.match(str(value)):
+                raise DatabaseError('Invalid PRAGMA setting: %s = %s' % (name, value))
+
+        # COMBINE THE PROFILE AND EXPLICIT SETTINGS
+        self._settings.update(self._PROFILES.get(profile, {}))
+        self._settings.update(pragmas or {})
+
+
+    # ------------------------------------------------------------------
+    @contextmanager
+    def checkout(self):
+        """
+        Context manager which provides a database connection for the
+        duration of the with block.
+
+        For an in-memory copy with a resync_interval, the file is
+        tested for changes (and the copy reloaded) first.
+
+        In thread-local mode, the calling thread's own connection is
+        provided.  Otherwise, refer to the Database.checkout() method.
+        """
+
+        # TEST FOR A CHANGED FILE
+        if self._in_memory and self._resync_interval is not None: self._check_mirror()
+
+        # TEST FOR THREAD-LOCAL MODE
+        if self._thread_local:
+            yield self._thread_connection()
+            return
+
+        with super(SQLite, self).checkout() as conn:
+            yield conn
+
+
+    # ------------------------------------------------------------------
+    def connect(self):
+        """Connect to the SQLite database file."""
+
+        # TEST IF THE DB FILE EXISTS
+        if utils.fileexists(self._db_file_path):
+            # CONNECT
+            self._connect()
+
+
+    # ------------------------------------------------------------------
+    def disconnect(self):
+        """
+        Disconnect the database connection, and close all thread-local
+        connections.  Refer to the Database.disconnect() method.
+        """
+
+        with self._lock:
+            # CLOSE ALL THREAD CONNECTIONS >> INVALIDATE THE THREADS' REFERENCES
+            conns = list(self._thread_conns.values())
+            self._thread_conns.clear()
+            self._generation += 1
+
+        for conn in conns: self._close_connection(conn=conn)
+
+        super(SQLite, self).disconnect()
+
+
+    # ------------------------------------------------------------------
+    def load_csv(self, path, table, batch_size=50000, create=True, header=True,
+                 delimiter=',', encoding='utf-8', sample_size=1000):
+        """
+        Load a CSV file into a table, and return a dictionary of load
+        statistics.
+
+        DESIGN:
+        The file is streamed through the csv module's reader, and each
+        batch of rows is passed (as an iterator, without building a
+        list) to executemany() and committed as one transaction.
+        Empty fields are loaded as NULL using NULLIF() in the INSERT
+        statement, and numeric text is converted by SQLite's column
+        type affinity; so no per-value conversion is done in Python.
+
+        If the table does not exist and create is True, the table is
+        created with column types inferred from the first sample_size
+        rows: INTEGER, REAL or TEXT.
+
+        For the duration of the load, journal_mode is set to OFF and
+        synchronous to OFF, which removes the rollback journal and the
+        fsync calls; the original settings are restored afterwards.
+        As the database file may be corrupted if the process (or
+        machine) crashes during the load, only use this method on a
+        database which can be rebuilt.
+
+        On error, the current batch is rolled back (previous batches
+        remain) and None is returned.
+
+        PARAMETERS:
+        - path
+        Full path to the CSV file.
+        - table
+        Name of the target table.
+        - batch_size (default 50000)
+        Number of rows in each executemany() call and transaction.
+        - create (default True)
+        Create the table if it does not exist.
+        - header (default True)
+        The first line of the file holds the column names.  If False,
+        the columns are named column_1, column_2, etc.
+        - delimiter (default ',')
+        Field delimiter character.
+        - encoding (default 'utf-8')
+        Text encoding of the file.
+        - sample_size (default 1000)
+        Number of rows used to infer the column types.
+
+        RETURN KEYS:
+        - rows:         Number of rows loaded.
+        - seconds:      Time taken for the load.
+        - rows_per_sec: Rows loaded per second.
+
+        USE:
+        > db.load_csv(path='/path/to/data.csv', table='data')
+        > {'rows': 5000000, 'seconds': 14.2, 'rows_per_sec': 352112.7}
+        """
+
+        # INITIALISE
+        start = time.time()
+        count = 0
+        settings = None
+
+        try:
+            with io.open(path, 'r', newline='', encoding=encoding) as f:
+                # READ THE HEADER AND SAMPLE
+                reader = csv.reader(f, delimiter=delimiter)
+                columns = next(reader) if header else None
+                sample = list(islice(reader, sample_size))
+                if columns is None:
+                    columns = ['column_%d' % (i + 1) for i in range(len(sample[0]))]
+                names = ', '.join(_quote_name(col) for col in columns)
+
+                # TEST IF THE TABLE EXISTS >> CREATE
+                if create and not self.table_exists(table):
+                    types = [_infer_type(values) for values in zip(*sample)] or \
+                            ['TEXT'] * len(columns)
+                    self.execute(sql='CREATE TABLE %s (%s)' %
+                                 (table, ', '.join('%s %s' % (_quote_name(col), dtype)
+                                                   for col, dtype in zip(columns, types))),
+                                 commit=True)
+
+                # RELAX DURABILITY FOR THE LOAD
+                self.conn.commit()
+                settings = self._pragmas(cur=self.cur, pragmas=OrderedDict(
+                    [('journal_mode', 'OFF'), ('synchronous', 'OFF')]))
+
+                # LOAD EACH BATCH (AS AN ITERATOR) IN ITS OWN TRANSACTION
+                sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+                    table, names, ', '.join(["NULLIF(?, '')"] * len(columns)))
+                rows = chain(sample, reader)
+                while True:
+                    batch_start = time.time()
+                    loaded = self.cur.executemany(sql, islice(rows, batch_size)).rowcount
+                    self.conn.commit()
+                    if loaded <= 0: break
+                    self._record(sql=sql, seconds=time.time() - batch_start, rows=loaded)
+                    count += loaded
+
+            self._after_statement(sql=sql)
+
+        except Exception as err:
+            # ROLLBACK >> USER NOTIFICATION
+            self.conn.rollback()
+            self._ui.print_alert('\nAn error occurred while loading %s into %s, after %d '
+                                 'rows.' % (path, table, count))
+            self._ui.print_error(err)
+            return None
+
+        finally:
+            # RESTORE THE ORIGINAL SETTINGS
+            if settings is not None: self._pragmas(cur=self.cur, pragmas=settings)
+
+        return self._load_stats(rows=count, start=start)
+
+
+    # ------------------------------------------------------------------
+    def parallel_map(self, table, func, workers=None, key='rowid', reducer=None,
+                     columns='*', partitions=None):
+        """
+        Scan a table in parallel across a pool of worker processes,
+        and return the combined result.
+
+        DESIGN:
+        The range of the (integer) key column is split into partitions
+        of equal width.  Each partition is scanned by a worker process
+        using its own read-only connection to the database file, and
+        the func function is called with an iterable of the
+        partition's rows; so CPU-bound work on the rows runs on all
+        cores, rather than in a single process.
+
+        The partition results (in key order) are combined using the
+        reducer function, if provided; for example, operator.add.
+
+        As the workers are separate processes, func and reducer must be
+        picklable (i.e. defined at the top level of a module), and the
+        file is always read from disk; the in-memory copy and any
+        uncommitted writes are not visible to the workers.
+
+        Exceptions are raised to the caller.
+
+        PARAMETERS:
+        - table
+        Name of the table to be scanned.
+        - func
+        Function accepting an iterable of row tuples (one partition),
+        and returning the partition's result.
+        - workers (default None)
+        Number of worker processes.  If None, the number of CPUs is
+        used.
+        - key (default 'rowid')
+        Integer column used to split the table into ranges; ideally
+        the rowid or an indexed column.
+        - reducer (default None)
+        Function accepting two partition results and returning their
+        combination.  If None, a list of the partition results is
+        returned.
+        - columns (default '*')
+        Column list to be selected for each row.
+        - partitions (default None)
+        Number of key ranges.  If None, four per worker is used, so a
+        worker which finishes early takes another range.
+
+        USE:
+        > import operator
+        >
+        > def total_sales(rows):
+        >     return sum(row[0] for row in rows)
+        >
+        > db.parallel_map(table='sales', func=total_sales, columns='amount',
+        >                 reducer=operator.add)
+        """
+
+        # INITIALISE
+        workers = workers or multiprocessing.cpu_count()
+        partitions = partitions or workers * 4
+        lo, hi = self.cur.execute('SELECT MIN(%s), MAX(%s) FROM %s' %
+                                  (key, key, table)).fetchone()
+
+        # TEST FOR AN EMPTY TABLE
+        if lo is None: return func(iter([])) if reducer else []
+
+        # BUILD A TASK FOR EACH KEY RANGE
+        sql = 'SELECT %s FROM %s WHERE %s >= ? AND %s < ?' % (columns, table, key, key)
+        tasks = [(self._db_file_path, sql, start, stop, func)
+                 for start, stop in _key_ranges(lo=lo, hi=hi, partitions=partitions)]
+
+        # SCAN THE RANGES ON THE WORKER POOL
+        pool = multiprocessing.Pool(processes=min(workers, len(tasks)))
+        try:
+            results = pool.map(_scan_partition, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+        return reduce(reducer, results) if reducer else results
+
+    # ------------------------------------------------------------------
+    def resync(self):
+        """
+        Reload the in-memory copy from the database file.
+
+        The metadata and result caches are cleared, as the copy may
+        have changed.
+        """
+
+        with self._mirror_lock:
+            self._load_mirror()
+
+    # ------------------------------------------------------------------
+    def settings(self):
+        """
+        Return an ordered dictionary of the effective PRAGMA settings
+        on the class' connection.
+
+        DESIGN:
+        The values are read back from the database, so show the
+        settings actually in effect (for example, a journal_mode of WAL
+        is not available for an in-memory database, and mmap_size is
+        limited by the SQLite build).
+
+        USE:
+        > db.settings()
+        > OrderedDict([('journal_mode', 'wal'), ('synchronous', 1), ...])
+        """
+
+        return OrderedDict((name, self.cur.execute('PRAGMA %s' % name).fetchone()[0])
+                           for name in self._PRAGMAS)
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _bind_rows(batch):
+        """
+        Return the batch of rows, with any Decimal values converted.
+
+        DESIGN:
+        As sqlite3 cannot bind Decimal values (as returned for DECIMAL,
+        NUMERIC and NUMBER columns by the other drivers), the values of
+        each inserted batch are converted here; refer to the
+        _sqlite_decimal() function.  A (process-wide) sqlite3 adapter
+        is not registered, so other sqlite3 users are not affected.
+        """
+
+        # TEST FOR DECIMALS (MOST BATCHES HAVE NONE)
+        if not any(isinstance(value, Decimal) for row in batch for value in row): return batch
+
+        return [tuple(_sqlite_decimal(value) if isinstance(value, Decimal) else value
+                      for value in row) for row in batch]
+
+    # ------------------------------------------------------------------
+    def _check_mirror(self):
+        """
+        Reload the in-memory copy if the database file has changed;
+        testing at most once per resync_interval.
+        """
+
+        # TEST IF A CHECK IS DUE
+        now = time.time()
+        if now - self._checked < self._resync_interval: return
+
+        with self._mirror_lock:
+            self._checked = now
+            # TEST FOR A CHANGED FILE >> RELOAD
+            if self._file_mtime() != self._mtime: self._load_mirror()
+
+    # ------------------------------------------------------------------
+    def _connect(self):
+        """
+        Connect to the database file, update class properties
+        accordingly.
+
+        For an in-memory copy, the file is loaded into memory once the
+        connection is made.
+        """
+
+        try:
+            # MAKE THE CONNECTION
+            self._creds     = dict(db_path=self._db_file_path)
+            self.conn       = self._open(creds=self._creds)
+            # SET CLASS PROPERTIES
+            self.cur        = self.conn.cursor()
+            if self._in_memory: self._load_mirror()
+            self.connected  = True
+        except Exception:
+            self.connected = False
+
+    # ------------------------------------------------------------------
+    def _connection_settings(self):
+        """
+        Return the PRAGMA settings applied to a new connection.
+
+        In read-only mode, journal_mode is not applied, as changing the
+        journal mode writes to the database file.
+        """
+
+        if not self._read_only: return self._settings
+
+        return OrderedDict((name, value) for name, value in self._settings.items()
+                           if name != 'journal_mode')
+
+    # ------------------------------------------------------------------
+    def _file_mtime(self):
+        """
+        Return the latest modification time of the database file and
+        its WAL file (if present), as a change in WAL mode may not
+        update the database file until a checkpoint.
+        """
+
+        return max(os.path.getmtime(path) for path in (self._db_file_path,
+                                                         self._db_file_path + '-wal')
+                   if os.path.exists(path))
+
+    # ------------------------------------------------------------------
+    def _load_mirror(self):
+        """
+        Copy the database file into the in-memory database, using the
+        sqlite3 backup API, and clear the metadata and result caches.
+        """
+
+        # INITIALISE
+        mtime = self._file_mtime()
+        src = sqlite3.connect(self._db_file_path)
+
+        try:
+            # COPY THE FILE INTO THE IN-MEMORY DATABASE
+            src.backup(self.conn)
+        finally:
+            src.close()
+
+        self._mtime = mtime
+        self.invalidate_metadata()
+        if self._results is not None: self._results.invalidate()
+
+
+    # ------------------------------------------------------------------
+    def _open_connection(self, creds):
+        """
+        Return a new connection object to the database file, with the
+        profile and PRAGMA settings applied.
+
+        DESIGN:
+        The connection is opened with check_same_thread set to False,
+        so a connection created in one thread (e.g. by a connection
+        pool) can be used by another.  A connection must still only be
+        used by one thread at a time.
+
+        For an in-memory copy, each connection is made to the same
+        named, shared-cache in-memory database.  In read-only mode,
+        the file is opened using a mode=ro URI.
+        """
+
+        # CONNECT (TO THE FILE, OR ITS IN-MEMORY COPY) >> APPLY THE SETTINGS
+        if self._in_memory:
+            conn = sqlite3.connect('file:utils_mirror_%d?mode=memory&cache=shared' % id(self),
+                                   uri=True, check_same_thread=False)
+        elif self._read_only:
+            conn = sqlite3.connect('file:%s?mode=ro' % pathname2url(creds['db_path']),
+                                   uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(creds['db_path'], check_same_thread=False)
+        self._pragmas(cur=conn.cursor(), pragmas=self._connection_settings())
+
+        return conn
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _pragmas(cur, pragmas):
+        """
+        Set the passed dictionary of PRAGMA values using the cursor,
+        and return a dictionary of the previous values.
+        """
+
+        # INITIALISE
+        previous = OrderedDict()
+
+        for name, value in pragmas.items():
+            # READ THE CURRENT VALUE >> SET
+            previous[name] = cur.execute('PRAGMA %s' % name).fetchone()[0]
+            cur.execute('PRAGMA %s = %s' % (name, value)).fetchall()
+
+        return previous
+
+    # ------------------------------------------------------------------
+    def _thread_connection(self):
+        """
+        Return the calling thread's connection, opening it on the
+        thread's first use.
+
+        DESIGN:
+        The connection is held in thread-local storage with the
+        disconnect() generation, so a connection closed by
+        disconnect() is not reused.  Connections belonging to finished
+        threads (or to a reused thread ident) are closed as a new
+        connection is registered.
+        """
+
+        # TEST FOR A CURRENT CONNECTION
+        entry = getattr(self._local, 'entry', None)
+        if entry is not None and entry[0] == self._generation: return entry[1]
+
+        # OPEN A NEW CONNECTION
+        conn = self._open(creds=self._creds)
+        ident = threading.current_thread().ident
+        alive = set(thread.ident for thread in threading.enumerate())
+
+        with self._lock:
+            # REMOVE CONNECTIONS OF FINISHED THREADS >> REGISTER
+            stale = [self._thread_conns.pop(key) for key in list(self._thread_conns)
+                     if key not in alive or key == ident]
+            self._thread_conns[ident] = conn
+            self._local.entry = (self._generation, conn)
+
+        for conn_ in stale: self._close_connection(conn=conn_)
+
+        return conn
+
+
+# ----------------------------------------------------------------------
+class SQLServer(Database):
+
+    """
+    PURPOSE:
+    This class is a lightweight wrapper for pyodbc, and used to handle
+    database objects for SQL Server.
+
+    PARAMETERS:
+    - server (default None)
+    Name of the server where the SQL Server database lives.
+    - database (default None)
+    The name of the database to be connected.
+    - user (default None)
+    Login: user name
+    - password (default None)
+    Login: password
+    - from_file (default False)
+    Load the database credentials from a config file.
+      - valid keys: server, database, user, password
+    - filename (default None)
+    Full path to the file holding the database credentials.
+
+    USE:
+    > from utils.database import SQLServer
+    >
+    > # LOAD CREDENTIALS
+    > sql = SQLServer(server='my_server', database='my_db',
+                      user='my_user', password='my_pass')
+    >
+    > # CONNECT TO THE DB
+    > sql.connect()
+    > # CHECK CONNECTION WAS SUCCESSFUL
+    > sql.connected
+    > True
+    """
+
+    # QUERY RETURNING (TABLE, COLUMN, DATA TYPE) FOR ALL TABLES; KEYED ON THE
+    # SCHEMA QUALIFIED NAME (E.G. STAGE.ORDERS), AND ALSO ON THE TABLE NAME ALONE
+    # FOR TABLES IN THE USER'S DEFAULT SCHEMA; SO SAME-NAMED TABLES IN
+    # DIFFERENT SCHEMAS ARE NOT MERGED
+    _CATALOG_SQL = """
+    SELECT c.name, c.column_name, c.data_type
+    FROM (
+        SELECT table_schema + '.' + table_name AS name, column_name, data_type,
+               ordinal_position
+        FROM INFORMATION_SCHEMA.COLUMNS
+        UNION ALL
+        SELECT table_name, column_name, data_type, ordinal_position
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE table_schema = SCHEMA_NAME()
+    ) c
+    ORDER BY c.name, c.ordinal_position
+    """
+    # COLUMN DATA TYPES FOR A NUMPY DATA TYPE KIND, USED TO CREATE A TABLE
+    _DDL_TYPES = {'b': 'BIT', 'i': 'BIGINT', 'u': 'BIGINT', 'f': 'FLOAT',
+                  'M': 'DATETIME2', 'O': 'NVARCHAR(MAX)'}
+
+    # ------------------------------------------------------------------
+    def __init__(self, server=None, database=None, user=None,
+                 password=None, from_file=False, filename=None):
+
+        # INHERIT SUPER-CLASS PROPERTIES
+        super(SQLServer, self).__init__()
+        # INITIALISE
+        self._server    = server
+        self._database  = database
+        self._user      = user
+        self._password  = password
+        self._from_file = from_file
+        self._filename  = filename
+
+
+    # ------------------------------------------------------------------
+    def connect(self):
+        """
+        Connect to the database.  Update class properties accordingly.
+
+        DESIGN:
+        Function designed to create a connection to a SQL Server
+        database using the provided login parameters, or directly from
+        a config file. If a login detail is not provided, the user is
+        prompted; which can be used as a security feature.
+
+        NOTE: To prompt for login details, leave the parameter(s)
+        blank.
+
+        Working in the background for the credential validation and
+        handling the actual database connection, are several other
+        functions which can be found in the utils module.
+        """
+
+        try:
+            # INITIALISE
+            creds = dict()
+            dbtype = 'sql_server'
+
+            # TEST IF A CONFIG FILE IS TO BE USED
+            if self._from_file:
+                # DEFINE CREDENTIAL KEYS
+                db_keys = ['server', 'database', 'user', 'password']
+                # GET CREDENTIALS FROM THE CONFIG FILE
+                creds = utils._dbconn_fields(dbtype=dbtype, fields=db_keys,
+                                             filename=self._filename)
+            else:
+                # GET CREDENTIALS FROM PASSED PARAMETERS
+                creds = utils._dbconn_params(dbtype=dbtype, server=self._server,
+                                             database=self._database, user=self._user,
+                                             password=self._password)
+
+            # TEST IF CREDENTIALS ARE POPULATED
+            if creds is not None:
+                # CONNECT TO THE DATABASE >> UPDATE CLASS PROPERTIES
+                self._connect(creds=creds)
+
+        except Exception as err:
+            # USER NOTIFICATION
+            self._ui.print_alert('\nAn error occurred while connecting to the SQLServer database.')
+            self._ui.print_error(err)
+
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _bulk_cursor(conn):
+        """
+        Return a new cursor, suitable for executemany() loads.
+
+        DESIGN:
+        The pyodbc fast_executemany flag is set, which sends each batch
+        as a single array of parameters, rather than one round trip
+        per row.
+        """
+
+        cur = conn.cursor()
+        cur.fast_executemany = True
+
+        return cur
+
+
+    # ------------------------------------------------------------------
+    def _connect(self, creds):
+        """
+        Connect to the database using the passed credentials, update
+        class properties accordingly.
+        """
+
+        try:
+            # MAKE THE CONNECTION
+            self.conn       = self._open(creds=creds)
+            # SET CLASS PROPERTIES
+            self.cur        = self.conn.cursor()
+            self._creds     = creds
+            self.connected  = True
+        except Exception:
+            self.connected = False
+
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _open_connection(creds):
+        """
+        Return a new connection object, using the passed credentials.
+
+        The driver is called directly (rather than through the utils
+        connection function, which reports and hides the error), so the
+        driver's exception is raised if the connection fails.
+        """
+
+        import pyodbc
+
+        return pyodbc.connect('Driver={%s};Server=%s;Database=%s;UID=%s;PWD=%s;' %
+                              (utils.getdrivername('SQL Server.*'), creds['server'],
+                               creds['database'], creds['user'], creds['password']))
+
+
+# ----------------------------------------------------------------------
+def copy_table(src_db, dst_db, table_or_query, batch_size=10000, create=True, target=None,
+               params=None):
+    """
+    Copy a table (or the result of a query) from one database to
+    another, and return a dictionary of load statistics.
+
+    DESIGN:
+    The source rows are fetched in batches on a reader thread, and
+    passed through a small bounded queue to the writer (the calling
+    thread), which loads them into the target using the target's
+    insert_many() method; so network reads and writes overlap, and
+    memory use is fixed at a few batches regardless of the table size.
+
+    If the target table does not exist and create is True, it is
+    created using the target's column types (refer to the _DDL_TYPES
+    class attribute).  The type of each column is mapped from the
+    source table's catalog type (for a table), or from the values in
+    the first batch (for a query).
+
+    The load is committed once all rows are copied.  On error, the
+    load is rolled back, the user is notified and None is returned.
+
+    PARAMETERS:
+    - src_db
+    A connected database object (e.g. Oracle, SQLServer) to read from.
+    - dst_db
+    A connected database object (e.g. SQLite) to write to.
+    - table_or_query
+    The name of the source table, or an SQL query.
+    - batch_size (default 10000)
+    Number of rows in each fetch and executemany() batch.
+    - create (default True)
+    Create the target table if it does not exist.
+    - target (default None)
+    Name of the target table.  If None, the source table name is
+    used; this is required when copying a query.
+    - params (default None)
+    Parameters to be bound to the query, using the source's parameter
+    style.
+
+    RETURN KEYS:
+    Refer to the Database.insert_many() method.
+
+    USE:
+    > from utils.database import copy_table, SQLite, SQLServer
+    >
+    > copy_table(src_db=mssql, dst_db=sqlite, table_or_query='dbo.sales', target='sales')
+    > copy_table(src_db=mssql, dst_db=sqlite, target='sales_2018',
+    >            table_or_query='SELECT * FROM dbo.sales WHERE year = 2018')
+    """
+
+    # INITIALISE
+    is_query = len(table_or_query.split()) > 1
+    if is_query and target is None:
+        raise DatabaseError('A target table name is required when copying a query.')
+    sql = table_or_query if is_query else 'SELECT * FROM %s' % table_or_query
+    target = target or table_or_query
+
+    with src_db.checkout() as conn:
+        # CREATE A STREAMING CURSOR >> RUN THE QUERY
+        cur = src_db._stream_cursor(conn=conn, batch_size=batch_size)
+        batches = None
+        try:
+            src_db._execute_cursor(cur=cur, sql=sql, params=params)
+            columns = [col[0] for col in cur.description]
+            # START THE READER >> READ THE FIRST BATCH
+            batches = _read_ahead(batches=_fetch_batches(cur=cur, batch_size=batch_size))
+            first = next(batches, [])
+
+            # TEST IF THE TARGET EXISTS >> CREATE
+            if create and not dst_db.table_exists(target):
+                kinds = _column_kinds(db=src_db, table=None if is_query else table_or_query,
+                                      description=cur.description, rows=first)
+                dst_db.execute(sql=dst_db._table_ddl(table=target, columns=columns, kinds=kinds),
+                               commit=True)
+
+            # WRITE ALL BATCHES
+            return dst_db.insert_many(table=target, columns=columns,
+                                      rows=chain.from_iterable(chain([first], batches)),
+                                      batch_size=batch_size)
+        finally:
+            # STOP THE READER >> CLOSE THE CURSOR
+            if batches is not None: batches.close()
+            src_db._close_cursor(conn=conn, cur=cur)
+
+
+# ----------------------------------------------------------------------
+def _column_kinds(db, table, description, rows):
+    """
+    Return a list of NumPy data type kinds (as used by _DDL_TYPES) for
+    the columns of a cursor's description.
+
+    DESIGN:
+    If a table is passed, each column's kind is mapped from its
+    catalog type.  Otherwise (or if the column is not found), the kind
+    is taken from the first non-NULL value in the rows; then from the
+    cursor description; otherwise text ('O') is used.
+
+    As some catalogs do not report a numeric column's scale (e.g. an
+    Oracle NUMBER(10) column is reported as NUMBER), a numeric catalog
+    type is narrowed to an integer if the cursor description (refer to
+    the _column_dtype() method) identifies the column as an integer.
+    """
+
+    # INITIALISE
+    kinds = []
+    types = (db.column_types(table) or {}) if table else {}
+
+    for idx, col in enumerate(description):
+        # MAP THE CATALOG TYPE >> A VALUE >> THE DESCRIPTION
+        dtype = db._column_dtype(column=col)
+        if col[0] in types:
+            kind = _sql_kind(types[col[0]])
+            kinds.append('i' if kind == 'f' and dtype == 'int64' else kind)
+            continue
+        values = [row[idx] for row in rows if row[idx] is not None]
+        if values:
+            kinds.append(_value_kind(values[0]))
+        elif dtype:
+            kinds.append('i' if dtype.startswith('int') else 'f')
+        else:
+            kinds.append('O')
+
+    return kinds
+
+
+# ----------------------------------------------------------------------
+def _key_ranges(lo, hi, partitions):
+    """
+    Return a list of (start, stop) tuples splitting the integer key
+    range lo to hi (inclusive) into (at most) partitions ranges of
+    equal width; where start is inclusive and stop is exclusive.
+    """
+
+    # INITIALISE
+    width = max(-(-(hi - lo + 1) // partitions), 1)
+
+    return [(start, min(start + width, hi + 1)) for start in range(lo, hi + 1, width)]
+
+
+# ----------------------------------------------------------------------
+def _normalise_sql(sql, backslash_escapes=False):
+    """
+    Return the SQL statement with whitespace collapsed outside quoted
+    text and comments.  Refer to the sqlscript.normalise() function.
+    """
+
+    return sqlscript.normalise(sql=sql, backslash_escapes=backslash_escapes)
+
+
+# ----------------------------------------------------------------------
+def _batch_size_estimate(rows):
+    """
+    Return an estimate of the memory used by a batch of rows, in bytes,
+    based on the size of the first row.
+
+    Sizing only the first row keeps the cost of the estimate constant,
+    regardless of the batch size.
+    """
+
+    return _rows_size(rows[:1]) * len(rows) if rows else 0
+
+
+# ----------------------------------------------------------------------
+def _decode_watermark(value, kind):
+    """Return a watermark value from its stored value and type."""
+
+    if kind in _WATERMARK_FORMATS:
+        value = datetime.datetime.strptime(value, _WATERMARK_FORMATS[kind])
+        return value.date() if kind == 'date' else value
+    if kind == 'decimal': return Decimal(value)
+
+    return value
+
+
+# ----------------------------------------------------------------------
+def _encode_watermark(value):
+    """
+    Return a tuple of (stored value, type) for a watermark value; so
+    dates and decimals can be stored as JSON.
+    """
+
+    if isinstance(value, datetime.datetime):
+        return value.strftime(_WATERMARK_FORMATS['datetime']), 'datetime'
+    if isinstance(value, datetime.date):
+        return value.strftime(_WATERMARK_FORMATS['date']), 'date'
+    if isinstance(value, Decimal): return str(value), 'decimal'
+
+    return value, None
+
+
+# ----------------------------------------------------------------------
+def _fetch_batches(cur, batch_size):
+    """
+    Generator which yields each batch of rows (from fetchmany()) of an
+    executed cursor, until the result set is exhausted.
+    """
+
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows: break
+        yield rows
+
+
+# ----------------------------------------------------------------------
+def _fill_column(array, pos, values):
+    """
+    Copy a batch of column values into the array, starting at the
+    position, and return the array.
+
+    DESIGN:
+    The array is grown (doubling its size) if the batch does not fit.
+    If the batch cannot be held by the array's data type, the array is
+    widened to a type which can hold both; numeric values with NULLs
+    become float64 (NaN), and any non-numeric values become object.
+    A non-numeric batch is copied into an object array as it is, as
+    NumPy would convert a batch of mixed values (e.g. 1, 'a', 2.5)
+    to strings.
+    """
+
+    import numpy as np
+
+    # CONVERT THE BATCH >> NUMERIC VALUES WITH NULLS BECOME FLOAT (NAN)
+    batch = np.asarray(values)
+    if batch.dtype.kind == 'O' and array.dtype.kind in 'biuf':
+        try:
+            batch = np.asarray(values, dtype='float64')
+        except (TypeError, ValueError):
+            pass
+    # NON-NUMERIC >> KEEP THE VALUES (AND THEIR TYPES)
+    if batch.dtype.kind not in 'biuf':
+        batch = np.empty(len(values), dtype=object)
+        batch[:] = values
+
+    # FIND A DATA TYPE FOR BOTH THE ARRAY AND THE BATCH
+    if batch.dtype.kind not in 'biuf' or array.dtype.kind not in 'biuf':
+        dtype = np.dtype(object)
+    else:
+        dtype = np.result_type(array.dtype, batch.dtype)
+
+    # GROW >> WIDEN
+    end = pos + len(batch)
+    if end > len(array):
+        grown = np.empty(max(len(array) * 2, end), dtype=dtype)
+        grown[:pos] = array[:pos]
+        array = grown
+    elif dtype != array.dtype:
+        array = array.astype(dtype)
+
+    array[pos:end] = batch
+
+    return array
+
+
+# ----------------------------------------------------------------------
+def _frame_rows(frame):
+    """
+    Return a list of row tuples for a pandas DataFrame, holding Python
+    values which can be bound by any driver.
+
+    DESIGN:
+    Each column is converted as a whole (not value by value) to an
+    object array; datetime columns to datetime.datetime objects, and
+    NaN / NaT values to None (NULL).  The columns are then zipped into
+    rows.
+    """
+
+    import numpy as np
+    import pandas as pd
+
+    # INITIALISE
+    columns = []
+
+    for _, series in frame.items():
+        # CONVERT THE COLUMN >> REPLACE NULLS
+        values = series.dt.to_pydatetime() if series.dtype.kind == 'M' else series.values
+        values = np.array(values, dtype=object)
+        values[pd.isnull(values)] = None
+        columns.append(values)
+
+    return list(zip(*columns))
+
+
+# ----------------------------------------------------------------------
+def _infer_type(values):
+    """
+    Return the SQLite column type (INTEGER, REAL or TEXT) which holds
+    all of the passed (text) values.  Empty values are ignored; if all
+    values are empty, TEXT is returned.
+    """
+
+    # INITIALISE
+    dtype = 'TEXT'
+
+    for value in values:
+        if value == '': continue
+        if dtype == 'TEXT': dtype = 'INTEGER'
+        # TEST FOR AN INTEGER >> A REAL >> OTHERWISE TEXT
+        if dtype == 'INTEGER':
+            try:
+                int(value)
+                continue
+            except ValueError:
+                dtype = 'REAL'
+        try:
+            float(value)
+        except ValueError:
+            return 'TEXT'
+
+    return dtype
+
+
+# ----------------------------------------------------------------------
+def _is_read(sql):
+    """
+    Return True if the statement only reads from the database; so its
+    result can be cached or shared, and it can be retried.
+
+    DESIGN:
+    A statement is classified by its leading keyword; refer to the
+    _RE_READ expression.  A WITH statement is classified by the
+    statement following the CTE list, so WITH ... INSERT (or UPDATE,
+    DELETE, MERGE) is a write.  As a CTE can itself modify data (e.g.
+    WITH x AS (DELETE ... RETURNING *) SELECT ...), any of these
+    keywords outside quoted text and comments makes a WITH statement
+    a write; as does a SELECT ... FOR UPDATE, which locks rows.
+    """
+
+    match = _RE_READ.match(sql)
+    if match is None: return False
+    if match.group(1).upper() != 'WITH': return True
+
+    return _RE_CTE_WRITE.search(_RE_QUOTED.sub(' ', sql)) is None
+
+
+# ----------------------------------------------------------------------
+def _is_transient(err):
+    """
+    Return True if the exception is a transient error (network,
+    timeout, lock or deadlock) which is worth retrying.
+
+    DESIGN:
+    The drivers do not share exception classes, so the error is
+    classified using its message text and codes; refer to the
+    _RE_TRANSIENT expression.
+    """
+
+    return isinstance(err, (PoolTimeoutError, CircuitOpenError)) is False and \
+        bool(_RE_TRANSIENT.search('%s %s' % (type(err).__name__, err)))
+
+
+# ----------------------------------------------------------------------
+def _new_column(dtype, size):
+    """
+    Return a new, empty column array of the data type and size.
+
+    If the data type is None, the array is created as an empty boolean
+    array (the narrowest type), which is widened to suit the first
+    batch of values.
+    """
+
+    import numpy as np
+
+    return np.empty(size if dtype else 0, dtype=dtype or 'bool')
+
+
+# ----------------------------------------------------------------------
+def _retry_counters():
+    """Return a new dictionary of retry counters."""
+
+    return dict(calls=0, attempts=0, retries=0, failures=0, rejected=0,
+                seconds=0.0, max_seconds=0.0)
+
+
+# ----------------------------------------------------------------------
+def _open_text(path, compress=None, encoding='utf-8'):
+    """
+    Return a text file object opened for (CSV) writing; gzip
+    compressed if compress is 'gzip'.
+    """
+
+    if compress == 'gzip': return gzip.open(path, 'wt', newline='', encoding=encoding)
+
+    return io.open(path, 'w', newline='', encoding=encoding)
+
+
+# ----------------------------------------------------------------------
+def _put(items, item, stop):
+    """
+    Put the item on the bounded queue, waiting for space unless the
+    stop event is set; return True if the item was queued.
+    """
+
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+
+    return False
+
+
+# ----------------------------------------------------------------------
+def _quote_name(name):
+    """Return the column name as a (double) quoted identifier."""
+
+    return '"%s"' % name.replace('"', '""')
+
+
+# ----------------------------------------------------------------------
+def _read_ahead(batches, depth=2):
+    """
+    Generator which reads the passed iterable on a separate thread,
+    and yields its items; so the next item is read while the caller
+    processes the current one.
+
+    DESIGN:
+    Items are passed through a queue of (at most) depth items, so the
+    reader is held back by a slow caller.  An exception raised by the
+    reader is re-raised to the caller.  When the generator is closed
+    (or garbage collected), the reader is stopped and joined.
+    """
+
+    # INITIALISE
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def reader():
+        try:
+            for batch in batches:
+                if not _put(items=items, item=(batch, None), stop=stop): return
+            _put(items=items, item=(None, None), stop=stop)
+        except Exception as err:
+            _put(items=items, item=(None, err), stop=stop)
+
+    thread = threading.Thread(target=reader)
+    thread.daemon = True
+    thread.start()
+
+    try:
+        while True:
+            # GET THE NEXT ITEM >> TEST FOR AN ERROR OR THE END
+            batch, err = items.get()
+            if err is not None: raise err
+            if batch is None: break
+            yield batch
+    finally:
+        stop.set()
+        thread.join()
+
+
+# ----------------------------------------------------------------------
+def _rows_size(rows):
+    """
+    Return an estimate of the memory used by a list of rows, in bytes.
+    """
+
+    # INITIALISE
+    size = sys.getsizeof(rows)
+
+    # ADD THE SIZE OF EACH ROW AND VALUE
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row: size += sys.getsizeof(value)
+
+    return size
+
+
+# ----------------------------------------------------------------------
+def _scan_partition(task):
+    """
+    Worker process function for SQLite.parallel_map(); scan one key
+    range using a read-only connection, and return func's result.
+    """
+
+    # INITIALISE
+    path, sql, start, stop, func = task
+    conn = sqlite3.connect('file:%s?mode=ro' % pathname2url(path), uri=True)
+
+    try:
+        return func(conn.execute(sql, (start, stop)))
+    finally:
+        conn.close()
+
+
+# ----------------------------------------------------------------------
+def _sql_kind(sql_type):
+    """
+    Return the NumPy data type kind for a database column type name;
+    for example, 'i' for INTEGER or NUMBER(10), 'f' for DECIMAL.
+    """
+
+    # INITIALISE
+    sql_type = str(sql_type).upper().strip()
+    # THE TYPE NAME, WITHOUT ITS LENGTH, PRECISION OR MODIFIERS (E.G. UNSIGNED)
+    words = re.sub(r'\([^)]*\)', ' ', sql_type).split()
+
+    if re.match(r'NUMBER\(\s*\d+\s*(?:,\s*0\s*)?\)$', sql_type): return 'i'
+
+    return _SQL_KINDS.get(words[0], 'O') if words else 'O'
+
+
+# ----------------------------------------------------------------------
+def _sqlite_decimal(value):
+    """
+    Return a Decimal value as an int (if integral, and within SQLite's
+    64-bit integer range) or as text, to be bound by sqlite3.
+
+    DESIGN:
+    A non-integral value is bound as text (rather than as a float), so
+    its precision is kept; a column with REAL or NUMERIC affinity
+    converts the text to a number.
+    """
+
+    if value.is_finite() and value == value.to_integral_value() and abs(value) < 2 ** 63:
+        return int(value)
+
+    return str(value)
+
+
+# ----------------------------------------------------------------------
+def _statement_key(sql):
+    """
+    Return the normalised statement used to group statistics; with
+    literal values replaced by '?' and whitespace collapsed.
+    """
+
+    return _normalise_sql(_RE_LITERALS.sub('?', sql))
+
+
+# ----------------------------------------------------------------------
+def _table_word(name):
+    """
+    Return the upper case table name (without schema or quotes) from a
+    (possibly qualified) table reference.
+    """
+
+    return name.split('.')[-1].strip('`"[]').upper()
+
+
+# ----------------------------------------------------------------------
+def _value_kind(value):
+    """Return the NumPy data type kind for a (non-NULL) Python value."""
+
+    if isinstance(value, bool): return 'b'
+    if isinstance(value, int): return 'i'
+    if isinstance(value, (float, Decimal)): return 'f'
+    if isinstance(value, (datetime.date, datetime.datetime)): return 'M'
+
+    return 'O'
+
+
+# ----------------------------------------------------------------------
+class DatabaseError(Exception):
+    """General exception raised by the database module."""
+
+
+# ----------------------------------------------------------------------
+class CircuitOpenError(DatabaseError):
+    """Raised when a call is refused, as the circuit for the target is open."""
+
+
+# ----------------------------------------------------------------------
+class PoolTimeoutError(DatabaseError):
+    """Raised when a pooled connection cannot be borrowed in time."""
+
+
+# ----------------------------------------------------------------------
+class ConnectionPool(object):
+
+    """
+    PURPOSE:
+    This class is a thread-safe pool of database connections, which
+    allows many short queries (and many threads) to reuse 'warm'
+    connections rather than paying for a new connection each time.
+
+    DESIGN:
+    Connections are created by the caller provided factory function,
+    up to max_size.  Returned connections are held in an idle list,
+    and the most recently used connection is borrowed first.
+
+    When a connection is borrowed, idle connections older than
+    idle_timeout are closed (keeping at least min_size open), and the
+    connection is optionally tested with the ping function.  A failed
+    connection is closed and replaced.  If all connections are in use,
+    the caller waits for up to timeout seconds before a
+    PoolTimeoutError is raised.
+
+    Generally, this class is created by the Database.open_pool()
+    method, rather than being used directly.
+
+    PARAMETERS:
+    - factory
+    Function (with no arguments) which returns a new connection.
+    - min_size (default 1)
+    Number of connections opened on pool creation.
+    - max_size (default 5)
+    Maximum number of connections in the pool.
+    - idle_timeout (default 300)
+    Number of seconds after which an idle connection is closed.
+    - timeout (default 30)
+    Number of seconds to wait for a connection before a
+    PoolTimeoutError is raised.
+    - ping (default None)
+    Function accepting a connection and returning a boolean value
+    based on if the connection is alive.  If None, connections are not
+    tested when borrowed.
+    - on_close (default None)
+    Function accepting a connection, which is called just before the
+    pool closes the connection.
+
+    USE:
+    > pool = ConnectionPool(factory=my_connect_function, max_size=10)
+    >
+    > with pool.connection() as conn:
+    >     ...
+    >
+    > pool.stats()
+    > pool.close()
+    """
+
+    # ------------------------------------------------------------------
+    def __init__(self, factory, min_size=1, max_size=5, idle_timeout=300,
+                 timeout=30, ping=None, on_close=None):
+
+        # INITIALISE
+        self._factory       = factory
+        self._min_size      = min(min_size, max_size)
+        self._max_size      = max_size
+        self._idle_timeout  = idle_timeout
+        self._timeout       = timeout
+        self._ping          = ping
+        self._on_close      = on_close
+        self._idle          = deque()
+        self._size          = 0
+        self._closed        = False
+        self._cond          = threading.Condition()
+        self._stats         = dict(checkouts=0, waits=0, wait_time=0.0, max_wait_time=0.0,
+                                   timeouts=0, created=0, closed=0, failed_checks=0)
+
+        # OPEN THE MINIMUM NUMBER OF CONNECTIONS
+        for _ in range(self._min_size):
+            self._idle.append((self._create(), time.time()))
+
+    # ------------------------------------------------------------------
+    def acquire(self, timeout=None):
+        """
+        Borrow a connection from the pool, and return it.
+
+        PARAMETERS:
+        - timeout (default None)
+        Number of seconds to wait for a connection.  If None, the
+        pool's timeout value is used.
+        """
+
+        # INITIALISE
+        timeout = self._timeout if timeout is None else timeout
+        start = time.time()
+        waited = False
+
+        while True:
+            conn = None
+            with self._cond:
+                # TEST FOR A CLOSED POOL
+                if self._closed: raise DatabaseError('The connection pool is closed.')
+                # REMOVE EXPIRED IDLE CONNECTIONS (CLOSED BELOW, OUTSIDE THE LOCK)
+                stale = self._evict_idle()
+
+                if self._idle:
+                    # BORROW THE MOST RECENTLY USED CONNECTION
+                    conn = self._idle.pop()[0]
+                elif self._size < self._max_size:
+                    # RESERVE A SLOT FOR A NEW CONNECTION
+                    self._size += 1
+                else:
+                    # WAIT FOR A CONNECTION TO BE RETURNED
+                    remaining = timeout - (time.time() - start)
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError('A connection could not be borrowed from the '
+                                               'pool within %s seconds.' % timeout)
+                    waited = True
+                    self._cond.wait(remaining)
+                    continue
+
+            # CLOSE EXPIRED CONNECTIONS (A SLOW CLOSE MUST NOT BLOCK OTHER CALLERS)
+            for stale_conn in stale: self._close(stale_conn)
+
+            if conn is None:
+                # CREATE A NEW CONNECTION INTO THE RESERVED SLOT
+                try:
+                    conn = self._factory()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats['created'] += 1
+            elif self._ping is not None and not self._ping(conn):
+                # REPLACE A DEAD CONNECTION
+                with self._cond: self._stats['failed_checks'] += 1
+                self._discard(conn)
+                continue
+
+            # UPDATE STATISTICS
+            with self._cond:
+                wait = time.time() - start
+                self._stats['checkouts'] += 1
+                self._stats['wait_time'] += wait
+                self._stats['max_wait_time'] = max(self._stats['max_wait_time'], wait)
+                if waited: self._stats['waits'] += 1
+
+            return conn
+
+    # ------------------------------------------------------------------
+    def close(self):
+        """Close all idle connections, and mark the pool as closed.
+
+        Connections currently borrowed are closed as they are returned.
+        """
+
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+
+        # CLOSE IDLE CONNECTIONS
+        for conn in idle: self._discard(conn)
+
+    # ------------------------------------------------------------------
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Context manager which borrows a connection from the pool, and
+        returns it on exit.
+
+        DESIGN:
+        On exit, the connection is rolled back before being returned
+        to the pool, so uncommitted work does not leak into the next
+        borrower.  A connection which cannot be rolled back is
+        discarded.
+        """
+
+        conn = self.acquire(timeout=timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    # ------------------------------------------------------------------
+    def release(self, conn, discard=False):
+        """
+        Return a borrowed connection to the pool.
+
+        PARAMETERS:
+        - conn
+        The connection object to be returned.
+        - discard (default False)
+        Close the connection rather than returning it to the pool.
+        """
+
+        # RESET THE CONNECTION STATE
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            # RETURN THE CONNECTION TO THE IDLE LIST
+            if not discard and not self._closed:
+                self._idle.append((conn, time.time()))
+                self._cond.notify()
+                return
+
+        self._discard(conn)
+
+    # ------------------------------------------------------------------
+    def stats(self):
+        """
+        Return a dictionary of pool statistics.
+
+        KEYS:
+        - size:             Number of open connections.
+        - active:           Number of borrowed connections.
+        - idle:             Number of idle connections.
+        - checkouts:        Number of connections borrowed.
+        - waits:            Number of checkouts which waited for a
+                            connection to be returned.
+        - wait_time:        Total seconds spent in checkout.
+        - avg_wait_time:    Average seconds spent in checkout.
+        - max_wait_time:    Longest checkout, in seconds.
+        - timeouts:         Number of checkouts which timed out.
+        - created:          Number of connections created.
+        - closed:           Number of connections closed.
+        - failed_checks:    Number of connections failing the health
+                            check.
+        """
+
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['active'] = self._size - len(self._idle)
+            stats['avg_wait_time'] = (stats['wait_time'] / stats['checkouts']
+                                      if stats['checkouts'] else 0.0)
+
+        return stats
+
+    # ------------------------------------------------------------------
+    def _close(self, conn):
+        """Close a connection, ignoring any errors."""
+
+        try:
+            if self._on_close is not None: self._on_close(conn)
+            conn.close()
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------
+    def _create(self):
+        """Create a new connection, and add it to the pool's size."""
+
+        conn = self._factory()
+        with self._cond:
+            self._size += 1
+            self._stats['created'] += 1
+
+        return conn
+
+    # ------------------------------------------------------------------
+    def _discard(self, conn):
+        """Close a connection, and remove it from the pool's size."""
+
+        self._close(conn)
+
+        with self._cond:
+            self._size -= 1
+            self._stats['closed'] += 1
+            self._cond.notify()
+
+    # ------------------------------------------------------------------
+    def _evict_idle(self):
+        """
+        Remove idle connections which have exceeded the idle timeout,
+        while keeping at least min_size connections open; and return a
+        list of the removed connections, to be closed by the caller
+        *after* releasing the lock.
+
+        NOTE: This method must be called while holding the lock.
+        """
+
+        # INITIALISE
+        now = time.time()
+        stale = []
+
+        # THE OLDEST CONNECTIONS ARE AT THE LEFT OF THE IDLE LIST
+        while (self._idle and self._size > self._min_size and
+               now - self._idle[0][1] > self._idle_timeout):
+            stale.append(self._idle.popleft()[0])
+            self._size -= 1
+            self._stats['closed'] += 1
+
+        return stale
+
+
+# ----------------------------------------------------------------------
+class CircuitBreaker(object):
+
+    """
+    PURPOSE:
+    This class is a thread-safe circuit breaker, which stops callers
+    from repeatedly hitting a database which is down.
+
+    DESIGN:
+    The circuit has three states:
+        - closed:    Calls are allowed.  After threshold consecutive
+                     failures, the circuit is opened.
+        - open:      Calls are refused with a CircuitOpenError, until
+                     reset_timeout seconds have passed.
+        - half_open: A single probe call is allowed; others are
+                     refused.  A successful probe closes the circuit,
+                     and a failed probe opens it again.
+
+    The Database classes share one breaker per DSN (across all
+    instances and pools in the process).
+
+    PARAMETERS:
+    - threshold (default 5)
+    Number of consecutive failures which open the circuit.
+    - reset_timeout (default 30)
+    Number of seconds the circuit stays open before a probe is allowed.
+
+    USE:
+    > breaker = CircuitBreaker(threshold=3, reset_timeout=10)
+    > breaker.allow()
+    > try:
+    >     ...
+    > except Exception:
+    >     breaker.record_failure()
+    > else:
+    >     breaker.record_success()
+    """
+
+    # ------------------------------------------------------------------
+    def __init__(self, threshold=5, reset_timeout=30):
+
+        # INITIALISE
+        self._threshold     = threshold
+        self._reset_timeout = reset_timeout
+        self._state         = 'closed'
+        self._failures      = 0
+        self._opened        = 0
+        self._probing       = False
+        self._lock          = threading.Lock()
+        self._stats         = dict(opened=0, rejected=0, probes=0)
+
+    # ------------------------------------------------------------------
+    def allow(self):
+        """
+        Test if a call is allowed, and raise a CircuitOpenError if not.
+        """
+
+        with self._lock:
+            # TEST FOR AN OPEN CIRCUIT >> ALLOW A PROBE ONCE THE TIMEOUT HAS PASSED
+            if self._state == 'open' and time.time() - self._opened >= self._reset_timeout:
+                self._state = 'half_open'
+                self._probing = False
+            if self._state == 'half_open' and not self._probing:
+                self._probing = True
+                self._stats['probes'] += 1
+                return
+            if self._state == 'closed': return
+
+            self._stats['rejected'] += 1
+            wait = max(self._reset_timeout - (time.time() - self._opened), 0)
+            raise CircuitOpenError('The circuit is open, following %d consecutive failures. '
+                                   'The next attempt is allowed in %.1f seconds.' %
+                                   (self._failures, wait))
+
+    # ------------------------------------------------------------------
+    def record_failure(self):
+        """Record a failed call; opening the circuit if required."""
+
+        with self._lock:
+            self._failures += 1
+            # TEST FOR A FAILED PROBE, OR TOO MANY FAILURES >> OPEN
+            if self._state == 'half_open' or self._failures >= self._threshold:
+                if self._state != 'open': self._stats['opened'] += 1
+                self._state = 'open'
+                self._opened = time.time()
+                self._probing = False
+
+    # ------------------------------------------------------------------
+    def record_success(self):
+        """Record a successful call; closing the circuit."""
+
+        with self._lock:
+            self._state = 'closed'
+            self._failures = 0
+            self._probing = False
+
+    # ------------------------------------------------------------------
+    @property
+    def state(self):
+        """Return the state of the circuit ('closed', 'open' or 'half_open')."""
+
+        return self._state
+
+    # ------------------------------------------------------------------
+    def stats(self):
+        """
+        Return a dictionary of circuit statistics.
+
+        KEYS:
+        - state:    Current state of the circuit.
+        - failures: Number of consecutive failures.
+        - opened:   Number of times the circuit has been opened.
+        - rejected: Number of calls refused.
+        - probes:   Number of half-open probe calls allowed.
+        """
+
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(state=self._state, failures=self._failures)
+
+            return stats
+
+
+# ----------------------------------------------------------------------
+class RetryPolicy(object):
+
+    """
+    PURPOSE:
+    This class defines how a failed operation is retried.
+
+    DESIGN:
+    The delay before each retry grows exponentially (base_delay *
+    multiplier ^ (attempt - 1)), up to max_delay.  If jitter is True,
+    a random delay between zero and this value is used ('full
+    jitter'), so many workers retrying at once do not all hit the
+    database at the same moment.
+
+    PARAMETERS:
+    - max_attempts (default 3)
+    Maximum number of attempts, including the first.  Use 1 to
+    disable retries.
+    - base_delay (default 0.5)
+    Number of seconds before the first retry.
+    - max_delay (default 30)
+    Maximum number of seconds between attempts.
+    - multiplier (default 2)
+    Factor by which the delay grows for each retry.
+    - jitter (default True)
+    Randomise each delay.
+
+    USE:
+    > db.retry_policy = RetryPolicy(max_attempts=5, base_delay=1, max_delay=60)
+    """
+
+    # ------------------------------------------------------------------
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=30, multiplier=2,
+                 jitter=True):
+
+        # INITIALISE
+        self.max_attempts   = max(int(max_attempts), 1)
+        self.base_delay     = base_delay
+        self.max_delay      = max_delay
+        self.multiplier     = multiplier
+        self.jitter         = jitter
+
+    # ------------------------------------------------------------------
+    def delay(self, attempt):
+        """
+        Return the number of seconds to wait after the passed (failed)
+        attempt number.
+        """
+
+        delay = min(self.base_delay * self.multiplier ** (attempt - 1), self.max_delay)
+
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+# ----------------------------------------------------------------------
+class BufferedWriter(object):
+
+    """
+    PURPOSE:
+    This class is a write-behind inserter, which accepts rows at a high
+    rate and writes them to a table in batches on a background thread.
+
+    DESIGN:
+    Rows passed to write() are put on a bounded, thread-safe queue.
+    The background thread collects rows from the queue, and writes a
+    batch (as a single committed transaction, in the same way as the
+    database's insert_many() method) once max_rows rows are collected,
+    or once the oldest collected row has waited max_latency seconds.
+
+    If the queue is full (the database cannot keep up), write() waits
+    for space; which applies back-pressure to the producers rather
+    than using unbounded memory.
+
+    A batch which fails with a transient error (e.g. a lost
+    connection or lock timeout) is retried using the database's retry
+    policy.  A batch which fails with any other error (e.g. a
+    duplicate key), or which still fails once the retry policy's
+    attempts are exhausted, is passed to the on_error callback; or, if
+    no callback is provided, its rows are added to the unwritten list
+    and the user is notified.  The writer then carries on with the
+    next batch, so a bad batch never stops the queue from draining.
+
+    The close() method stops accepting rows, writes every queued row,
+    and waits for the background thread to finish.  If no on_error
+    callback is provided and any rows were not written, a
+    DatabaseError is raised.
+
+    As the background thread uses its own connection from the
+    database's checkout() method, a connection pool should be opened
+    (or a database object dedicated to the writer used), so the class'
+    connection is not shared between threads.
+
+    PARAMETERS:
+    - db
+    A connected database object.
+    - table
+    Name of the table to be loaded.
+    - columns
+    List of column names, in the same order as the row values.
+    - max_rows (default 1000)
+    Number of rows which triggers a write.
+    - max_latency (default 1.0)
+    Maximum number of seconds a row waits before being written.
+    - max_queue (default 100000)
+    Maximum number of rows held in the queue before write() waits.
+    - on_error (default None)
+    Function called (on the background thread) with the list of rows
+    and the exception, for each batch which could not be written.
+
+    USE:
+    > db.open_pool()
+    > with BufferedWriter(db=db, table='events', columns=['ts', 'source', 'value']) as writer:
+    >     for event in stream:
+    >         writer.write(row=(event.ts, event.source, event.value))
+    >
+    > writer.stats()
+    """
+
+    # SENTINEL PUT ON THE QUEUE BY CLOSE()
+    _CLOSE = object()
+
+    # ------------------------------------------------------------------
+    def __init__(self, db, table, columns, max_rows=1000, max_latency=1.0, max_queue=100000,
+                 on_error=None):
+
+        # INITIALISE
+        self._db            = db
+        self._table         = table
+        self._columns       = columns
+        self._max_rows      = max_rows
+        self._max_latency   = max_latency
+        self._on_error      = on_error
+        self._queue         = queue.Queue(maxsize=max_queue)
+        self._closed        = False
+        self._writers       = 0
+        self._state         = threading.Condition()
+        self._unwritten     = []
+        self._lock          = threading.Lock()
+        self._stats         = dict(rows=0, flushes=0, errors=0, failed=0, flush_time=0.0,
+                                   max_flush_time=0.0, last_flush_time=0.0, max_latency=0.0)
+
+        # START THE BACKGROUND WRITER
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    def __enter__(self):
+        return self
+
+    # ------------------------------------------------------------------
+    def __exit__(self, *args):
+        self.close()
+
+    # ------------------------------------------------------------------
+    def close(self):
+        """
+        Stop accepting rows, write all queued rows, and wait for the
+        background thread to finish.
+
+        A DatabaseError is raised if any rows could not be written;
+        these rows are available from the unwritten property.
+        """
+
+        with self._state:
+            # TEST IF ALREADY CLOSED
+            if self._closed: return
+            # STOP ACCEPTING ROWS >> WAIT FOR WRITES IN PROGRESS TO BE QUEUED
+            self._closed = True
+            while self._writers: self._state.wait()
+
+        self._queue.put(self._CLOSE)
+        self._thread.join()
+
+        if self._unwritten:
+            raise DatabaseError('%d rows could not be written to %s.' %
+                                (len(self._unwritten), self._table))
+
+    # ------------------------------------------------------------------
+    def stats(self):
+        """
+        Return a dictionary of writer statistics.
+
+        KEYS:
+        - rows:             Number of rows written.
+        - flushes:          Number of batches written.
+        - errors:           Number of failed batch write attempts.
+        - failed:           Number of rows which could not be written.
+        - queue_depth:      Number of rows waiting in the queue.
+        - flush_time:       Total seconds spent writing batches.
+        - avg_flush_time / max_flush_time / last_flush_time:
+                            Seconds taken to write a batch.
+        - max_latency:      Maximum seconds between a row being queued
+                            and being written.
+        """
+
+        with self._lock:
+            stats = dict(self._stats)
+
+        stats['queue_depth'] = self._queue.qsize()
+        stats['avg_flush_time'] = (stats['flush_time'] / stats['flushes']
+                                   if stats['flushes'] else 0.0)
+
+        return stats
+
+    # ------------------------------------------------------------------
+    @property
+    def unwritten(self):
+        """
+        Return the list of rows which could not be written (when no
+        on_error callback is provided).
+        """
+
+        return list(self._unwritten)
+
+    # ------------------------------------------------------------------
+    def write(self, row, timeout=None):
+        """
+        Queue a row to be written; waiting for space if the queue is
+        full.
+
+        PARAMETERS:
+        - row
+        Sequence of values, in the same order as the columns.
+        - timeout (default None)
+        Maximum number of seconds to wait for space in the queue,
+        before a queue.Full exception is raised.  If None, wait
+        until space is available.
+        """
+
+        with self._state:
+            # TEST FOR A CLOSED WRITER >> REGISTER THE WRITE, SO CLOSE() WAITS FOR IT
+            if self._closed: raise DatabaseError('The writer for %s is closed.' % self._table)
+            self._writers += 1
+
+        try:
+            self._queue.put((time.time(), row), timeout=timeout)
+        finally:
+            with self._state:
+                self._writers -= 1
+                self._state.notify_all()
+
+    # ------------------------------------------------------------------
+    def write_many(self, rows, timeout=None):
+        """Queue each row in the passed iterable.  Refer to write()."""
+
+        for row in rows: self.write(row=row, timeout=timeout)
+
+    # ------------------------------------------------------------------
+    def _fail(self, rows, err):
+        """
+        Pass a batch which could not be written to the on_error
+        callback; or add its rows to the unwritten list, and notify the
+        user.
+        """
+
+        with self._lock:
+            self._stats['failed'] += len(rows)
+
+        # CALL THE CALLBACK >> KEEP THE ROWS IF THE CALLBACK FAILS
+        if self._on_error is not None:
+            try:
+                self._on_error(rows, err)
+                return
+            except Exception as cb_err:
+                err = cb_err
+
+        self._unwritten.extend(rows)
+        self._db._ui.print_alert('\nA batch of %d rows could not be written to %s.' %
+                                 (len(rows), self._table))
+        self._db._ui.print_error(err)
+
+    # ------------------------------------------------------------------
+    def _flush(self, batch):
+        """
+        Write a batch of (queued time, row) items; retrying a transient
+        error using the retry policy.  A batch which cannot be written
+        is passed to _fail().
+        """
+
+        # INITIALISE
+        attempt = 0
+        rows = [row for _, row in batch]
+        policy = self._db.retry_policy
+
+        while True:
+            # WRITE THE BATCH
+            start = time.time()
+            attempt += 1
+            try:
+                with self._db.checkout() as conn:
+                    self._db._insert_rows(conn=conn, table=self._table, columns=self._columns,
+                                          rows=rows, batch_size=len(rows), commit=True,
+                                          progress=dict(rows=0))
+                break
+            except Exception as err:
+                with self._lock:
+                    self._stats['errors'] += 1
+                # TEST FOR A PERMANENT ERROR, OR THE FINAL ATTEMPT
+                if not _is_transient(err) or attempt >= policy.max_attempts:
+                    self._fail(rows=rows, err=err)
+                    return
+            time.sleep(policy.delay(attempt=attempt))
+
+        # RECORD THE FLUSH
+        now = time.time()
+        with self._lock:
+            self._stats['rows'] += len(rows)
+            self._stats['flushes'] += 1
+            self._stats['last_flush_time'] = now - start
+            self._stats['flush_time'] += now - start
+            self._stats['max_flush_time'] = max(self._stats['max_flush_time'], now - start)
+            self._stats['max_latency'] = max(self._stats['max_latency'], now - batch[0][0])
+
+    # ------------------------------------------------------------------
+    def _run(self):
+        """
+        Background thread which collects rows from the queue, and
+        writes each batch when full, or when its oldest row reaches
+        max_latency.
+        """
+
+        # INITIALISE
+        batch = []
+
+        while True:
+            # WAIT FOR A ROW; NO LONGER THAN THE OLDEST ROW'S DEADLINE
+            timeout = None if not batch else max(batch[0][0] + self._max_latency - time.time(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            # TEST FOR CLOSE >> WRITE THE REMAINING ROWS
+            if item is self._CLOSE:
+                if batch: self._flush(batch=batch)
+                return
+            if item is not None: batch.append(item)
+
+            # TEST FOR A FULL OR LATE BATCH
+            if batch and (len(batch) >= self._max_rows or
+                          time.time() - batch[0][0] >= self._max_latency):
+                self._flush(batch=batch)
+                batch = []
+
+
+# ----------------------------------------------------------------------
+class IncrementalExtract(object):
+
+    """
+    PURPOSE:
+    This class is returned by the Database.extract_incremental()
+    method, and streams the extracted rows; then saves the new
+    watermark once the consumer confirms the rows are processed.
+
+    DESIGN:
+    The query is run when iteration starts, and rows are fetched in
+    batches from a streaming cursor (on a borrowed connection), so
+    only one batch is held in memory.  The highest watermark value is
+    tracked as the rows are yielded.
+
+    The commit() method saves the new watermark, and may only be
+    called once all rows have been read; so rows sharing the final
+    watermark value are never skipped.  If commit() is not called
+    (e.g. the load fails), the saved watermark is unchanged and the
+    next run extracts the same rows again.
+
+    A JSON state file is written to a temporary file, which then
+    replaces the state file; a SQLite state file is updated in a
+    single transaction.  So the state file is never partially written.
+
+    USE:
+    > with db.extract_incremental(table='sales', watermark_column='id',
+    >                             state_file='state.json') as extract:
+    >     target.insert_many(table='sales', columns=extract.columns, rows=extract)
+    >     extract.commit()
+    >
+    > extract.stats()
+    """
+
+    # ------------------------------------------------------------------
+    def __init__(self, db, sql, params, watermark_column, store, key, previous, batch_size):
+
+        # INITIALISE
+        self._db            = db
+        self._sql           = sql
+        self._params        = params
+        self._column        = watermark_column
+        self._store         = store
+        self._key           = key
+        self._previous      = previous
+        self._batch_size    = batch_size
+        self._rows          = None
+        self._done          = False
+        self._committed     = False
+        self._count         = 0
+        self._start         = None
+        self.columns        = None
+        self.watermark      = previous
+
+    # ------------------------------------------------------------------
+    def __enter__(self):
+        return self
+
+    # ------------------------------------------------------------------
+    def __exit__(self, *args):
+        self.close()
+
+    # ------------------------------------------------------------------
+    def __iter__(self):
+        # RUN THE QUERY ON FIRST USE
+        if self._rows is None: self._rows = self._stream()
+
+        return self._rows
+
+    # ------------------------------------------------------------------
+    def close(self):
+        """Close the cursor (if open), without saving the watermark."""
+
+        if self._rows is not None: self._rows.close()
+
+    # ------------------------------------------------------------------
+    def commit(self):
+        """
+        Save the new watermark to the state file; once all rows have
+        been read.
+
+        A DatabaseError is raised if rows remain to be read.
+        """
+
+        # TEST FOR UNREAD ROWS
+        if not self._done:
+            raise DatabaseError('All rows must be read before the watermark is committed.')
+
+        # SAVE THE WATERMARK (IF ANY ROWS WERE EXTRACTED)
+        if self.watermark != self._previous:
+            self._store.set(key=self._key, value=self.watermark, rows=self._count)
+        self._committed = True
+
+    # ------------------------------------------------------------------
+    def stats(self):
+        """
+        Return a dictionary of extract statistics.
+
+        KEYS:
+        - rows:         Number of rows extracted.
+        - seconds:      Time taken since the query was run.
+        - previous:     The watermark at the start of the extract.
+        - watermark:    The highest watermark extracted.
+        - committed:    True if the watermark has been committed.
+        """
+
+        return dict(rows=self._count, seconds=time.time() - (self._start or time.time()),
+                    previous=self._previous, watermark=self.watermark,
+                    committed=self._committed)
+
+    # ------------------------------------------------------------------
+    def _stream(self):
+        """
+        Generator which runs the query on a streaming cursor, and
+        yields each row; tracking the highest watermark value.
+        """
+
+        # INITIALISE
+        self._start = time.time()
+
+        with self._db.checkout() as conn:
+            # CREATE A STREAMING CURSOR >> RUN THE QUERY
+            cur = self._db._stream_cursor(conn=conn, batch_size=self._batch_size)
+            try:
+                self._db._execute_cursor(cur=cur, sql=self._sql, params=self._params)
+                self.columns = [col[0] for col in cur.description]
+                idx = [col.lower() for col in self.columns].index(self._column.lower())
+                # FETCH EACH BATCH >> TRACK THE WATERMARK >> YIELD
+                for batch in _fetch_batches(cur=cur, batch_size=self._batch_size):
+                    values = [row[idx] for row in batch if row[idx] is not None]
+                    if values and (self.watermark is None or max(values) > self.watermark):
+                        self.watermark = max(values)
+                    self._count += len(batch)
+                    for row in batch: yield row
+                self._done = True
+            finally:
+                self._db._close_cursor(conn=conn, cur=cur)
+                self._db._record(sql=self._sql, seconds=time.time() - self._start,
+                                 rows=self._count)
+
+
+# ----------------------------------------------------------------------
+class _Flight(object):
+
+    """
+    PURPOSE:
+    This class holds the state of a single-flight query; the event set
+    once the query completes, and its rows or exception.
+    """
+
+    # ------------------------------------------------------------------
+    def __init__(self):
+
+        # INITIALISE
+        self.done       = threading.Event()
+        self.rows       = None
+        self.error      = None
+        self.waiting    = 0
+
+
+# ----------------------------------------------------------------------
+class _JsonState(object):
+
+    """
+    PURPOSE:
+    This class stores watermarks (refer to extract_incremental()) in a
+    JSON file, as a dictionary of key and watermark entry.
+    """
+
+    # ------------------------------------------------------------------
+    def __init__(self, path):
+
+        # INITIALISE
+        self._path = path
+
+    # ------------------------------------------------------------------
+    def get(self, key):
+        """Return the saved watermark for the key, or None."""
+
+        entry = self._read().get(key)
+
+        return None if entry is None else _decode_watermark(entry['watermark'], entry['type'])
+
+    # ------------------------------------------------------------------
+    def set(self, key, value, rows):
+        """
+        Save the watermark for the key; written to a temporary file,
+        which then replaces the state file.
+        """
+
+        # UPDATE THE ENTRY, KEEPING ALL OTHER KEYS
+        state = self._read()
+        value, kind = _encode_watermark(value)
+        state[key] = dict(watermark=value, type=kind, rows=rows, updated=time.time())
+
+        # WRITE >> REPLACE THE STATE FILE
+        tmp = '%s.%d.tmp' % (self._path, os.getpid())
+        utils.json_write(dictionary=state, filepath=tmp)
+        os.replace(tmp, self._path)
+
+    # ------------------------------------------------------------------
+    def _read(self):
+        """Return the state file's contents, or an empty dictionary."""
+
+        return utils.json_read(filepath=self._path) if os.path.exists(self._path) else {}
+
+
+# ----------------------------------------------------------------------
+class _SQLiteState(object):
+
+    """
+    PURPOSE:
+    This class stores watermarks (refer to extract_incremental()) in
+    the _watermarks table of a SQLite database file.
+    """
+
+    # ------------------------------------------------------------------
+    def __init__(self, path):
+
+        # INITIALISE
+        self._path = path
+
+    # ------------------------------------------------------------------
+    def get(self, key):
+        """Return the saved watermark for the key, or None."""
+
+        with self._connect() as db:
+            rows = db.fetch(sql='SELECT watermark, type FROM _watermarks WHERE key = ?',
+                            params=(key,), cache=False)
+
+        return _decode_watermark(*rows[0]) if rows else None
+
+    # ------------------------------------------------------------------
+    def set(self, key, value, rows):
+        """Save the watermark for the key, in a single transaction."""
+
+        with self._connect() as db:
+            db.execute(sql='INSERT OR REPLACE INTO _watermarks VALUES (?, ?, ?, ?, ?)',
+                       params=(key,) + _encode_watermark(value) + (rows, time.time()),
+                       commit=True)
+
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _connect(self):
+        """
+        Context manager providing a connection to the state file; which
+        is created (with the _watermarks table) if required.
+        """
+
+        # CREATE AND OPEN THE STATE FILE
+        if not os.path.exists(self._path): sqlite3.connect(self._path).close()
+        db = SQLite(db_file_path=self._path, profile='concurrent')
+        db.connect()
+        if not db.connected: raise DatabaseError('Cannot open the state file: %s' % self._path)
+
+        try:
+            db.execute(sql='CREATE TABLE IF NOT EXISTS _watermarks (key TEXT PRIMARY KEY, '
+                           'watermark, type TEXT, rows INTEGER, updated REAL)', commit=True)
+            yield db
+        finally:
+            db.disconnect()
+
+
+# ----------------------------------------------------------------------
+class _StatementCache(object):
+
+    """
+    PURPOSE:
+    This class is an LRU cache of prepared cursors for a single
+    connection, keyed by SQL statement text.
+
+    DESIGN:
+    On a cache miss, a new cursor is created using the prepare
+    function.  When the cache is full, the least recently used cursor
+    is closed and removed.
+
+    The cache is not thread-safe, as its cursors are not; it is only
+    to be used by the thread holding the connection.
+
+    PARAMETERS:
+    - prepare
+    Function accepting the SQL statement and parameters, and returning
+    a new cursor.
+    - size (default 50)
+    Maximum number of cursors held in the cache.
+    """
+
+    # ------------------------------------------------------------------
+    def __init__(self, prepare, size=50):
+
+        # INITIALISE
+        self._prepare   = prepare
+        self._size      = size
+        self._cursors   = OrderedDict()
+        self._stats     = dict(hits=0, misses=0, evictions=0)
+
+    # ------------------------------------------------------------------
+    def clear(self):
+        """Close and remove all cached cursors."""
+
+        for cur in self._cursors.values(): Database._close_cursor(conn=None, cur=cur)
+        self._cursors.clear()
+
+    # ------------------------------------------------------------------
+    def cursor(self, sql, params=None):
+        """Return the cached cursor for the SQL statement."""
+
+        # TEST FOR A CACHED CURSOR >> MARK AS MOST RECENTLY USED
+        cur = self._cursors.pop(sql, None)
+        if cur is not None:
+            self._stats['hits'] += 1
+        else:
+            self._stats['misses'] += 1
+            cur = self._prepare(sql, params)
+            # EVICT THE LEAST RECENTLY USED CURSOR
+            if len(self._cursors) >= self._size:
+                _, old = self._cursors.popitem(last=False)
+                Database._close_cursor(conn=None, cur=old)
+                self._stats['evictions'] += 1
+        self._cursors[sql] = cur
+
+        return cur
+
+    # ------------------------------------------------------------------
+    def stats(self):
+        """Return a dictionary of cache statistics."""
+
+        stats = dict(self._stats)
+        stats['size'] = len(self._cursors)
+
+        return stats
+
+
+# ----------------------------------------------------------------------
+class _ResultCache(object):
+
+    """
+    PURPOSE:
+    This class is a thread-safe LRU cache of query results, with entry
+    count and byte limits, and a TTL per entry.
+
+    DESIGN:
+    Each entry holds the rows, the set of words (e.g. table names) in
+    the query, its estimated size and expiry time.  Invalidating a
+    table removes every entry whose query contains the table name.
+
+    PARAMETERS:
+    - max_entries
+    Maximum number of entries.
+    - max_bytes
+    Maximum estimated size of all entries, in bytes.
+    - ttl
+    Default number of seconds an entry is valid.
+    """
+
+    # ------------------------------------------------------------------
+    def __init__(self, max_entries, max_bytes, ttl):
+
+        # INITIALISE
+        self._max_entries   = max_entries
+        self._max_bytes     = max_bytes
+        self._ttl           = ttl
+        self._entries       = OrderedDict()
+        self._bytes         = 0
+        self._lock          = threading.Lock()
+        self._stats         = dict(hits=0, misses=0, evictions=0, expirations=0,
+                                   invalidations=0)
+
+    # ------------------------------------------------------------------
+    def get(self, key):
+        """Return the cached rows for the key, or None if not cached."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            # TEST FOR A MISSING OR EXPIRED ENTRY
+            if entry is None or entry['expires'] < time.time():
+                if entry is not None:
+                    self._remove(key)
+                    self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            # MARK AS MOST RECENTLY USED
+            self._entries[key] = self._entries.pop(key)
+            self._stats['hits'] += 1
+
+            return entry['rows']
+
+    # ------------------------------------------------------------------
+    def invalidate(self, table=None):
+        """
+        Remove the entries whose query refers to the table; or all
+        entries if table is None.
+        """
+
+        with self._lock:
+            # FIND THE AFFECTED ENTRIES >> REMOVE
+            keys = [key for key, entry in self._entries.items()
+                    if table is None or table in entry['words']]
+            for key in keys: self._remove(key)
+            self._stats['invalidations'] += len(keys)
+
+    # ------------------------------------------------------------------
+    def put(self, key, rows, sql, ttl=None):
+        """Add a query result to the cache."""
+
+        # INITIALISE
+        size = _rows_size(rows)
+        ttl = self._ttl if ttl is None else ttl
+
+        # TEST IF THE RESULT CAN EVER FIT
+        if size > self._max_bytes or ttl <= 0: return
+
+        with self._lock:
+            # REPLACE AN EXISTING ENTRY
+            if key in self._entries: self._remove(key)
+            self._entries[key] = dict(rows=rows, size=size, expires=time.time() + ttl,
+                                      words=frozenset(_RE_WORDS.findall(sql.upper())))
+            self._bytes += size
+            # EVICT THE LEAST RECENTLY USED ENTRIES
+            while (len(self._entries) > self._max_entries or self._bytes > self._max_bytes):
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    # ------------------------------------------------------------------
+    def stats(self):
+        """
+        Return a dictionary of cache statistics.
+
+        KEYS:
+        - entries:          Number of cached results.
+        - bytes:            Estimated size of the cached results.
+        - hits:             Number of results served from the cache.
+        - misses:           Number of results not found in the cache.
+        - evictions:        Entries removed to respect the limits.
+        - expirations:      Entries removed as their TTL expired.
+        - invalidations:    Entries removed by writes.
+        """
+
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+
+        return stats
+
+    # ------------------------------------------------------------------
+    def _remove(self, key):
+        """Remove an entry.  Must be called while holding the lock."""
+
+        entry = self._entries.pop(key)
+        self._bytes -= entry['size']
+
+
+# ----------------------------------------------------------------------
+class _QueryStats(object):
+
+    """
+    PURPOSE:
+    This class is a thread-safe collector of statement statistics.
+
+    DESIGN:
+    For each normalised statement, the execution count, total, minimum
+    and maximum time, rows, bytes and a latency histogram are kept.
+    The histogram buckets are defined by _BUCKETS; each bucket counts
+    executions taking up to (and including) its upper bound.
+    """
+
+    # LATENCY HISTOGRAM BUCKET UPPER BOUNDS (SECONDS)
+    _BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0, float('inf'))
+
+    # ------------------------------------------------------------------
+    def __init__(self):
+
+        # INITIALISE
+        self._stmts     = dict()
+        self._acquire   = dict(count=0, seconds=0.0, max=0.0)
+        self._lock      = threading.Lock()
+
+    # ------------------------------------------------------------------
+    def record(self, key, seconds, rows=0, nbytes=0):
+        """Record an execution of a statement."""
+
+        # FIND THE HISTOGRAM BUCKET
+        bucket = 0
+        while seconds > self._BUCKETS[bucket]: bucket += 1
+
+        with self._lock:
+            stat = self._stmts.get(key)
+            if stat is None:
+                stat = self._stmts[key] = dict(count=0, seconds=0.0, min=seconds, max=seconds,
+                                               rows=0, bytes=0, buckets=[0] * len(self._BUCKETS))
+            stat['count'] += 1
+            stat['seconds'] += seconds
+            stat['min'] = min(stat['min'], seconds)
+            stat['max'] = max(stat['max'], seconds)
+            stat['rows'] += rows
+            stat['bytes'] += nbytes
+            stat['buckets'][bucket] += 1
+
+    # ------------------------------------------------------------------
+    def record_acquire(self, seconds):
+        """Record the time taken to acquire a pooled connection."""
+
+        with self._lock:
+            self._acquire['count'] += 1
+            self._acquire['seconds'] += seconds
+            self._acquire['max'] = max(self._acquire['max'], seconds)
+
+    # ------------------------------------------------------------------
+    def stats(self):
+        """Return a copy of the statistics.  Refer to Database.query_stats()."""
+
+        # INITIALISE
+        statements = dict()
+
+        with self._lock:
+            for key, stat in self._stmts.items():
+                stat = dict(stat)
+                stat['avg'] = stat['seconds'] / stat['count']
+                stat['histogram'] = OrderedDict(zip(self._BUCKETS, stat.pop('buckets')))
+                statements[key] = stat
+
+            return dict(statements=statements, acquire=dict(self._acquire))
@@ -0,0 +1,478 @@
+"""------------------------------------------------------------------------------------------------
+Program:    sqlscript
+Py Ver:     2.7
+Purpose:    This module provides a streaming tokenizer used to split an SQL script into its
+            individual statements.
+
+Developer:  J. Berendt
+Email:      support@73rdstreetdevelopment.co.uk
+
+Comments:   The tokenizer understands quoted strings and identifiers, '--' and '/* */' comments,
+            procedural (BEGIN ... END;) blocks, and the '/' (Oracle) and 'GO' (SQL Server)
+            terminator lines.
+
+Use:        >>> import utils.sqlscript as sqlscript
+            >>> with open('/path/to/script.sql') as f:
+            >>>     for stmt in sqlscript.iter_statements(stream=f):
+            >>>         cur.execute(stmt)
+
+---------------------------------------------------------------------------------------------------
+UPDATE LOG:
+Date        Programmer      Version     Update
+18.10.26    J. Berendt      0.1.0       Written
+18.10.26    J. Berendt      0.2.0       Added normalise(); whitespace collapsed outside quoted
+                                        text and comments.
+18.10.26    J. Berendt      0.2.1       Nested subprograms (declared in an IS / AS or DECLARE
+                                        section) no longer end a procedural block early.
+------------------------------------------------------------------------------------------------"""
+
+from __future__ import absolute_import, print_function
+import re
+
+# OPENING QUOTE CHARACTERS AND THEIR CLOSING CHARACTER
+_QUOTES = {"'": "'", '"': '"', '`': '`', '[': ']'}
+
+# TOKENS: PLAIN STATEMENT, UNDECIDED STATEMENT HEAD, PROCEDURAL BLOCK
+_RE_PLAIN = re.compile(r"""['"`\[;]|--|/\*""")
+_RE_SPACE = re.compile(r'\s+')
+_RE_HEAD = re.compile(r"""['"`\[;]|--|/\*|[A-Za-z_][A-Za-z0-9_$#]*""")
+_RE_BLOCK = re.compile(r"""['"`\[;]|--|/\*|"""
+                       r"""\bEND(?:\s+(IF|LOOP|WHILE|REPEAT|CASE)\b)?\b|"""
+                       r"""\b(?:BEGIN|CASE|DECLARE|IS|AS|PROCEDURE|FUNCTION)\b""",
+                       re.IGNORECASE)
+
+# STATEMENT HEAD KEYWORDS
+_BEGIN_PLAIN = ('TRANSACTION', 'TRAN', 'WORK', 'DEFERRED', 'IMMEDIATE', 'EXCLUSIVE',
+                'DISTRIBUTED')
+_CREATE_BLOCK = ('PROCEDURE', 'FUNCTION', 'TRIGGER')
+_CREATE_SLASH = ('PACKAGE', 'TYPE', 'JAVA')
+_CREATE_PLAIN = ('TABLE', 'VIEW', 'INDEX', 'UNIQUE', 'BITMAP', 'SEQUENCE', 'SYNONYM', 'USER',
+                 'ROLE', 'DATABASE', 'SCHEMA', 'MATERIALIZED', 'TABLESPACE', 'DIRECTORY')
+_HEAD_LIMIT = 8
+
+# LINES WHICH TERMINATE THE CURRENT STATEMENT
+_TERMINATOR_LINES = ('/', 'GO')
+
+
+# ----------------------------------------------------------------------
+def iter_statements(stream, backslash_escapes=False, with_lineno=False):
+    """
+    Generator which yields each SQL statement from a script.
+
+    DESIGN:
+    The stream is read one line at a time, so a script of any size is
+    parsed in bounded memory, and statements are yielded as soon as
+    they are complete.
+
+    Statements are split on the ';' character, unless the ';' is
+    within a quoted string or identifier, or a comment.  The
+    terminating ';' is not included in the returned statement.
+
+    Procedural blocks (starting with DECLARE or BEGIN, or a CREATE
+    PROCEDURE, FUNCTION or TRIGGER statement) are terminated by the
+    ';' which follows the END of the outermost BEGIN ... END block;
+    and this ';' *is* included in the statement, as required by
+    Oracle.  A declaration section (following a subprogram's IS or
+    AS, or a leading DECLARE) is closed by the END of the body which
+    follows it; so nested subprograms declared in the section do not
+    terminate the statement.  CREATE PACKAGE and CREATE TYPE
+    statements are only terminated by a '/' line.
+
+    A line containing only '/' or 'GO' always terminates the current
+    statement.
+
+    Comments preceding a statement are dropped, while comments
+    within a statement (e.g. optimiser hints) are kept.
+
+    PARAMETERS:
+    - stream
+    An iterable of lines; for example, an open file object.
+    - backslash_escapes (default False)
+    Treat a backslash as an escape character within quoted strings,
+    as used by MySQL.
+    - with_lineno (default False)
+    Yield a tuple of (line number, statement) where the line number is
+    the line on which the statement starts.
+
+    USE:
+    > import utils.sqlscript as sqlscript
+    > with open('/path/to/script.sql') as f:
+    >     for stmt in sqlscript.iter_statements(stream=f):
+    >         cur.execute(stmt)
+    """
+
+    # INITIALISE
+    splitter = _Splitter(backslash_escapes=backslash_escapes)
+
+    # PARSE EACH LINE >> YIELD COMPLETED STATEMENTS
+    for lineno, line in enumerate(stream, 1):
+        for lineno_, stmt in splitter.feed(line=line, lineno=lineno):
+            yield (lineno_, stmt) if with_lineno else stmt
+
+    # YIELD ANY UNTERMINATED FINAL STATEMENT
+    for lineno_, stmt in splitter.finish():
+        yield (lineno_, stmt) if with_lineno else stmt
+
+
+# ----------------------------------------------------------------------
+def normalise(sql, backslash_escapes=False):
+    """
+    Return the SQL statement with each run of whitespace collapsed to
+    a single space; except within quoted strings and identifiers, and
+    comments, which are kept as written.
+
+    DESIGN:
+    As the text of quoted strings is unchanged, two statements only
+    have the same normalised form if they differ in layout alone;
+    so the normalised form can be used as a cache key.
+
+    PARAMETERS:
+    - sql
+    The SQL statement to be normalised.
+    - backslash_escapes (default False)
+    Treat a backslash as an escape character within quoted strings,
+    as used by MySQL.
+
+    USE:
+    > sqlscript.normalise("SELECT *\n  FROM t WHERE name = 'a  b'")
+    > "SELECT * FROM t WHERE name = 'a  b'"
+    """
+
+    # INITIALISE
+    out = []
+    pos = 0
+    size = len(sql)
+
+    while pos < size:
+        # FIND THE NEXT QUOTE OR COMMENT >> COLLAPSE THE PRECEDING WHITESPACE
+        match = _RE_PLAIN.search(sql, pos)
+        start = size if match is None else match.start()
+        out.append(_RE_SPACE.sub(' ', sql[pos:start]))
+        if match is None: break
+        token = match.group()
+
+        # FIND THE END OF THE QUOTED TEXT OR COMMENT (INCLUSIVE)
+        if token in _QUOTES:
+            end = _find_quote(text=sql, pos=match.end(), quote=_QUOTES[token],
+                              escapes=backslash_escapes)
+        elif token == '--':
+            end = sql.find('\n', match.end())
+        elif token == '/*':
+            end = sql.find('*/', match.end()) + 1
+        else:
+            end = start
+        end = size - 1 if end < start else end
+
+        # KEEP THE TEXT AS WRITTEN
+        out.append(sql[start:end + 1])
+        pos = end + 1
+
+    return ''.join(out).strip()
+
+
+# ----------------------------------------------------------------------
+def parse_script(script_string, backslash_escapes=False):
+    """
+    Return a list of the SQL statements in the passed script string.
+
+    DESIGN:
+    This is a convenience wrapper around iter_statements(), for a
+    script which is already held in memory.
+
+    PARAMETERS:
+    - script_string
+    The string value of the script to be parsed.
+    - backslash_escapes (default False)
+    Treat a backslash as an escape character within quoted strings.
+    """
+
+    return list(iter_statements(stream=script_string.splitlines(True),
+                                backslash_escapes=backslash_escapes))
+
+
+# ----------------------------------------------------------------------
+class _Splitter(object):
+
+    """
+    PURPOSE:
+    This class holds the parsing state of iter_statements(), between
+    lines of the script.
+
+    DESIGN:
+    The state of a statement is tracked by its mode:
+        - None:     The statement head is still being read.
+        - 'plain':  A normal statement, terminated by ';'.
+        - 'block':  A procedural block, terminated by ';' once the
+                    outermost BEGIN ... END block is closed.
+        - 'slash':  A statement terminated only by a '/' line.
+    """
+
+    # ------------------------------------------------------------------
+    def __init__(self, backslash_escapes=False):
+
+        # INITIALISE
+        self._escapes   = backslash_escapes
+        self._quote     = None
+        self._comment   = False
+        self._keep      = False
+        self._reset()
+
+    # ------------------------------------------------------------------
+    def feed(self, line, lineno):
+        """
+        Parse a line of the script, and return a list of
+        (line number, statement) tuples for the statements completed
+        on this line.
+        """
+
+        # INITIALISE
+        out = []
+        pos = 0
+        size = len(line)
+
+        # TEST FOR A TERMINATOR LINE
+        if (self._quote is None and not self._comment and
+                line.strip().upper() in _TERMINATOR_LINES):
+            self._flush(out=out)
+            return out
+
+        while pos < size:
+            if self._quote is not None:
+                # FIND THE END OF THE QUOTED TEXT
+                end = self._find_quote(line=line, pos=pos)
+                if end < 0:
+                    self._buf.append(line[pos:])
+                    break
+                self._buf.append(line[pos:end + 1])
+                self._quote = None
+                pos = end + 1
+                continue
+
+            if self._comment:
+                # FIND THE END OF THE BLOCK COMMENT
+                end = line.find('*/', pos)
+                stop = size if end < 0 else end + 2
+                if self._keep: self._buf.append(line[pos:stop])
+                if end < 0: break
+                self._comment = False
+                pos = stop
+                continue
+
+            # FIND THE NEXT TOKEN
+            match = self._regex().search(line, pos)
+            if match is None:
+                self._add_code(text=line[pos:], lineno=lineno)
+                break
+            self._add_code(text=line[pos:match.start()], lineno=lineno)
+            token = match.group()
+            pos = match.end()
+
+            if token == ';':
+                # END OF STATEMENT?
+                if self._terminates():
+                    self._flush(out=out, suffix=';' if self._mode == 'block' else '')
+                else:
+                    # A SUBPROGRAM ENDING HERE IS A FORWARD DECLARATION (NO IS / AS)
+                    self._buf.append(token)
+                    self._subprogram = False
+            elif token in _QUOTES:
+                # START OF QUOTED TEXT
+                self._add_code(text=token, lineno=lineno)
+                self._quote = _QUOTES[token]
+            elif token == '--':
+                # LINE COMMENT >> KEEP WITHIN A STATEMENT ONLY
+                if self._code: self._buf.append(line[match.start():])
+                break
+            elif token == '/*':
+                # BLOCK COMMENT >> KEEP WITHIN A STATEMENT ONLY
+                self._comment = True
+                self._keep = self._code
+                if self._keep: self._buf.append(token)
+            else:
+                # KEYWORD OR WORD
+                self._add_code(text=token, lineno=lineno)
+                self._word(word=token.upper(), suffix=match.lastindex and match.group(1))
+
+        return out
+
+    # ------------------------------------------------------------------
+    def finish(self):
+        """Return a list containing any unterminated final statement."""
+
+        out = []
+        self._flush(out=out)
+
+        return out
+
+    # ------------------------------------------------------------------
+    def _add_code(self, text, lineno):
+        """Add statement text to the buffer, flagging any code found."""
+
+        if not text: return
+        # FLAG THE START OF THE STATEMENT
+        if not self._code and text.strip():
+            self._code = True
+            self._lineno = lineno
+        self._buf.append(text)
+
+    # ------------------------------------------------------------------
+    def _find_quote(self, line, pos):
+        """
+        Return the index of the closing quote character in the line,
+        or -1 if not found.
+        """
+
+        return _find_quote(text=line, pos=pos, quote=self._quote, escapes=self._escapes)
+
+    # ------------------------------------------------------------------
+    def _flush(self, out, suffix=''):
+        """Add the current statement (if any) to the output list."""
+
+        # TEST FOR CODE (NOT ONLY WHITESPACE AND COMMENTS)
+        if self._code:
+            text = ''.join(self._buf).strip()
+            if text: out.append((self._lineno, text + suffix))
+
+        self._reset()
+
+    # ------------------------------------------------------------------
+    def _keyword(self, word, suffix=None):
+        """
+        Update the block depth for a procedural keyword.
+
+        DESIGN:
+        A declaration section (a subprogram's IS / AS, or a DECLARE
+        before the first BEGIN) opens a level, and the position of the
+        section is held; the BEGIN of the section's body does not open
+        a further level, so the body's END closes the section.
+        """
+
+        if word in ('PROCEDURE', 'FUNCTION'):
+            # THE NEXT IS / AS OPENS THE SUBPROGRAM'S DECLARATIONS
+            self._subprogram = True
+        elif word in ('IS', 'AS'):
+            if self._subprogram: self._open_section()
+        elif word == 'DECLARE':
+            # ONLY A LEADING DECLARE (NOT A VARIABLE DECLARED WITHIN A BODY)
+            if self._depth == 0: self._open_section()
+        elif word == 'BEGIN':
+            self._subprogram = False
+            # THE BODY OF AN OPEN SECTION >> NO FURTHER LEVEL
+            if self._sections and self._sections[-1] == self._depth:
+                self._sections.pop()
+            else:
+                self._depth += 1
+            self._closed = False
+        elif word == 'CASE':
+            self._depth += 1
+            self._closed = False
+        elif word.startswith('END'):
+            # END IF / END LOOP / ETC DO NOT CLOSE A BEGIN OR CASE
+            if suffix is None:
+                self._depth -= 1
+                self._closed = self._depth <= 0
+            elif suffix.upper() == 'CASE':
+                self._depth -= 1
+
+    # ------------------------------------------------------------------
+    def _open_section(self):
+        """Open a declaration section, closed by the END of its body."""
+
+        self._subprogram = False
+        self._depth += 1
+        self._sections.append(self._depth)
+        self._closed = False
+
+    # ------------------------------------------------------------------
+    def _regex(self):
+        """Return the token pattern for the current statement mode."""
+
+        if self._mode is None: return _RE_HEAD
+        if self._mode == 'block': return _RE_BLOCK
+
+        return _RE_PLAIN
+
+    # ------------------------------------------------------------------
+    def _reset(self):
+        """Reset the statement state, ready for the next statement."""
+
+        self._buf       = []
+        self._code      = False
+        self._lineno    = 0
+        self._head      = []
+        self._mode      = None
+        self._depth     = 0
+        self._closed    = False
+        self._sections  = []
+        self._subprogram = False
+
+    # ------------------------------------------------------------------
+    def _terminates(self):
+        """Return True if a ';' terminates the current statement."""
+
+        if self._mode == 'block': return self._closed
+        if self._mode == 'slash': return False
+
+        return True
+
+    # ------------------------------------------------------------------
+    def _word(self, word, suffix=None):
+        """Process a word from the statement head, or a block keyword."""
+
+        # PROCEDURAL BLOCK KEYWORD
+        if self._mode == 'block':
+            self._keyword(word=word, suffix=suffix)
+            return
+
+        # READ THE STATEMENT HEAD >> DECIDE THE MODE
+        self._head.append(word)
+        self._mode = _head_mode(head=self._head)
+
+        # REPLAY THE HEAD THROUGH THE BLOCK COUNTER
+        if self._mode == 'block':
+            for word_ in self._head: self._keyword(word=word_)
+
+
+# ----------------------------------------------------------------------
+def _find_quote(text, pos, quote, escapes=False):
+    """
+    Return the index of the closing quote character in the text,
+    starting from pos, or -1 if not found.
+    """
+
+    while True:
+        end = text.find(quote, pos)
+        if end < 0 or not escapes or quote not in ('\'', '"'):
+            return end
+        # COUNT PRECEDING BACKSLASHES >> AN ODD COUNT ESCAPES THE QUOTE
+        idx = end - 1
+        while idx >= 0 and text[idx] == '\\': idx -= 1
+        if (end - 1 - idx) % 2 == 0: return end
+        pos = end + 1
+
+
+# ----------------------------------------------------------------------
+def _head_mode(head):
+    """
+    Return the statement mode for the words read from the head of a
+    statement, or None if more words are required.
+    """
+
+    first = head[0]
+
+    if first == 'DECLARE': return 'block'
+
+    if first == 'BEGIN':
+        # BEGIN TRANSACTION (ETC) IS NOT A PROCEDURAL BLOCK
+        if len(head) < 2: return None
+        return 'plain' if head[1] in _BEGIN_PLAIN else 'block'
+
+    if first == 'CREATE':
+        # SKIP MODIFIERS (OR REPLACE, DEFINER, ETC) UNTIL THE OBJECT TYPE
+        for word in head[1:]:
+            if word in _CREATE_BLOCK: return 'block'
+            if word in _CREATE_SLASH: return 'slash'
+            if word in _CREATE_PLAIN: return 'plain'
+        return None if len(head) < _HEAD_LIMIT else 'plain'
+
+    return 'plain'